@@ -3,10 +3,45 @@
 This module provides classes and methods for importing, storing, and manipulating address and distance data.
 """
 
+import array
 import csv
+import hashlib
+import heapq
+import logging
+import mmap
+import os
+import struct
+from typing import Optional, Union
 
 import routing
 
+try:
+    import numpy
+except ImportError:  # NumPy is optional; the distance matrix falls back to nested lists without it.
+    numpy = None
+
+
+# Layout of the distance cache header: a magic string identifying the format, the number of addresses, the length in
+# bytes of the newline-separated address block that follows it, and a SHA-256 checksum of the fields before it and the
+# address block. The distance matrix is stored after the address block, aligned to 8 bytes, as n x n native doubles.
+CACHE_MAGIC = b'WGUPSDM2'
+CACHE_HEADER = struct.Struct('=8sQQ32s')
+
+logger = logging.getLogger(__name__)
+
+
+def format_address(street: str, zipcode: str) -> str:
+    """Combines a street and zipcode into the address string used to look up an address.
+
+    Args:
+        street: The street number and name.
+        zipcode: The zipcode.
+
+    Returns: The street number and name followed by the zipcode.
+    """
+
+    return f'{street} {zipcode}'
+
 
 class Address:
     """A class used to represent an address.
@@ -18,7 +53,7 @@ class Address:
 
     def __init__(self, street: str, zipcode: str, index: int):
         """Initializes Address with street, zipcode, and index."""
-        self.address = f'{street} {zipcode}'
+        self.address = format_address(street, zipcode)
         self.index = index
 
     def __str__(self) -> str:
@@ -36,15 +71,35 @@ class AddressCollection:
 
     Attributes:
         all_addresses: A dictionary mapping the string representation of an address to its corresponding address object.
-        distance_matrix: A 2-dimensional list representing the distances between a pair of addresses.
+        distance_matrix: A contiguous 2-dimensional NumPy array representing the distances between a pair of addresses.
+          A 2-dimensional list is used instead if NumPy is not installed or the vectorized path is disabled.
+        address_strings: The string representation of each address, in the order of the address's index.
         hub_address: The Address object for the hub.
+        hub_index: The index of the hub in the distance matrix.
+        cache_file: The path of the distance cache file the collection was loaded from or saved to, if any.
+        data_hash: The SHA-256 hash of the address and distance files, if the collection was imported with a cache
+          directory.
+        neighbor_lists: For each address, the indexes of its nearest addresses ordered from the closest to the
+          farthest, or None if build_neighbor_lists has not been called. When set, the routing functions only consider
+          moves that connect an address to one of its nearest addresses.
     """
 
     def __init__(self):
         """Initializes AddressCollection."""
         self.all_addresses: dict[str, Address] = {}
-        self.distance_matrix: list[list[float]] = []
+        self.distance_matrix: Union[list[list[float]], 'numpy.ndarray'] = []
+        self.address_strings: list[str] = []
         self.hub_address = None
+        self.hub_index = 0
+        # Rows of the distance matrix used for single lookups. Indexing a memoryview of a NumPy row returns a Python
+        # float and is faster than indexing the array itself.
+        self._distance_rows = self.distance_matrix
+        # Memory map backing the distance matrix when it is loaded from a cache file. A reference is kept so that the
+        # map stays open for as long as the matrix is in use.
+        self._distance_map: Optional[mmap.mmap] = None
+        self.cache_file: Optional[str] = None
+        self.data_hash: Optional[str] = None
+        self.neighbor_lists: Optional[list[array.array]] = None
 
     def import_addresses(self, file: str):
         """Imports addresses from a provided CSV file and stores them in a dictionary mapping the address's string
@@ -77,15 +132,19 @@ class AddressCollection:
 
                 new_address = Address(street, zipcode, index)
                 self.all_addresses[street + ' ' + zipcode] = new_address
+                self.address_strings.append(new_address.address)
                 index += 1
             # Extract the str representation of the hub address, which is the first address in the file.
             self.hub_address = list(self.all_addresses.values())[0].address
 
-    def import_distances(self, file: str):
+    def import_distances(self, file: str, vectorized: bool = True):
         """Imports distances from a given CSV file and stores them in a distance matrix.
 
         Args:
             file: The path to the CSV file containing the distances.
+            vectorized: Optional - uses the NumPy implementation of the Floyd-Warshall algorithm if NumPy is installed.
+              If False or NumPy is not installed, the pure-Python implementation is used. Both produce identical
+              distances.
 
         Time complexity: O(n^3), where n is the number of addresses in the CSV file. This is due to the use of the
         Floyd-Warshall algorithm for optimizing distances.
@@ -101,14 +160,224 @@ class AddressCollection:
                 # Convert string from CSV to float unless value is blank, in which case append 0.0.
                 float_values = [float(d) if d else 0.0 for d in distance]
                 self.distance_matrix.append(float_values)
-            n = len(self.distance_matrix)
-            # Fill out the upper triangle of the distance matrix.
-            for i in range(n):
-                for j in range(i + 1, n):
-                    self.distance_matrix[i][j] = self.distance_matrix[j][i]
+
+        if vectorized and numpy is not None:
+            # Fill out the upper triangle of the distance matrix by mirroring the lower triangle, then optimize it.
+            matrix = numpy.array(self.distance_matrix, dtype=numpy.float64)
+            matrix = numpy.tril(matrix) + numpy.tril(matrix, -1).T
+            self.distance_matrix = routing.floyd_warshall_vectorized(matrix)
+            self._distance_rows = [memoryview(row) for row in self.distance_matrix]
+            return
+
+        n = len(self.distance_matrix)
+        # Fill out the upper triangle of the distance matrix.
+        for i in range(n):
+            for j in range(i + 1, n):
+                self.distance_matrix[i][j] = self.distance_matrix[j][i]
         # Use the Floyd Warshall algorithm to optimize the distance matrix with the shortest route between
         # addresses i and j that can pass through k.
         self.distance_matrix = routing.floyd_warshall(self.distance_matrix)
+        self._distance_rows = self.distance_matrix
+
+    def import_data(self, address_file: str, distance_file: str, cache_dir: Optional[str] = None):
+        """Imports addresses and distances, reusing a cached distance matrix if the CSV files have not changed.
+
+        The cache file is named after a SHA-256 hash of the contents of both CSV files, so editing either file results
+        in a new cache file being built on the next start. The cache is only an optimization, so if it cannot be
+        written, the failure is logged and the calculated distance matrix is used.
+
+        Args:
+            address_file: The path to the CSV file containing the addresses.
+            distance_file: The path to the CSV file containing the distances.
+            cache_dir: Optional - the directory the distance cache is stored in. If not provided, no cache is used and
+              the distance matrix is always calculated.
+
+        Time complexity: O(n^2), where n is the number of addresses, if a valid cache file exists, since the files
+        must be read to calculate their hash. O(n^3) otherwise, due to the Floyd-Warshall algorithm.
+
+        Space complexity: O(n^2), where n is the number of addresses. When the cache is used, the distance matrix is
+        memory-mapped rather than read into memory.
+        """
+
+        if not cache_dir:
+            self.import_addresses(address_file)
+            self.import_distances(distance_file)
+            return
+
+        self.data_hash = hash_files(address_file, distance_file)
+        cache_file = os.path.join(cache_dir, f'distances-{self.data_hash}.bin')
+        if os.path.exists(cache_file) and self.load_distance_cache(cache_file):
+            return
+        self.import_addresses(address_file)
+        self.import_distances(distance_file)
+        try:
+            self.save_distance_cache(cache_file)
+        except OSError as error:
+            logger.warning('Could not save the distance cache to %s: %s', cache_file, error)
+
+    def save_distance_cache(self, file: str):
+        """Writes the address index and the distance matrix to a binary cache file.
+
+        The file is written to a temporary path first and then moved into place, so an interrupted write never leaves
+        a partial cache file behind.
+
+        Args:
+            file: The path of the cache file to write.
+
+        Raises:
+            OSError: If the directory or the file cannot be written.
+
+        Time complexity: O(n^2), where n is the number of addresses.
+
+        Space complexity: O(n^2), where n is the number of addresses, due to the buffer holding the distances.
+        """
+
+        addresses = sorted(self.all_addresses.values(), key=lambda a: a.index)
+        address_block = '\n'.join(a.address for a in addresses).encode('utf-8')
+        num_addresses = len(addresses)
+        padding = -(CACHE_HEADER.size + len(address_block)) % 8
+
+        distance_bytes = self.distance_matrix_bytes()
+        directory = os.path.dirname(file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f'{file}.{os.getpid()}.tmp'
+        with open(temp_file, 'wb') as cache:
+            cache.write(CACHE_HEADER.pack(CACHE_MAGIC, num_addresses, len(address_block),
+                                          cache_checksum(num_addresses, address_block)))
+            cache.write(address_block)
+            cache.write(b'\0' * padding)
+            cache.write(distance_bytes)
+        os.replace(temp_file, file)
+        self.cache_file = file
+
+    def load_distance_cache(self, file: str) -> bool:
+        """Loads the address index and distance matrix from a binary cache file.
+
+        The distance matrix is memory-mapped instead of read, so the operating system only pages in the rows that are
+        used. If the file is not a valid cache file, including one whose header or address block does not match its
+        checksum, the collection is left unchanged.
+
+        Args:
+            file: The path of the cache file to load.
+
+        Returns:
+            True if the cache file was loaded, False if it is not a valid cache file.
+
+        Time complexity: O(n), where n is the number of addresses, since only the address index is parsed.
+
+        Space complexity: O(n), where n is the number of addresses, not counting the memory-mapped distance matrix.
+        """
+
+        with open(file, 'rb') as cache:
+            try:
+                distance_map = mmap.mmap(cache.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # The file is empty.
+                return False
+        if distance_map.size() < CACHE_HEADER.size:
+            distance_map.close()
+            return False
+        magic, num_addresses, address_block_size, checksum = CACHE_HEADER.unpack_from(distance_map, 0)
+        matrix_offset = CACHE_HEADER.size + address_block_size
+        matrix_offset += -matrix_offset % 8
+        if magic != CACHE_MAGIC or distance_map.size() != matrix_offset + num_addresses * num_addresses * 8:
+            distance_map.close()
+            return False
+
+        address_block = distance_map[CACHE_HEADER.size:CACHE_HEADER.size + address_block_size]
+        all_addresses = {}
+        try:
+            if checksum != cache_checksum(num_addresses, address_block):
+                raise ValueError('The distance cache does not match its checksum.')
+            for index, address in enumerate(address_block.decode('utf-8').split('\n') if num_addresses else []):
+                street, zipcode = address.rsplit(' ', 1)
+                all_addresses[address] = Address(street, zipcode, index)
+            if len(all_addresses) != num_addresses:
+                raise ValueError('The distance cache does not hold one address for each row of distances.')
+        except ValueError:  # Includes UnicodeDecodeError and addresses without a zipcode.
+            distance_map.close()
+            return False
+
+        self.use_distance_buffer(memoryview(distance_map)[matrix_offset:], num_addresses)
+        self.all_addresses = all_addresses
+        self.address_strings = list(all_addresses)
+        self.hub_address = next(iter(all_addresses.values())).address if all_addresses else None
+        self._distance_map = distance_map
+        self.cache_file = file
+        return True
+
+    def distance_matrix_bytes(self) -> bytes:
+        """Returns the distance matrix as n x n native doubles in row order.
+
+        This is the layout used by the distance cache and by shared memory.
+
+        Returns:
+            The bytes of the distance matrix.
+
+        Time complexity: O(n^2), where n is the number of addresses.
+
+        Space complexity: O(n^2), where n is the number of addresses.
+        """
+
+        if numpy is not None and isinstance(self.distance_matrix, numpy.ndarray):
+            return numpy.ascontiguousarray(self.distance_matrix, dtype=numpy.float64).tobytes()
+        distances = array.array('d')
+        for row in self.distance_matrix:
+            distances.extend(row)
+        return distances.tobytes()
+
+    def use_distance_buffer(self, buffer, num_addresses: int):
+        """Uses a buffer of n x n native doubles in row order as the distance matrix without copying it.
+
+        This is used for distance matrices stored in a memory-mapped cache file or in shared memory. The buffer must
+        stay open for as long as the collection is in use.
+
+        Args:
+            buffer: An object supporting the buffer protocol, such as a memoryview, that holds the distances.
+            num_addresses: The number of addresses in the distance matrix.
+
+        Time complexity: O(n), where n is the number of addresses, since a view is created for each row.
+        """
+
+        distances = memoryview(buffer).cast('B')[:num_addresses * num_addresses * 8].cast('d')
+        if numpy is not None:
+            self.distance_matrix = numpy.frombuffer(distances, dtype=numpy.float64).reshape(num_addresses,
+                                                                                            num_addresses)
+            self._distance_rows = [memoryview(row) for row in self.distance_matrix]
+        else:
+            self.distance_matrix = [distances[i * num_addresses:(i + 1) * num_addresses]
+                                    for i in range(num_addresses)]
+            self._distance_rows = self.distance_matrix
+
+    def build_neighbor_lists(self, num_neighbors: int):
+        """Builds the list of the nearest addresses to each address by shortest path distance.
+
+        Addresses at the same distance are ordered by their index, so the lists are the same with and without NumPy.
+
+        Args:
+            num_neighbors: The number of addresses in each list. Lists are shorter if there are fewer other addresses.
+
+        Time complexity: O(n^2 log k), where n is the number of addresses and k is num_neighbors. O(n^2 log n) if the
+        distance matrix is a NumPy array, since each row is sorted in full.
+
+        Space complexity: O(nk), where n is the number of addresses and k is num_neighbors.
+        """
+
+        num_addresses = len(self.distance_matrix)
+        num_neighbors = max(0, min(num_neighbors, num_addresses - 1))
+        neighbor_lists = []
+        if numpy is not None and isinstance(self.distance_matrix, numpy.ndarray):
+            for index in range(num_addresses):
+                row = self.distance_matrix[index].copy()
+                row[index] = numpy.inf  # An address is not its own neighbor.
+                order = numpy.argsort(row, kind='stable')[:num_neighbors]
+                neighbor_lists.append(array.array('i', order.tolist()))
+        else:
+            for index in range(num_addresses):
+                row = self.distance_matrix[index]
+                others = (other for other in range(num_addresses) if other != index)
+                neighbor_lists.append(array.array('i', heapq.nsmallest(num_neighbors, others, key=row.__getitem__)))
+        self.neighbor_lists = neighbor_lists
 
     def distance_between(self, address1: str, address2: str):
         """Looks up the shortest distance between address1 and address2 in the distance matrix.
@@ -126,12 +395,59 @@ class AddressCollection:
         """
 
         # Find the index of each address and use to look up distance between them in the distance matrix.
-        address1 = address1.upper()
-        address2 = address2.upper()
-        if (address1 in self.all_addresses) and (address2 in self.all_addresses):
-            address1_index = self.all_addresses.get(address1).index
-            address2_index = self.all_addresses.get(address2).index
-            return self.distance_matrix[address1_index][address2_index]
+        address1_index = self.index_of(address1)
+        address2_index = self.index_of(address2)
+        if address1_index is not None and address2_index is not None:
+            return self._distance_rows[address1_index][address2_index]
+
+    def distance_by_index(self, index1: int, index2: int) -> float:
+        """Looks up the shortest distance between two addresses by their indexes in the distance matrix.
+
+        This is the lookup used by the routing functions, which work with address indexes instead of strings.
+
+        Args:
+            index1: The index of the first address.
+            index2: The index of the second address.
+
+        Returns:
+            The shortest distance between the two addresses.
+
+        Time complexity: O(1).
+
+        Space complexity: O(1).
+        """
+
+        return self._distance_rows[index1][index2]
+
+    def index_of(self, address: str) -> Optional[int]:
+        """Returns the index of an address in the distance matrix.
+
+        Args:
+            address: The address to look up. The lookup is not case-sensitive.
+
+        Returns:
+            The index of the address if it is in the AddressCollection, None otherwise.
+
+        Time complexity: O(1).
+        """
+
+        address = self.all_addresses.get(address.upper())
+        if address:
+            return address.index
+
+    def address_at(self, index: int) -> str:
+        """Returns the string representation of the address at an index in the distance matrix.
+
+        Args:
+            index: The index of the address.
+
+        Returns:
+            The address as a string.
+
+        Time complexity: O(1).
+        """
+
+        return self.address_strings[index]
 
     def address_is_valid(self, address: str):
         """Checks if an address is in the AddressCollection.
@@ -166,3 +482,44 @@ class AddressCollection:
         """
 
         return self.all_addresses.get(address)
+
+
+def cache_checksum(num_addresses: int, address_block: bytes) -> bytes:
+    """Calculates the checksum stored in the header of a distance cache file.
+
+    Args:
+        num_addresses: The number of addresses in the cache file.
+        address_block: The encoded address block of the cache file.
+
+    Returns:
+        The SHA-256 digest of the magic string, the header fields, and the address block.
+
+    Time complexity: O(n), where n is the length of the address block.
+    """
+
+    digest = hashlib.sha256(CACHE_MAGIC)
+    digest.update(struct.pack('=QQ', num_addresses, len(address_block)))
+    digest.update(address_block)
+    return digest.digest()
+
+
+def hash_files(*files: str) -> str:
+    """Calculates a SHA-256 hash over the contents of one or more files.
+
+    Args:
+        files: The paths of the files to hash, in order.
+
+    Returns:
+        The hexadecimal digest of the combined contents of the files.
+
+    Time complexity: O(n), where n is the combined size of the files.
+    """
+
+    digest = hashlib.sha256(CACHE_MAGIC)
+    for file in files:
+        with open(file, 'rb') as f:
+            content = f.read()
+        # Include the length of each file so that moving bytes from one file to the other changes the hash.
+        digest.update(struct.pack('=Q', len(content)))
+        digest.update(content)
+    return digest.hexdigest()
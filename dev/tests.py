@@ -1,7 +1,11 @@
 """This module contains functions used to test the internal workings of the program and is used only in development."""
 
+import random
+from array import array
 from typing import TYPE_CHECKING
 
+import package as package_module
+import parallel
 import routing
 
 if TYPE_CHECKING:
@@ -29,14 +33,14 @@ def print_package_manifests(hub: 'Hub'):
         print(f'Truck number {truck.truck_id}:')
         print('Priority Manifest:')
         for address, packages in truck.priority_package_manifest.items():
-            print(f'Address: {address}')
+            print(f'Address: {hub.addresses.address_at(address)}')
             for package in packages:
                 print(package)
             print()
         print()
         print('Standard Manifest:')
         for address, packages in truck.standard_package_manifest.items():
-            print(f'Address: {address}')
+            print(f'Address: {hub.addresses.address_at(address)}')
             for package in packages:
                 print(package)
         print('\n\n')
@@ -64,7 +68,7 @@ def print_distance_matrix(hub: 'Hub'):
 
     print('Distance Matrix:')
     for distance_list in hub.addresses.distance_matrix:
-        rounded_list = [round(distance, 1) for distance in distance_list]
+        rounded_list = [round(float(distance), 1) for distance in distance_list]
         print(rounded_list)
     print('\n')
 
@@ -89,11 +93,10 @@ def print_hashtable(hub: 'Hub'):
     """
 
     print('Package Hashtable:')
-    i = 0
-    for table in hub.packages.package_table.table:
-        print(f'{i} ', end='')
-        print(table)
-        i += 1
+    table = hub.packages.package_table
+    for slot in range(table.capacity):
+        print(f'{slot} ', end='')
+        print(table.values[slot])
     print('\n')
 
 
@@ -130,27 +133,60 @@ def print_routes(hub: 'Hub'):
         hub: The hub to print routes for.
     """
 
+    addresses = hub.addresses
     for truck in hub.trucks.all_trucks:
-        print(
-            f'Truck {truck.truck_id} priority route: {truck.priority_route}\n'
-            f'Distance: {routing.calculate_route_distance(hub, truck.priority_route):.1f} miles')
-        j = 0
-        for i in range(len(truck.priority_route) - 1):
-            print(
-                f'The distance between {str(truck.priority_route[j])} and {str(truck.priority_route[j + 1])} is '
-                f'{hub.addresses.distance_between(truck.priority_route[j], truck.priority_route[j + 1])}')
-            j += 1
-        j = 0
-        print(f'Truck {truck.truck_id} standard route: {truck.standard_route}\n'
-              f'Distance: {routing.calculate_route_distance(hub, truck.standard_route):.1f} miles')
-        for i in range(len(truck.standard_route) - 1):
-            print(
-                f'The distance between {str(truck.standard_route[j])} and {str(truck.standard_route[j + 1])} is '
-                f'{hub.addresses.distance_between(truck.standard_route[j], truck.standard_route[j + 1]):.1f}')
-            j += 1
+        for name, route in (('priority', truck.priority_route), ('standard', truck.standard_route)):
+            print(f'Truck {truck.truck_id} {name} route: {[addresses.address_at(address) for address in route]}\n'
+                  f'Distance: {routing.calculate_route_distance(hub, route):.1f} miles')
+            for i in range(len(route) - 1):
+                print(f'The distance between {addresses.address_at(route[i])} and {addresses.address_at(route[i + 1])} '
+                      f'is {addresses.distance_by_index(route[i], route[i + 1]):.1f}')
         print('\n')
 
 
+def print_route_reports(hub: 'Hub'):
+    """Prints the reports of all routes calculated by the anytime optimizer.
+
+    Routes are only calculated by the anytime optimizer if a time_budget is set in main.
+
+    Args:
+        hub: The hub to print the reports for.
+    """
+
+    print('Route Reports:')
+    for report in hub.route_reports:
+        print(report)
+    print('\n')
+
+
+def print_optimality_gaps(hub: 'Hub'):
+    """Prints the distance, lower bound, and optimality gap of the route of each truck waiting to be dispatched.
+
+    To use this function, it should be called after calculate_routes and before dispatch_trucks in main.
+
+    Args:
+        hub: The hub to print the optimality gaps for.
+    """
+
+    for truck_id, (distance, lower_bound, gap) in hub.optimality_gaps().items():
+        print(f'Truck {truck_id}: {distance:.1f} miles, lower bound {lower_bound:.1f} miles, gap {gap:.1%}')
+    print('\n')
+
+
+def print_route_cache(hub: 'Hub'):
+    """Prints the hit, miss, and eviction counts of the hub's route cache.
+
+    Args:
+        hub: The hub to print the route cache statistics for.
+    """
+
+    if hub.route_cache is None:
+        print('Route cache: disabled')
+    else:
+        print(hub.route_cache)
+    print('\n')
+
+
 def calculate_on_time_delivery(hub: 'Hub'):
     """Prints whether all packages were delivered on time or if some were late.
 
@@ -196,6 +232,206 @@ def print_bound_packages(hub: 'Hub'):
     print('\n')
 
 
+def check_hashtable(num_operations: int = 5000, seed: int = 0):
+    """Checks that package.Hashtable behaves the same as a dict keyed by package ID.
+
+    Random insertions, replacements, deletions, and lookups are applied to a small hashtable, so that it resizes and
+    reuses deleted slots several times, and to a dict. After every operation, the sizes, membership, and looked up
+    packages must agree, and iterating over the hashtable must give the packages of the dict in order of ID.
+
+    Args:
+        num_operations: The number of random operations to apply.
+        seed: The seed for the random operations.
+    """
+
+    rng = random.Random(seed)
+    store = package_module.PackageStore()
+    table = package_module.Hashtable(1)
+    expected = {}
+    failures = 0
+    for _ in range(num_operations):
+        package_id = rng.randint(1, 300)
+        operation = rng.random()
+        if operation < 0.5:
+            new_package = package_module.Package(package_id, '1 Main St', 'Salt Lake City', 'UT', '84101', 'EOD', 1.0,
+                                                 '', store=store)
+            table.insert(new_package)
+            expected[package_id] = new_package
+        elif operation < 0.8:
+            try:
+                removed = table.delete(package_id)
+            except KeyError:
+                removed = None
+            if removed is not expected.pop(package_id, None):
+                failures += 1
+        if len(table) != len(expected) or (package_id in table) != (package_id in expected) or \
+                table.search(package_id) is not expected.get(package_id):
+            failures += 1
+    if [package.package_id for package in table] != sorted(expected) or \
+            any(package is not expected[package.package_id] for package in table):
+        failures += 1
+    if failures:
+        print(f'The hashtable disagreed with a dict {failures} times in {num_operations} operations.')
+    else:
+        print(f'The hashtable agreed with a dict through all {num_operations} operations, ending with a capacity of '
+              f'{table.capacity} slots.')
+    print('\n')
+
+
+def check_two_opt(hub: 'Hub', num_routes: int = 20, seed: int = 0):
+    """Checks that routing.two_opt, which scores each move from the edges it changes, agrees with summing whole routes.
+
+    Random routes through the hub's addresses are optimized with two_opt without neighbor lists. The improvement it
+    reports must match the difference in the distances of the whole routes, and no segment reversal scored by summing
+    the whole reversed route may make the optimized route any shorter.
+
+    Args:
+        hub: The hub whose addresses are used.
+        num_routes: The number of random routes to check.
+        seed: The seed for the random routes.
+    """
+
+    addresses = hub.addresses
+    rng = random.Random(seed)
+    others = [index for index in range(len(addresses.distance_matrix)) if index != addresses.hub_index]
+    neighbor_lists, addresses.neighbor_lists = addresses.neighbor_lists, None
+    failures = 0
+    try:
+        for _ in range(num_routes):
+            stops = rng.sample(others, rng.randint(2, min(len(others), 20)))
+            route = array('i', [addresses.hub_index] + stops + [addresses.hub_index])
+            before = routing.calculate_route_distance(hub, route)
+            improvement = routing.two_opt(addresses, route)
+            after = routing.calculate_route_distance(hub, route)
+            if abs(before - after - improvement) > 1e-6:
+                failures += 1
+                continue
+            for i in range(1, len(route) - 1):
+                for j in range(i + 1, len(route) - 1):
+                    reversed_route = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                    if routing.calculate_route_distance(hub, reversed_route) < after - 1e-6:
+                        failures += 1
+                        break
+                else:
+                    continue
+                break
+    finally:
+        addresses.neighbor_lists = neighbor_lists
+    if failures:
+        print(f'two_opt disagreed with whole route distances on {failures} of {num_routes} routes.')
+    else:
+        print(f'two_opt agreed with whole route distances on all {num_routes} routes.')
+    print('\n')
+
+
+def check_nearest_neighbor_lists(hub: 'Hub', num_neighbors: int = 3, num_routes: int = 50, seed: int = 0):
+    """Checks that nearest neighbor routes built with neighbor lists are the same as routes built by full scans.
+
+    Random sets of stops are ordered by routing.nearest_neighbor_order with short neighbor lists, so that the search
+    often falls back to scanning every stop, and again without neighbor lists. If the distance matrix is a NumPy
+    array, they are also ordered by routing.nearest_neighbor_order_vectorized. The hub's neighbor lists are restored
+    afterwards.
+
+    Args:
+        hub: The hub whose addresses are used.
+        num_neighbors: The length of the neighbor lists built for the check.
+        num_routes: The number of random sets of stops to check.
+        seed: The seed for the random sets of stops.
+    """
+
+    addresses = hub.addresses
+    rng = random.Random(seed)
+    num_addresses = len(addresses.distance_matrix)
+    vectorized = routing.numpy is not None and isinstance(addresses.distance_matrix, routing.numpy.ndarray)
+    neighbor_lists = addresses.neighbor_lists
+    addresses.build_neighbor_lists(num_neighbors)
+    short_lists = addresses.neighbor_lists
+    failures = 0
+    try:
+        for _ in range(num_routes):
+            start = rng.randrange(num_addresses)
+            stops = rng.sample([index for index in range(num_addresses) if index != start],
+                               rng.randint(1, num_addresses - 1))
+            addresses.neighbor_lists = None
+            full_scan = routing.nearest_neighbor_order(addresses, start, stops[:])
+            addresses.neighbor_lists = short_lists
+            with_lists = routing.nearest_neighbor_order(addresses, start, stops[:])
+            if with_lists != full_scan or \
+                    vectorized and routing.nearest_neighbor_order_vectorized(addresses, start, stops[:]) != full_scan:
+                failures += 1
+    finally:
+        addresses.neighbor_lists = neighbor_lists
+    if failures:
+        print(f'Nearest neighbor routes differed from full scans for {failures} of {num_routes} sets of stops.')
+    else:
+        print(f'Nearest neighbor routes matched full scans for all {num_routes} sets of stops.')
+    print('\n')
+
+
+def check_parallel_routes(hub: 'Hub', workers: int = 2):
+    """Checks that calculating routes in worker processes gives the same routes as calculating them serially.
+
+    To use this function, it should be called after load_trucks and before calculate_routes in the hub file
+    ("tests.check_parallel_routes(self)"). The route of each truck waiting to be dispatched is calculated with
+    routing.calculate_route and then with parallel.calculate_routes without restarts, and the routes are compared. The
+    route cache is not used, so that both calculate every route.
+
+    Args:
+        hub: The hub whose loaded trucks are routed.
+        workers: The number of worker processes.
+    """
+
+    trucks = [truck for truck in hub.trucks.all_trucks if truck.is_at_hub and truck.is_ready_for_dispatch]
+    if not trucks:
+        print('No trucks are waiting to be dispatched.\n')
+        return
+    route_cache, hub.route_cache = hub.route_cache, None
+    try:
+        serial_routes = {}
+        for truck in trucks:
+            routing.calculate_route(truck)
+            serial_routes[truck.truck_id] = (list(truck.priority_route), list(truck.standard_route))
+        parallel.calculate_routes(hub, trucks, workers)
+    finally:
+        hub.route_cache = route_cache
+    different = [truck.truck_id for truck in trucks
+                 if (list(truck.priority_route), list(truck.standard_route)) != serial_routes[truck.truck_id]]
+    if different:
+        print(f'Parallel routes differed from serial routes for trucks {different}.')
+    else:
+        print(f'Parallel routes matched serial routes for all {len(trucks)} trucks.')
+    print('\n')
+
+
+def check_scan_replay(hub: 'Hub', scan_file: str = 'data/WGUPS Scan File.csv'):
+    """Checks that checking in a scan file again does not change any package.
+
+    To check a replay in the middle of the day, it can be scheduled in main as a simulation event, for example
+    "simulation.schedule(datetime.time(hour=10, minute=21), simulation_module.CHECK_IN, tests.check_scan_replay,
+    slc_hub)". The status, number of event log records, and readiness for dispatch of every package are compared
+    before and after the scans are checked in again, and the number of scans applied must be zero.
+
+    Args:
+        hub: The hub whose packages were checked in from the scan file.
+        scan_file: The scan file that was checked in.
+    """
+
+    def snapshot() -> dict[int, tuple[int, int, bool]]:
+        return {package.package_id: (package.status_code, len(package.events()),
+                                     package in hub.packages_ready_for_dispatch)
+                for package in hub.packages.get_all_packages()}
+
+    before = snapshot()
+    num_applied = hub.check_in_packages(scan_file)
+    after = snapshot()
+    changed = [package_id for package_id in before if before[package_id] != after[package_id]]
+    if num_applied or changed:
+        print(f'Replaying the scan file applied {num_applied} scans and changed packages {changed}.')
+    else:
+        print('Replaying the scan file changed no packages.')
+    print('\n')
+
+
 def print_all_tests(hub: 'Hub'):
     """Prints all tests except print_package_manifests and print_routes, which must be called from elsewhere.
 
@@ -210,4 +446,8 @@ def print_all_tests(hub: 'Hub'):
     print_packages_by_delivery_groups(hub)
     print_all_packages(hub)
     calculate_on_time_delivery(hub)
+    check_hashtable()
+    check_two_opt(hub)
+    check_nearest_neighbor_lists(hub)
+    check_scan_replay(hub)
     print('\n')
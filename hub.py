@@ -13,18 +13,27 @@ Typical usage example:
     hub.dispatch_trucks()
 """
 
-from typing import TYPE_CHECKING, Optional
+import csv
+import datetime
+import logging
+import os
+from time import perf_counter
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Union
 
 import routing
+import parallel
 import address as address_module
 import package as package_module
 import truck as truck_module
 
 if TYPE_CHECKING:
     from package import Package
+    from routing import RouteReport
     from truck import Truck
     from datetime import time
 
+logger = logging.getLogger(__name__)
+
 
 class Hub:
     """A delivery hub for managing packages, addresses, and trucks assigned to the hub.
@@ -33,12 +42,29 @@ class Hub:
             addresses: Stores the AddressCollection associated with the hub.
             trucks: Stores the TruckCollection associated with the hub.
             packages_ready_for_dispatch: The packages that have been checked in and have a ready for dispatch status
-              code.
+              code. This is the packages set of dispatch_index and should only be changed through the hub's methods.
+            dispatch_index: Indexes of the packages that are ready for dispatch by address, priority, truck
+              restriction, and binding, which the loading methods read instead of grouping every ready package.
             hub_address: The address of the hub.
+            extended_local_search: Whether routes are improved with Or-opt and 3-opt moves after the two-opt
+              algorithm.
+            held_karp_max_stops: The largest number of priority or standard addresses on a truck for which the exact
+              Held-Karp algorithm is used to calculate its route instead of the heuristic algorithms.
+            savings_loading: Whether load_trucks loads all ready trucks together with load_trucks_savings instead of
+              filling one truck at a time.
+            inter_route_search: Whether calculate_routes moves stops between the trucks being routed together when that
+              shortens their combined routes.
+            deadline_aware_routing: Whether routes are reordered to be as short as possible while meeting every
+              package deadline, instead of delivering every priority address first.
+            import_report: The report of the import of the package file, including the rows imported per second.
+            route_reports: The reports of every route calculated by the anytime optimizer.
+            route_cache: The cache of routes calculated by routing.calculate_route. It is persisted in the cache
+              directory if one is provided. Set to None to always calculate routes.
     """
 
     def __init__(self, package_file: str, address_file: str, distance_file: str, num_trucks: int,
-                 package_capacity_per_truck: int, average_truck_speed: float, num_packages: Optional[int]):
+                 package_capacity_per_truck: int, average_truck_speed: float, num_packages: Optional[int],
+                 cache_dir: Optional[str] = None, import_workers: int = 1):
         """Initializes Hub.
         Args:
             package_file: The path to the CSV file containing packages.
@@ -48,26 +74,41 @@ class Hub:
             num_trucks: The number of operational trucks assigned to hub.
             package_capacity_per_truck: The number of packages each truck can hold.
             average_truck_speed: The average speed of the truck, including loading time and delivery time.
+            cache_dir: Optional - the directory used to cache the optimized distance matrix and calculated routes
+              between runs.
+            import_workers: Optional - the number of worker processes that parse the package file. With one worker,
+              the file is parsed in the current process.
 
         Time complexity: O(n^3), where n is the number of items in the address file, due to the operations required
-        to optimize the distance matrix.
+        to optimize the distance matrix. O(n^2) if the distance matrix is loaded from the cache.
 
         Space complexity: O(n^2), where n is the number of items in the address file, due to the space required to
         store the distance matrix, which is an n x n list.
         """
 
-        #  Import data and assign to hub.
+        #  Import data and assign to hub. Addresses are imported first so that each package can store the index of
+        #  its address.
+        self.addresses = address_module.AddressCollection()
+        self.addresses.import_data(address_file, distance_file, cache_dir)
         if num_packages:
             self.packages = package_module.PackageCollection(num_packages)
         else:
             self.packages = package_module.PackageCollection(None)
-        self.packages.import_packages(package_file)
-        self.addresses = address_module.AddressCollection()
-        self.addresses.import_addresses(address_file)
-        self.addresses.import_distances(distance_file)
+        self.import_report = self.packages.import_packages(package_file, self.addresses, import_workers)
         self.trucks = truck_module.TruckCollection()
-        self.packages_ready_for_dispatch = set()
+        self.dispatch_index = package_module.DispatchIndex(self.packages.bound_packages)
+        self.packages_ready_for_dispatch = self.dispatch_index.packages
         self.hub_address = self.addresses.hub_address
+        self.extended_local_search = False
+        self.held_karp_max_stops = 12
+        self.savings_loading = False
+        self.inter_route_search = False
+        self.deadline_aware_routing = False
+        self.route_reports: list['RouteReport'] = []
+        route_cache_file = None
+        if cache_dir:
+            route_cache_file = os.path.join(cache_dir, f'routes-{self.addresses.data_hash}.json')
+        self.route_cache: Optional[routing.RouteCache] = routing.RouteCache(file=route_cache_file)
 
         #  Create number of Truck objects specified in constructor.
         for i in range(num_trucks):
@@ -89,16 +130,73 @@ class Hub:
         """
 
         package = self.packages.search(package_id)
+        package.mark_package_checked_in(time_scanned)
         if status_override:
-            package.set_status(status_override)
-        elif self.addresses.address_is_valid(package.address):
-            package.set_status(1)
-            self.packages_ready_for_dispatch.add(package)
+            package.set_status(status_override, time_changed=time_scanned)
+        elif package.address_index is not None:
+            package.set_status(1, time_changed=time_scanned)
+            self.dispatch_index.add(package)
         else:
-            package.set_status(5)
-        package.mark_package_checked_in(time_scanned)
+            package.set_status(5, time_changed=time_scanned)
+
+    def check_in_packages(self, scans: Union[str, Iterable[tuple['time', int, Optional[int]]]]) -> int:
+        """Checks in a batch of scanned packages and updates their statuses and the dispatch indexes in one pass.
+
+        Each scan is applied as check_in_package would apply it, except that scanning is idempotent: a scan that is
+        not later than the latest status change of a checked in package, or that would leave it with the status it
+        already has, is skipped and does not change its check-in time, so a scan file can be replayed at any point in
+        the day. Scans of packages that have already been loaded or delivered are ignored. Addresses are not looked up
+        again, since the address index of each package is resolved when the packages are imported.
+
+        Args:
+            scans: The scans as (time scanned, package ID, status override) tuples, where the status override may be
+              None, or the path to a scan file in the format read by read_scan_file.
+
+        Returns:
+            The number of scans that changed the status of a package.
+
+        Raises:
+            KeyError: If a scan is for a package ID that is not in the package collection. The scans before it are
+              applied.
+
+        Time complexity: O(n), where n is the number of scans.
 
-    def correct_package_address(self, package_id: int, street: str, city: str, state: str, zipcode: str):
+        Space complexity: O(1), since scan files are read one row at a time.
+        """
+
+        if isinstance(scans, str):
+            scans = read_scan_file(scans)
+        search = self.packages.search
+        dispatch_index = self.dispatch_index
+        num_checked_in = 0
+        for time_scanned, package_id, status_override in scans:
+            package = search(package_id)
+            if package is None:
+                raise KeyError(f'No package with ID {package_id} to check in.')
+            if 2 <= package.status_code <= 4:  # Loaded, out for delivery, or delivered.
+                continue
+            if package.time_checked_in is not None:
+                # Replaying an earlier scan must not undo later changes, such as an address correction.
+                time_last_changed = package.time_last_changed
+                if time_last_changed is None or time_scanned <= time_last_changed:
+                    continue
+            if status_override:
+                status_code = status_override
+            else:
+                status_code = 1 if package.address_index is not None else 5
+            if package.time_checked_in is not None and package.status_code == status_code:
+                continue
+            package.mark_package_checked_in(time_scanned)
+            package.set_status(status_code, time_changed=time_scanned)
+            if status_code == 1 and not status_override:
+                dispatch_index.add(package)
+            else:
+                dispatch_index.discard(package)
+            num_checked_in += 1
+        return num_checked_in
+
+    def correct_package_address(self, package_id: int, street: str, city: str, state: str, zipcode: str,
+                                time_corrected: Optional['time'] = None):
         """Corrects a package's address and updates its status.
 
         Args:
@@ -107,18 +205,55 @@ class Hub:
             city: The city name.
             state: The state abbreviation.
             zipcode: Zipcode.
+            time_corrected: Optional - the time the address was corrected, which is recorded in the package's event
+              log.
 
         Time complexity: O(1) since a hashtable is used in the search function.
         """
 
         package = self.packages.search(package_id)
+        # Remove the package from the indexes while its address changes, since it is indexed by its address.
+        self.dispatch_index.discard(package)
         package.update_address(street, city, state, zipcode)
-        package.set_status(1)
-        self.packages_ready_for_dispatch.add(package)
+        package.address_index = self.addresses.index_of(package.address)
+        package.set_status(1, time_changed=time_corrected)
+        self.dispatch_index.add(package)
+
+    def set_truck_restriction(self, package_id: int, truck_id: int):
+        """Restricts a package to a truck and updates the dispatch indexes if the package is ready for dispatch.
+
+        Args:
+            package_id: The ID of the package.
+            truck_id: The ID of the truck the package must be loaded on.
+
+        Time complexity: O(1).
+        """
+
+        package = self.packages.search(package_id)
+        package.set_truck_restriction(truck_id)
+        self.dispatch_index.update(package)
+
+    def bind_packages(self, package_ids: set[int]):
+        """Binds packages so they are loaded on the same truck and updates the dispatch indexes.
+
+        Args:
+            package_ids: The IDs of the packages to bind.
+
+        Time complexity: O(n), where n is the number of packages being bound.
+        """
+
+        self.packages.set_package_binding(package_ids)
+        for package_id in package_ids:
+            self.dispatch_index.update(self.packages.search(package_id))
 
     def load_trucks(self):
         """Determines packages to be loaded onto trucks based on delivery priority and package constraints.
 
+        If savings_loading is enabled, load_trucks_savings is used instead, unless the routes it builds would make a
+        delivery late, in which case the trucks are loaded one at a time as usual.
+
+        The delivery groups of each truck are read from dispatch_index, so the ready packages are not grouped by address
+        again for every truck.
 
         Time complexity: O(n^2), where n is the number of packages being considered for loading, since nested for loops
         are utilized in the loading logic.
@@ -126,11 +261,16 @@ class Hub:
         Space complexity: O(n), where n is the number of packages to be loaded onto the truck.
         """
 
+        if self.savings_loading and self.load_trucks_savings():
+            return
+
         for truck in self.trucks.all_trucks:
             # Call each method that determines packages to be loaded as long as the truck is ready for dispatch and
             # has capacity.
             if truck.is_at_hub and truck.is_ready_for_dispatch and truck.remaining_capacity > 0:
-                delivery_group_dict = routing.generate_delivery_group_dict(self.packages_ready_for_dispatch)
+                # The values are the live sets of the index, so packages leave them as they are loaded.
+                delivery_group_dict = {address: self.dispatch_index.by_address[address]
+                                       for address in self.dispatch_index.group_addresses}
                 self.load_priority_packages(truck, delivery_group_dict, priority_num=1)
                 if truck.remaining_capacity > 0:
                     self.load_priority_packages(truck, delivery_group_dict, priority_num=2)
@@ -140,20 +280,180 @@ class Hub:
                     self.load_bound_packages(truck)
                 if truck.remaining_capacity > 0:
                     self.load_single_packages(truck)
+                self.generate_manifests(truck)
+
+    def generate_manifests(self, truck: 'Truck'):
+        """Generates the priority and standard manifests of a truck from the packages loaded on it.
+
+        Args:
+            truck: The truck to generate the manifests for.
+
+        Time complexity: O(n), where n is the number of packages on the truck.
+
+        Space complexity: O(n), where n is the number of packages on the truck.
+        """
 
-                # Make a copy of the packages_on_truck set and use it to generate priority and standard manifests. A
-                # copy is made so that it can be modified without affecting the set that is attached to the truck.
-                packages_on_truck = truck.packages_on_truck.copy()
-                priority_manifest = routing.generate_priority_dict(packages_on_truck)
-                # Remove packages that were added to the priority manifest so the remaining packages can be added to
-                # the standard manifest.
-                for address, packages in priority_manifest.items():
-                    for package in packages:
-                        packages_on_truck.remove(package)
-                standard_manifest = routing.generate_address_dict(packages_on_truck)
+        # Make a copy of the packages_on_truck set and use it to generate priority and standard manifests. A copy is
+        # made so that it can be modified without affecting the set that is attached to the truck.
+        packages_on_truck = truck.packages_on_truck.copy()
+        priority_manifest = routing.generate_priority_dict(packages_on_truck)
+        # Remove packages that were added to the priority manifest so the remaining packages can be added to the
+        # standard manifest.
+        for address, packages in priority_manifest.items():
+            for package in packages:
+                packages_on_truck.remove(package)
+        standard_manifest = routing.generate_address_dict(packages_on_truck, by_index=True)
+
+        truck.priority_package_manifest = priority_manifest
+        truck.standard_package_manifest = standard_manifest
+
+    def load_trucks_savings(self) -> bool:
+        """Loads all trucks that are ready for dispatch together, using the Clarke-Wright savings algorithm.
+
+        Unlike load_trucks, which fills one truck at a time, this groups the packages that are ready for dispatch into
+        one route per truck based on the distances between their addresses. All packages for an address are loaded on
+        the same truck, which keeps delivery groups together. Before the savings algorithm runs, the addresses of bound
+        packages are joined into one unit, as are the addresses of the packages restricted to each truck. Bound
+        packages are held back until all of them are ready for dispatch, and packages restricted to a truck are only
+        loaded on that truck. If there are more routes than trucks, the
+        routes with the most urgent priority are loaded first and the remaining packages wait for the next dispatch.
+
+        The savings algorithm does not consider deadlines, so the routes are checked before anything is loaded. If a
+        route with a package that has a deadline is left for a later dispatch, or a truck would reach an address after
+        the deadline of one of its packages, nothing is loaded so that the trucks can be loaded one at a time instead.
 
-                truck.priority_package_manifest = priority_manifest
-                truck.standard_package_manifest = standard_manifest
+        Returns:
+            True if the trucks were loaded, False if the routes would make a delivery late and nothing was loaded.
+
+        Time complexity: O(n^2 log n), where n is the number of addresses of the packages ready for dispatch, due to
+        the savings algorithm.
+
+        Space complexity: O(n^2), where n is the number of addresses of the packages ready for dispatch.
+        """
+
+        trucks = [truck for truck in self.trucks.all_trucks
+                  if truck.is_at_hub and truck.is_ready_for_dispatch and truck.remaining_capacity > 0]
+        if not trucks:
+            return True
+        capacity = min(truck.remaining_capacity for truck in trucks)
+        truck_ids = {truck.truck_id for truck in trucks}
+
+        # Hold back bound packages unless all of them can be loaded together.
+        index = self.dispatch_index
+        ready_packages = {package for package in index.packages if package.address_index is not None}
+        bound_packages = self.packages.bound_packages
+        if len(index.bound) < len(bound_packages):
+            ready_packages -= bound_packages
+        packages_by_address = routing.generate_address_dict(ready_packages, by_index=True)
+
+        # Group addresses into units that must be loaded on the same truck. Each address starts as a unit of its own.
+        # The addresses of bound packages are joined into one unit, and so are the addresses of the packages
+        # restricted to each truck, which keeps the savings algorithm from building several routes for one truck.
+        unit_of = {address: address for address in packages_by_address}
+        joined_groups = [{package.address_index for package in index.bound if package in ready_packages}]
+        for truck_id in truck_ids:
+            joined_groups.append({package.address_index for package in index.by_restriction.get(truck_id, ())
+                                  if package in ready_packages})
+        for group in joined_groups:
+            joined_units = {unit_of[address] for address in group}
+            if len(joined_units) > 1:
+                target = min(joined_units)
+                for address, unit in unit_of.items():
+                    if unit in joined_units:
+                        unit_of[address] = target
+        addresses_by_unit: dict[int, list[int]] = {}
+        for address, unit in unit_of.items():
+            addresses_by_unit.setdefault(unit, []).append(address)
+        unit_addresses = [routing.nearest_neighbor_order(self.addresses, self.addresses.hub_index, addresses)
+                          for addresses in addresses_by_unit.values()]
+
+        units, loads, restrictions = [], [], []
+        for addresses in unit_addresses:
+            unit_packages = [package for address in addresses for package in packages_by_address[address]]
+            unit_restrictions = {package.truck_restriction for package in unit_packages if package.truck_restriction}
+            # Skip units that cannot be loaded on any available truck during this dispatch.
+            if len(unit_packages) > capacity or len(unit_restrictions) > 1 or not unit_restrictions <= truck_ids:
+                continue
+            units.append(addresses)
+            loads.append(len(unit_packages))
+            restrictions.append(next(iter(unit_restrictions), None))
+
+        routes = routing.clarke_wright_savings(self.addresses, units, loads, restrictions, capacity)
+
+        # Rank routes by the most urgent priority of their packages, then by the number of priority packages on them,
+        # and then by the number of packages on them.
+        def route_rank(route: tuple[list[int], list[int]]) -> tuple[int, int, int]:
+            route_packages = [package for address in route[0] for package in packages_by_address[address]]
+            return (min(package.priority or 3 for package in route_packages),
+                    -sum(1 for package in route_packages if package.priority), -len(route_packages))
+
+        routes.sort(key=route_rank)
+        trucks_by_id = {truck.truck_id: truck for truck in trucks}
+        route_restrictions = [next((restrictions[unit] for unit in units if restrictions[unit]), None)
+                              for _, units in routes]
+        assignments = []
+        for position, (route, restriction) in enumerate(zip(routes, route_restrictions)):
+            if restriction:
+                truck = trucks_by_id.pop(restriction, None)
+            else:
+                # Prefer trucks that no lower ranked restricted route is waiting for.
+                reserved = set(route_restrictions[position + 1:])
+                free_ids = sorted(trucks_by_id, key=lambda truck_id: (truck_id in reserved, truck_id))
+                truck = trucks_by_id.pop(free_ids[0]) if free_ids else None
+            if truck:
+                assignments.append((truck, route))
+            elif any(package.deadline != 'EOD' for address in route[0] for package in packages_by_address[address]):
+                return False
+        for truck, route in assignments:
+            if not self.meets_deadlines(truck, route[0], packages_by_address):
+                return False
+
+        for truck, route in assignments:
+            packages_loaded = set()
+            for address in route[0]:
+                for package in packages_by_address[address]:
+                    truck.load_package(package)
+                    packages_loaded.add(package)
+                    self.packages.priority_1_packages.discard(package)
+                    self.packages.priority_2_packages.discard(package)
+            self.remove_from_dispatch_list(packages_loaded)
+        for truck in trucks:
+            self.generate_manifests(truck)
+        return True
+
+    def meets_deadlines(self, truck: 'Truck', stops: list[int], packages_by_address: dict[int, set['Package']]) -> bool:
+        """Checks whether a truck leaving now could deliver every package with a deadline at a set of stops on time.
+
+        The check follows the order calculate_route starts from, visiting the addresses with a deadline first in
+        nearest neighbor order.
+
+        Args:
+            truck: The truck that would deliver the packages. If its date_time is not set, every deadline is met.
+            stops: The indexes of the addresses the truck would visit.
+            packages_by_address: The packages for each address.
+
+        Returns:
+            True if every package with a deadline would be delivered by its deadline, False otherwise.
+
+        Time complexity: O(n^2), where n is the number of stops, due to the nearest neighbor ordering.
+        """
+
+        if truck.date_time is None:
+            return True
+        deadlines = {}
+        for address in stops:
+            for package in packages_by_address[address]:
+                if package.deadline != 'EOD':
+                    deadline = datetime.datetime.combine(truck.date_time.date(), package.deadline)
+                    deadlines[address] = min(deadlines.get(address, deadline), deadline)
+        miles = 0.0
+        previous = truck.current_address_index
+        for address in routing.nearest_neighbor_order(self.addresses, previous, list(deadlines)):
+            miles += self.addresses.distance_by_index(previous, address)
+            previous = address
+            if truck.date_time + datetime.timedelta(hours=miles / truck.speed) > deadlines[address]:
+                return False
+        return True
 
     def load_priority_packages(self, truck: 'Truck', delivery_group_dict: dict[str, set['Package']], priority_num: int):
         """Considers packages with a delivery deadline for loading onto the truck.
@@ -177,7 +477,7 @@ class Hub:
         elif priority_num == 2:
             priority_packages = self.packages.priority_2_packages
         if priority_packages:
-            packages_loaded = self.load_group_packages(truck, priority_packages, delivery_group_dict)
+            packages_loaded = self.load_group_packages(truck, priority_packages, delivery_group_dict, priority_num)
             for package in packages_loaded:
                 if package in priority_packages:
                     priority_packages.remove(package)
@@ -186,7 +486,7 @@ class Hub:
     #  whether that be priority 1 packages, priority 2 packages, or packages assigned to a delivery group, which is
     #  defined in terms of an address when a package shares this address with one or more other packages.
     def load_group_packages(self, truck: 'Truck', package_group: set['Package'],
-                            delivery_group_dict: dict[str, set['Package']]):
+                            delivery_group_dict: dict[str, set['Package']], priority_num: Optional[int] = None):
         """Considers a group of packages for loading onto the truck.
 
         "Group" in the context of this function name refers to any type of package group,
@@ -197,6 +497,8 @@ class Hub:
             truck: The truck being loaded.
             package_group: A set of packages to be considered for loading.
             delivery_group_dict: A dictionary containing each address that has multiple packages destined for it.
+            priority_num: Optional - the priority of the packages in the group, if it is a group of priority packages.
+              Only the ready packages of that priority in dispatch_index are considered as priority packages.
 
         Returns:
             A set containing the packages that were loaded.
@@ -216,7 +518,13 @@ class Hub:
         # Determine if any packages in the group that was passed in are priority packages that are not part of a
         # delivery group and not bound to other packages. If this is the case, load those packages unless they do not
         # have a ready for delivery status code or are restricted to a truck that is not the current truck being loaded.
-        for package in package_group:
+        # Only the ready priority packages in the dispatch index need to be checked, rather than the whole group. Set
+        # intersections iterate over the smaller set, so this takes time proportional to the smaller of the two.
+        by_priority = self.dispatch_index.by_priority
+        priorities = (priority_num,) if priority_num is not None else sorted(by_priority)
+        ready_priority_packages = [package for priority in priorities
+                                   for package in by_priority[priority] & package_group]
+        for package in ready_priority_packages:
             if package.priority and package.status_code == 1 and not package.delivery_group and \
                     package not in self.packages.bound_packages:
                 if package.truck_restriction and package.truck_restriction != truck.truck_id:
@@ -299,11 +607,10 @@ class Hub:
 
         bound_packages_loaded = set()
         bound_packages = self.packages.bound_packages
-        if len(bound_packages) > truck.remaining_capacity:
+        if len(bound_packages) > truck.remaining_capacity or len(self.dispatch_index.bound) < len(bound_packages):
             return
         for package in bound_packages:
-            if package.truck_restriction and package.truck_restriction != truck.truck_id or \
-                    package not in self.packages_ready_for_dispatch:
+            if package.truck_restriction and package.truck_restriction != truck.truck_id:
                 return
         for package in bound_packages:
             truck.load_package(package)
@@ -318,12 +625,14 @@ class Hub:
         Args:
             truck: The truck being loaded.
 
-        Time complexity: O(n), where n is the number of packages being considered for loading.
+        Time complexity: O(n), where n is the number of addresses with a single ready package, which are read from
+        dispatch_index.
 
         Space complexity: O(n), where n is the number of packages being loaded onto the truck.
         """
 
-        single_packages = routing.generate_single_package_delivery_set(self.packages_ready_for_dispatch)
+        index = self.dispatch_index
+        single_packages = {next(iter(index.by_address[address])) for address in index.single_addresses}
         packages_loaded = set()
         while truck.remaining_capacity > 0 and len(single_packages) > 0:
             package = next(iter(single_packages))
@@ -347,9 +656,9 @@ class Hub:
         Time complexity: O(n), where n is the number of packages to be removed.
         """
 
-        # Remove packages from the ready for dispatch set and from the delivery group dictionary if present.
+        # Remove packages from the dispatch indexes and from the delivery group dictionary if present.
         for package in packages:
-            self.packages_ready_for_dispatch.remove(package)
+            self.dispatch_index.remove(package)
             address = package.address
             if not delivery_group_dict:
                 continue
@@ -358,18 +667,202 @@ class Hub:
                 if package in packages:
                     packages.remove(package)
 
-    def calculate_routes(self):
+    def calculate_routes(self, time_budget: Optional[float] = None, max_iterations: Optional[int] = None,
+                         seed: Optional[int] = None, workers: Optional[int] = None, restarts: int = 0,
+                         target_gap: Optional[float] = None) -> list['RouteReport']:
         """Calculates routes for all trucks that have been loaded. Uses heuristic methods for optimizing routes.
 
+        If a time or iteration budget is provided, the routes are calculated with the anytime optimizer instead, which
+        returns the best route found within the budget. The time budget is shared evenly between the trucks being
+        routed, with any time a truck does not use passed on to the trucks after it.
+
+        If a number of workers is provided, the routes and any randomized restarts of them are calculated in a pool of
+        worker processes by parallel.calculate_routes, and the shortest route found for each truck is kept.
+
+        If a target_gap is provided, the optimizers stop improving a route once it is within that gap of the route's
+        lower bound. The gap of each route can be checked with optimality_gaps before the trucks are dispatched.
+
+        If inter_route_search is enabled, stops are then moved between the trucks by improve_routes_between_trucks.
+
+        If deadline_aware_routing is enabled, the route of every truck is finally reordered with routing.deadline_route,
+        whichever way it was calculated. The final distance of the truck's RouteReport is updated if it was reordered.
+
+        Args:
+            time_budget: Optional - the number of seconds that may be spent calculating all routes.
+            max_iterations: Optional - the number of moves the anytime optimizer may evaluate for each truck.
+            seed: Optional - the seed for the anytime optimizer's random number generator, for repeatable results.
+            workers: Optional - the number of worker processes to calculate routes in.
+            restarts: The number of randomized restarts for each truck. Only used if workers is provided.
+            target_gap: Optional - the optimality gap, as a fraction of the lower bound, at which to stop optimizing.
+
+        Returns:
+            A RouteReport for each truck routed by the anytime optimizer. The list is empty if no budget was provided.
+
         Time complexity: O(n^2), where n is the number of unique addresses of the packages loaded on the truck. This is
-        due to the use of the two-opt algorithm.
+        due to the use of the two-opt algorithm. With a budget, the time taken is bounded by the budget.
 
         Space complexity: O(n), where n is the number of unique addresses of the packages loaded on the truck.
         """
 
+        trucks = [truck for truck in self.trucks.all_trucks if truck.is_at_hub and truck.is_ready_for_dispatch]
+        if workers is not None:
+            reports = parallel.calculate_routes(self, trucks, workers, restarts, seed, time_budget, max_iterations,
+                                                target_gap)
+        elif time_budget is None and max_iterations is None:
+            reports = []
+            for truck in trucks:
+                routing.calculate_route(truck, target_gap)
+            if self.route_cache is not None:
+                try:
+                    self.route_cache.save()
+                except OSError as error:  # The cache is only an optimization, so the dispatch goes ahead.
+                    logger.warning('Could not save the route cache to %s: %s', self.route_cache.file, error)
+        else:
+            reports = []
+            deadline = None if time_budget is None else perf_counter() + time_budget
+            for i, truck in enumerate(trucks):
+                truck_budget = None
+                if deadline is not None:
+                    truck_budget = max(deadline - perf_counter(), 0.0) / (len(trucks) - i)
+                truck_seed = None if seed is None else seed + truck.truck_id
+                reports.append(routing.anytime_route(truck, truck_budget, max_iterations, truck_seed, target_gap))
+
+        if self.inter_route_search:
+            self.improve_routes_between_trucks(trucks)
+        if self.deadline_aware_routing:
+            reports_by_truck = {report.truck_id: report for report in reports}
+            for truck in trucks:
+                if routing.deadline_route(truck) and truck.truck_id in reports_by_truck:
+                    reports_by_truck[truck.truck_id].final_distance = routing.calculate_route_distance(
+                        self, truck.priority_route + truck.standard_route)
+        self.route_reports.extend(reports)
+        return reports
+
+    def optimality_gaps(self) -> dict[int, tuple[float, float, float]]:
+        """Calculates how far the calculated route of each truck waiting to be dispatched may be from optimal.
+
+        This must be called after calculate_routes and before dispatch_trucks, since routes are cleared when a truck
+        returns to the hub.
+
+        Returns:
+            A dictionary with the ID of each truck as keys, and tuples of the distance of its route, a lower bound on
+            the distance of the shortest route, and the optimality gap as a fraction of the lower bound as values.
+
+        Time complexity: See routing.route_lower_bound.
+        """
+
+        gaps = {}
         for truck in self.trucks.all_trucks:
-            if truck.is_at_hub and truck.is_ready_for_dispatch:
-                routing.calculate_route(truck)
+            if truck.is_at_hub and truck.is_ready_for_dispatch and truck.priority_route:
+                distance = routing.calculate_route_distance(self, truck.priority_route + truck.standard_route)
+                lower_bound = routing.truck_lower_bound(truck, distance)
+                gaps[truck.truck_id] = distance, lower_bound, routing.optimality_gap(distance, lower_bound)
+        return gaps
+
+    def improve_routes_between_trucks(self, trucks: list['Truck']) -> float:
+        """Moves stops between the routes of trucks dispatched together when that shortens their combined routes.
+
+        The routes are improved with routing.inter_route_search, after which the packages for each moved stop are
+        moved to the manifest of the truck that now visits it. The routes of the trucks that changed are then optimized
+        again on their own.
+
+        The search does not consider deadlines, so if the trucks' times are set, the moved routes are checked before
+        any package is moved. If a truck would reach an address later past the deadline of one of its packages than it
+        did before, which includes making an on-time route late, the routes are restored and no stops are moved. A route
+        optimized again afterwards is only kept if it is no later than the moved route.
+
+        Args:
+            trucks: The trucks dispatched together, whose routes have been calculated.
+
+        Returns:
+            The number of miles the combined routes were shortened by.
+
+        Time complexity: See routing.inter_route_search.
+
+        Space complexity: O(n), where n is the number of packages on the trucks.
+        """
+
+        check_deadlines = all(truck.date_time is not None for truck in trucks)
+        original_routes = [(truck.priority_route[:], truck.standard_route[:]) for truck in trucks]
+        if check_deadlines:
+            original_lateness = [self.route_lateness(truck) for truck in trucks]
+        improvement, moves = routing.inter_route_search(trucks, self.packages.bound_packages)
+        if not moves:
+            return improvement
+
+        # Follow each stop through the moves to find the truck it ends up on, since a stop may be moved more than once.
+        # A truck never visits the same address twice, so a stop is identified by its address and current truck.
+        final_trucks = {}
+        current_stops = {}
+        for address, source, target in moves:
+            original = current_stops.pop((address, source), source)
+            current_stops[(address, target)] = original
+            final_trucks[(address, original)] = target
+
+        if check_deadlines:
+            latest = [routing.delivery_deadlines(truck) for truck in trucks]
+            for (address, source), target in final_trucks.items():
+                if source != target:
+                    source_truck = trucks[source]
+                    packages = (source_truck.priority_package_manifest.get(address) or
+                                source_truck.standard_package_manifest[address])
+                    latest[target][address] = routing.latest_arrival(trucks[target], packages)
+            # Allow for rounding when comparing distances to deadlines.
+            if any(self.route_lateness(truck, latest[position]) > original_lateness[position] + 1e-9
+                   for position, truck in enumerate(trucks)):
+                for truck, (priority_route, standard_route) in zip(trucks, original_routes):
+                    truck.priority_route, truck.standard_route = priority_route, standard_route
+                return 0.0
+
+        # Unload every moved stop before loading any, so that no truck is over capacity partway through an exchange.
+        moved_stops = []
+        for (address, source), target in final_trucks.items():
+            if source == target:
+                continue
+            source_truck = trucks[source]
+            # Priority stops stay priority stops on the truck they are moved to, and standard stops stay standard.
+            is_priority = address in source_truck.priority_package_manifest
+            manifest = source_truck.priority_package_manifest if is_priority else source_truck.standard_package_manifest
+            packages = manifest.pop(address)
+            source_truck.packages_on_truck.difference_update(packages)
+            source_truck.num_packages_loaded = len(source_truck.packages_on_truck)
+            moved_stops.append((address, packages, is_priority, source, target))
+
+        changed_trucks = []
+        for address, packages, is_priority, source, target in moved_stops:
+            target_truck = trucks[target]
+            manifest = target_truck.priority_package_manifest if is_priority else target_truck.standard_package_manifest
+            manifest[address] = packages
+            for package in packages:
+                target_truck.load_package(package)
+            changed_trucks.extend(trucks[i] for i in (source, target) if trucks[i] not in changed_trucks)
+
+        for truck in changed_trucks:
+            moved_routes = truck.priority_route[:], truck.standard_route[:]
+            moved_lateness = self.route_lateness(truck) if check_deadlines else 0.0
+            routing.two_opt_priority(truck)
+            routing.two_opt_standard(truck)
+            if self.extended_local_search:
+                routing.local_search_priority(truck)
+                routing.local_search_standard(truck)
+            if check_deadlines and self.route_lateness(truck) > moved_lateness + 1e-9:
+                truck.priority_route, truck.standard_route = moved_routes
+        return improvement
+
+    def route_lateness(self, truck: 'Truck', latest: Optional[dict[int, float]] = None) -> float:
+        """Calculates how late a truck's calculated route reaches the address it is latest for.
+
+        Args:
+            truck: The truck whose route is checked. Its date_time must be set.
+            latest: Optional - the number of miles that may be driven before reaching each address with a deadline.
+              Defaults to the deadlines of the packages in the truck's manifests.
+
+        Returns: See routing.route_lateness.
+        """
+
+        if latest is None:
+            latest = routing.delivery_deadlines(truck)
+        return routing.route_lateness(self.addresses, truck.priority_route + truck.standard_route[1:], latest)
 
     def dispatch_trucks(self):
         """Dispatches trucks to deliver packages.
@@ -426,3 +919,40 @@ class Hub:
             print('Late Deliveries:')
             for package in late_deliveries:
                 print(package)
+
+
+def read_scan_file(file: str) -> Iterator[tuple['time', int, Optional[int]]]:
+    """Reads scan events from a CSV file one row at a time.
+
+    Each row holds the time a package was scanned in 24-hour H:MM or H:MM:SS format, the ID of the package, and an
+    optional status code that overrides the package's default status. A first row that does not start with a time is
+    treated as a header and skipped.
+
+    Args:
+        file: The path to the CSV file containing the scans.
+
+    Yields:
+        A (time scanned, package ID, status override) tuple for each scan, where the status override is None if the
+        column is empty or missing.
+
+    Raises:
+        ValueError: If a row does not contain a valid time or package ID.
+
+    Time complexity: O(n), where n is the number of rows in the file.
+
+    Space complexity: O(t), where t is the number of distinct scan times, which are parsed once each.
+    """
+
+    times: dict[str, datetime.time] = {}
+    with open(file, newline='') as scans:
+        for row_number, row in enumerate(csv.reader(scans)):
+            if not row or not row[0].strip():
+                continue
+            time_text = row[0].strip()
+            if row_number == 0 and not time_text[0].isdigit():
+                continue
+            time_scanned = times.get(time_text)
+            if time_scanned is None:
+                time_scanned = times[time_text] = datetime.time(*(int(part) for part in time_text.split(':')))
+            override = row[2].strip() if len(row) > 2 else ''
+            yield time_scanned, int(row[1]), int(override) if override else None
@@ -2,6 +2,7 @@ import datetime
 
 import ui
 import hub
+import simulation as simulation_module
 from dev import tests
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -11,38 +12,60 @@ from dev import tests
 package_data = 'data/WGUPS Package File.csv'
 address_data = 'data/WGUPS Address Table.csv'
 distance_data = 'data/WGUPS Distance Table.csv'
+# Packages scanned when they arrived at the hub during the day.
+scan_data = 'data/WGUPS Scan File.csv'
 num_packages = 40
+distance_cache_dir = 'cache'
+# Number of worker processes that parse the package file. Only worth raising for package files with many rows.
+package_import_workers = 1
 
 # Trucks:
 num_operational_trucks = 2
 truck_speed_MPH = 18
 package_capacity_per_truck = 16
 
+# Routing:
+extended_local_search = True
+held_karp_max_stops = 12
+# Load all ready trucks together with the Clarke-Wright savings algorithm instead of filling one truck at a time.
+savings_loading = False
+# Move stops between trucks dispatched together when that shortens their combined routes.
+inter_route_search = False
+# Reorder routes to be as short as possible while meeting every deadline, instead of delivering priority packages first.
+deadline_aware_routing = False
+# Number of nearest addresses kept for each address. When set, routes are only improved with moves that connect an
+# address to one of its nearest addresses, which keeps routing fast with many addresses. None considers every move.
+neighbor_list_size = None
+# Insert packages that arrive or have their address corrected while trucks are out into those trucks' routes.
+reroute_late_packages = False
+# Seconds that may be spent calculating routes for each dispatch. None runs the optimizers until they converge.
+route_time_budget = None
+
 # Incorrect Address Update Time:
 package_9_address_update_time = datetime.time(hour=10, minute=20)
 
 # Create Delivery Hub
 slc_hub = hub.Hub(package_data, address_data, distance_data, num_operational_trucks,
-                  package_capacity_per_truck, truck_speed_MPH, num_packages)
+                  package_capacity_per_truck, truck_speed_MPH, num_packages, distance_cache_dir,
+                  package_import_workers)
+slc_hub.extended_local_search = extended_local_search
+slc_hub.held_karp_max_stops = held_karp_max_stops
+slc_hub.savings_loading = savings_loading
+slc_hub.inter_route_search = inter_route_search
+slc_hub.deadline_aware_routing = deadline_aware_routing
+if neighbor_list_size:
+    slc_hub.addresses.build_neighbor_lists(neighbor_list_size)
 
 # ----------------------------------------------------------------------------------------------------------------------
 # Package Configuration:
 
-# Check in packages that have arrived at start of day
-time_scanned = datetime.datetime.strptime('7:00', '%H:%M').time()
-for i in range(1, 41):
-    if i not in (6, 9, 25, 28, 32):
-        slc_hub.check_in_package(time_scanned, i)
-    # Override the status of the package with the incorrect address.
-    slc_hub.check_in_package(time_scanned, 9, 5)
-
 # Set restriction for packages that can only go on truck 2
 for i in (3, 18, 36, 38):
-    slc_hub.packages.search(i).set_truck_restriction(2)
+    slc_hub.set_truck_restriction(i, 2)
 
 # Group of packages that must be delivered on same truck
 packages_to_bind = {13, 14, 15, 16, 19, 20}
-slc_hub.packages.set_package_binding(packages_to_bind)
+slc_hub.bind_packages(packages_to_bind)
 
 # ----------------------------------------------------------------------------------------------------------------------
 # Run Program:
@@ -51,38 +74,23 @@ slc_hub.packages.set_package_binding(packages_to_bind)
 truck1 = slc_hub.trucks.all_trucks[0]
 truck2 = slc_hub.trucks.all_trucks[1]
 
-# Dispatch first truck:
-truck1.set_route_start_time(hour=8, minute=0)
-truck1.is_ready_for_dispatch = True
-slc_hub.load_trucks()
-slc_hub.calculate_routes()
-slc_hub.dispatch_trucks()
-
-# Check in late packages:
-time_scanned = datetime.datetime.strptime('9:05', '%H:%M').time()
-for i in (6, 25, 28, 32):
-    slc_hub.check_in_package(time_scanned, i)
-
-# Dispatch second truck:
-truck2.set_route_start_time(hour=9, minute=5)
-truck2.is_ready_for_dispatch = True
-slc_hub.load_trucks()
-slc_hub.calculate_routes()
-slc_hub.dispatch_trucks()
-
-# Dispatch final truck after package 9 address is updated:
-
-# Set time of truck to package update time if truck returned to hub before update time:
-if truck2.current_time < package_9_address_update_time:
-    truck2.set_current_time(package_9_address_update_time)
-
-# Update package 9 address and status and dispatch final truck:
-slc_hub.correct_package_address(package_id=9, street='410 S STATE ST', city='SALT LAKE CITY', state='UT',
-                                zipcode='84111')
-truck2.is_ready_for_dispatch = True
-slc_hub.load_trucks()
-slc_hub.calculate_routes()
-slc_hub.dispatch_trucks()
+# The trucks, package scans, and address correction all advance on the simulation's clock.
+simulation = simulation_module.Simulation(slc_hub, route_time_budget, reroute=reroute_late_packages)
+
+# Check in packages as they are scanned at the hub. The scan file overrides the status of the package with the
+# incorrect address, and the delayed packages are scanned at 9:05.
+simulation.schedule_check_ins(scan_data)
+
+# Dispatch first truck, and dispatch second truck once the delayed packages have arrived:
+simulation.schedule_dispatch(datetime.time(hour=8, minute=0), truck1)
+simulation.schedule_dispatch(datetime.time(hour=9, minute=5), truck2)
+
+# Update package 9 address and dispatch the second truck again once it has returned to the hub:
+simulation.schedule_address_correction(package_9_address_update_time, package_id=9, street='410 S STATE ST',
+                                       city='SALT LAKE CITY', state='UT', zipcode='84111')
+simulation.schedule_dispatch(package_9_address_update_time, truck2)
+
+simulation.run()
 
 # ----------------------------------------------------------------------------------------------------------------------
 # Tests - uncomment to run - prints out various data structures and information to confirm functionality:
@@ -1,25 +1,373 @@
 """A module for managing packages.
 
-This module contains classes for representing packages, storing them in a hashtable, and keeping track of a collection
-of packages. This includes functionality for importing packages from a CSV file.
+This module contains classes for representing packages, storing their attributes in columns, storing them in a
+hashtable, and keeping track of a collection of packages. This includes functionality for importing packages from a
+CSV file.
 """
 
+import array
+import bisect
 import csv
 import datetime
-import copy
-from typing import Optional, TYPE_CHECKING
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Hashable, Iterable, Iterator, Optional, TYPE_CHECKING, Union
 
+import address as address_module
 import routing
 
 if TYPE_CHECKING:
+    from address import AddressCollection
     from truck import Truck
     from datetime import time
 
 
+# The value stored in a column for an attribute that is None, or for a deadline of 'EOD'.
+MISSING = -1
+
+
+def _encode_time(value: Optional['time']) -> int:
+    """Converts a time of day to the number of microseconds after midnight, or MISSING if it is None."""
+
+    if value is None:
+        return MISSING
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1000000 + value.microsecond
+
+
+def _decode_time(micros: int) -> Optional['time']:
+    """Converts a number of microseconds after midnight to a time of day, or None if it is MISSING."""
+
+    if micros == MISSING:
+        return None
+    seconds, microsecond = divmod(micros, 1000000)
+    minutes, second = divmod(seconds, 60)
+    hour, minute = divmod(minutes, 60)
+    return datetime.time(hour, minute, second, microsecond)
+
+
+class PackageEventLog:
+    """An append-only log of the status changes of packages.
+
+    Each record holds the ID of the package, the time of the change, the status code the package changed to, and the
+    truck involved, in compact arrays. Each record also links to the previous record of the same package, so the
+    history of a package can be read without scanning the whole log. Records are never changed or removed.
+
+    Attributes:
+        package_ids: The ID of the package of each record.
+        times: The time of each record in microseconds after midnight, or MISSING if it is not known.
+        event_codes: The status code each record changed the package to.
+        truck_ids: The ID of the truck involved in each record, or MISSING.
+        previous: The index of the previous record of the same package, or MISSING.
+    """
+
+    def __init__(self):
+        """Initializes an empty PackageEventLog."""
+
+        self.package_ids = array.array('q')
+        self.times = array.array('q')
+        self.event_codes = array.array('b')
+        self.truck_ids = array.array('i')
+        self.previous = array.array('i')
+
+    def __len__(self) -> int:
+        """Returns the number of records in the log."""
+
+        return len(self.event_codes)
+
+    def append(self, package_id: int, event_code: int, time_micros: int = MISSING, truck_id: Optional[int] = None,
+               previous: int = MISSING) -> int:
+        """Adds a record to the end of the log.
+
+        Args:
+            package_id: The ID of the package.
+            event_code: The status code the package changed to.
+            time_micros: Optional - the time of the change in microseconds after midnight.
+            truck_id: Optional - the ID of the truck involved.
+            previous: Optional - the index of the previous record of the same package.
+
+        Returns: The index of the new record.
+
+        Time complexity: O(1) amortized.
+        """
+
+        self.package_ids.append(package_id)
+        self.times.append(time_micros)
+        self.event_codes.append(event_code)
+        self.truck_ids.append(MISSING if truck_id is None else truck_id)
+        self.previous.append(previous)
+        return len(self.event_codes) - 1
+
+    def chain(self, last: int) -> list[int]:
+        """Returns the indexes of the records of one package, oldest first.
+
+        Args:
+            last: The index of the package's latest record, or MISSING if it has none.
+
+        Time complexity: O(e), where e is the number of records of the package.
+        """
+
+        indexes = []
+        while last != MISSING:
+            indexes.append(last)
+            last = self.previous[last]
+        indexes.reverse()
+        return indexes
+
+
+class PackageStore:
+    """Stores the attributes of many packages in columns, with one row per package.
+
+    Numbers, times, and flags are kept in typed arrays. Times are stored as microseconds after midnight, and None is
+    stored as MISSING. Strings such as streets and cities repeat across packages, so each distinct string is stored
+    once and the columns hold its index. Every status change is appended to an event log, and each row holds the index
+    of its package's latest record in the log. The truck a package was last on and the times it was last loaded, sent
+    out, and delivered are also kept in columns, which are updated as records are appended, so they are read without
+    following the package's records. Package objects are views over one row of a store.
+
+    Attributes:
+        strings: Each distinct string used by the packages in the store.
+        package_ids, address_indexes, deadlines, masses, priorities, delivery_groups, truck_restrictions,
+        status_codes, ready_for_delivery, delivered_on_time, times_checked_in, streets, cities, states, zipcodes,
+        notes, last_events, trucks, times_loaded_on_truck, times_out_for_delivery, times_delivered: The columns, as
+          arrays with one value for each row. The status code, truck, and loaded, out for delivery, and delivered
+          times are those of the row's latest events, kept in columns so they can be read quickly.
+        events: The PackageEventLog of the status changes of the packages in the store.
+        custom_statuses: The status description of each row whose status was set to a custom string.
+        version: A number that increases whenever a row is added, a timestamp changes, or an event is logged.
+    """
+
+    # The name and type code of each column.
+    columns = (
+        ('package_ids', 'q'),
+        ('address_indexes', 'i'),
+        ('deadlines', 'q'),
+        ('masses', 'd'),
+        ('priorities', 'b'),
+        ('delivery_groups', 'i'),
+        ('truck_restrictions', 'i'),
+        ('status_codes', 'b'),
+        ('ready_for_delivery', 'b'),
+        ('delivered_on_time', 'b'),
+        ('times_checked_in', 'q'),
+        ('streets', 'i'),
+        ('cities', 'i'),
+        ('states', 'i'),
+        ('zipcodes', 'i'),
+        ('notes', 'i'),
+        ('last_events', 'i'),
+        ('trucks', 'i'),
+        ('times_loaded_on_truck', 'q'),
+        ('times_out_for_delivery', 'q'),
+        ('times_delivered', 'q'),
+    )
+    # The column holding the time of the latest event with each status code that has one.
+    event_time_columns = {2: 'times_loaded_on_truck', 3: 'times_out_for_delivery', 4: 'times_delivered'}
+
+    def __init__(self):
+        """Initializes an empty PackageStore."""
+
+        for name, type_code in self.columns:
+            setattr(self, name, array.array(type_code))
+        self.strings: list[str] = []
+        self._string_indexes: dict[str, int] = {}
+        self.events = PackageEventLog()
+        self.custom_statuses: dict[int, str] = {}
+        # Increases whenever a row is added, a timestamp changes, or an event is logged, so indexes over the history
+        # of the packages know to rebuild.
+        self.version = 0
+
+    def __len__(self) -> int:
+        """Returns the number of rows in the store."""
+
+        return len(self.package_ids)
+
+    def string_index(self, value: str) -> int:
+        """Returns the index of a string in the store's strings, adding it if it is not there yet.
+
+        Time complexity: O(1) on average.
+        """
+
+        index = self._string_indexes.get(value)
+        if index is None:
+            index = self._string_indexes[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def append(self, package_id: int, street: str, city: str, state: str, zipcode: str, deadline: Union[str, 'time'],
+               mass: float, notes: str, status_code: int = 0) -> int:
+        """Adds a row for a new package.
+
+        Args:
+            package_id: A unique identifier for a package.
+            street: A street number and name.
+            city: The city contained in the package's address.
+            state: The state abbreviation contained in the package's address.
+            zipcode: The zipcode contained in the package's address.
+            deadline: The delivery deadline of the package, either a time or 'EOD'.
+            mass: The mass of the package in kilograms.
+            notes: Notes concerning the package.
+            status_code: A number representing the status of the package.
+
+        Returns: The row of the new package.
+
+        Time complexity: O(1) amortized.
+        """
+
+        row = len(self.package_ids)
+        self.version += 1
+        self.package_ids.append(package_id)
+        self.address_indexes.append(MISSING)
+        self.deadlines.append(MISSING if deadline == 'EOD' else _encode_time(deadline))
+        self.masses.append(mass)
+        self.priorities.append(MISSING)
+        self.delivery_groups.append(MISSING)
+        self.truck_restrictions.append(MISSING)
+        self.status_codes.append(status_code)
+        self.ready_for_delivery.append(0)
+        self.delivered_on_time.append(MISSING)
+        self.times_checked_in.append(MISSING)
+        self.streets.append(self.string_index(street))
+        self.cities.append(self.string_index(city))
+        self.states.append(self.string_index(state))
+        self.zipcodes.append(self.string_index(zipcode))
+        self.notes.append(self.string_index(notes))
+        self.last_events.append(MISSING)
+        self.trucks.append(MISSING)
+        self.times_loaded_on_truck.append(MISSING)
+        self.times_out_for_delivery.append(MISSING)
+        self.times_delivered.append(MISSING)
+        return row
+
+    def extend(self, rows: list[tuple], address_indexes: Optional[list[int]] = None) -> range:
+        """Adds a row for each of many new packages, filling each column in one pass.
+
+        Args:
+            rows: The package ID, street, city, state, zipcode, deadline, mass, and notes of each package, in the order
+              of the arguments of append.
+            address_indexes: Optional - the index of the address of each package, or MISSING for unknown addresses.
+
+        Returns: The rows of the new packages.
+
+        Time complexity: O(n) amortized, where n is the number of new packages.
+        """
+
+        start = len(self.package_ids)
+        count = len(rows)
+        self.version += 1
+        string_index = self.string_index
+        self.package_ids.extend([row[0] for row in rows])
+        self.address_indexes.extend(address_indexes if address_indexes is not None else [MISSING] * count)
+        self.deadlines.extend([MISSING if row[5] == 'EOD' else _encode_time(row[5]) for row in rows])
+        self.masses.extend([row[6] for row in rows])
+        for name in ('priorities', 'delivery_groups', 'truck_restrictions', 'delivered_on_time', 'times_checked_in',
+                     'last_events', 'trucks', 'times_loaded_on_truck', 'times_out_for_delivery', 'times_delivered'):
+            getattr(self, name).extend([MISSING] * count)
+        self.status_codes.extend([0] * count)
+        self.ready_for_delivery.extend([0] * count)
+        self.streets.extend([string_index(row[1]) for row in rows])
+        self.cities.extend([string_index(row[2]) for row in rows])
+        self.states.extend([string_index(row[3]) for row in rows])
+        self.zipcodes.extend([string_index(row[4]) for row in rows])
+        self.notes.extend([string_index(row[7]) for row in rows])
+        return range(start, start + count)
+
+    def log_event(self, row: int, event_code: int, time_micros: int = MISSING, truck_id: Optional[int] = None):
+        """Appends a status change of a row's package to the event log and makes it the current status.
+
+        Loading, sending out, and delivering a package also update its truck column and the time column of the event.
+
+        Args:
+            row: The row of the package.
+            event_code: The status code the package changed to.
+            time_micros: Optional - the time of the change in microseconds after midnight.
+            truck_id: Optional - the ID of the truck involved.
+
+        Time complexity: O(1) amortized.
+        """
+
+        self.last_events[row] = self.events.append(self.package_ids[row], event_code, time_micros, truck_id,
+                                                   self.last_events[row])
+        self.status_codes[row] = event_code
+        time_column = self.event_time_columns.get(event_code)
+        if time_column is not None:
+            getattr(self, time_column)[row] = time_micros
+            self.trucks[row] = MISSING if truck_id is None else truck_id
+        self.version += 1
+
+    def copy_row(self, store: 'PackageStore', row: int) -> int:
+        """Adds a copy of a row from another store.
+
+        Args:
+            store: The store containing the row.
+            row: The row to copy.
+
+        Returns: The row of the copy in this store.
+        """
+
+        new_row = len(self.package_ids)
+        for name, _ in self.columns:
+            value = getattr(store, name)[row]
+            if name in ('streets', 'cities', 'states', 'zipcodes', 'notes'):
+                value = self.string_index(store.strings[value])
+            elif name == 'last_events':
+                value = MISSING
+                for event in store.events.chain(store.last_events[row]):
+                    value = self.events.append(store.events.package_ids[event], store.events.event_codes[event],
+                                               store.events.times[event], store.events.truck_ids[event], value)
+            getattr(self, name).append(value)
+        if row in store.custom_statuses:
+            self.custom_statuses[new_row] = store.custom_statuses[row]
+        return new_row
+
+
+def _optional_int_column(name: str) -> property:
+    """Creates a property for a Package that reads and writes an integer column that may hold None."""
+
+    def get(package: 'Package') -> Optional[int]:
+        value = getattr(package._store, name)[package._row]
+        return None if value == MISSING else value
+
+    def set_(package: 'Package', value: Optional[int]):
+        getattr(package._store, name)[package._row] = MISSING if value is None else value
+
+    return property(get, set_)
+
+
+def _time_column(name: str) -> property:
+    """Creates a property for a Package that reads and writes a time column that may hold None."""
+
+    def get(package: 'Package') -> Optional['time']:
+        return _decode_time(getattr(package._store, name)[package._row])
+
+    def set_(package: 'Package', value: Optional['time']):
+        store = package._store
+        getattr(store, name)[package._row] = _encode_time(value)
+        store.version += 1
+
+    return property(get, set_)
+
+
+def _string_column(name: str) -> property:
+    """Creates a property for a Package that reads and writes a string column."""
+
+    def get(package: 'Package') -> str:
+        store = package._store
+        return store.strings[getattr(store, name)[package._row]]
+
+    def set_(package: 'Package', value: str):
+        store = package._store
+        getattr(store, name)[package._row] = store.string_index(value)
+
+    return property(get, set_)
+
+
 class Package:
     """A class used to represent a package.
 
-    Contains methods for tracking a package's status and modifying its attributes.
+    Contains methods for tracking a package's status and modifying its attributes. A package is a view over one row
+    of a PackageStore, which holds its attributes, so each package only takes up the space of two references. Copies
+    of a package are given their own store, so changing a copy does not change the original.
 
     Attributes:
         status_codes: (class attribute) Maps status codes to their corresponding descriptions.
@@ -28,6 +376,8 @@ class Package:
         city: The city contained in the package's address.
         state: The state abbreviation contained in the package's address.
         zipcode: The zipcode contained in the package's address.
+        address_index: The index of the package's address in the hub's distance matrix, or None if the address is not
+          valid.
         deadline: The delivery deadline of the package.
         mass: The mass of the package in kilograms.
         notes: Notes concerning the package.
@@ -46,6 +396,8 @@ class Package:
         time_delivered: The time the package was delivered.
     """
 
+    __slots__ = ('_store', '_row')
+
     status_codes = {
         0: 'Not Yet Arrived',
         1: 'Ready For Dispatch',
@@ -55,8 +407,19 @@ class Package:
         5: 'Incorrect Address'
     }
 
+    address_index = _optional_int_column('address_indexes')
+    priority = _optional_int_column('priorities')
+    delivery_group = _optional_int_column('delivery_groups')
+    truck_restriction = _optional_int_column('truck_restrictions')
+    time_checked_in = _time_column('times_checked_in')
+    street = _string_column('streets')
+    city = _string_column('cities')
+    state = _string_column('states')
+    zipcode = _string_column('zipcodes')
+    notes = _string_column('notes')
+
     def __init__(self, package_id: int, address: str, city: str, state: str, zipcode: str, deadline: str,
-                 mass: float, notes: str, status_code: int = 0):
+                 mass: float, notes: str, status_code: int = 0, store: Optional[PackageStore] = None):
         """Initializes Package.
 
         Args:
@@ -69,28 +432,38 @@ class Package:
             mass: The mass of the package in kilograms.
             notes: Notes concerning the package.
             status_code: A number representing the status of the package.
+            store: Optional - the PackageStore to add the package to. A package without a store gets its own.
         """
 
-        self.package_id = package_id
-        self.street = address
-        self.city = city
-        self.state = state
-        self.zipcode = zipcode
-        self.deadline = deadline
-        self.mass = mass
-        self.notes = notes
-        self.truck_restriction = None
-        self.delivery_group = None
-        self.priority = None
-        self.status_code = status_code
-        self.status = self.status_codes.get(self.status_code)
-        self.ready_for_delivery = False
-        self.truck = None
-        self.delivered_on_time: Optional[bool] = None
-        self.time_checked_in = None
-        self.time_loaded_on_truck = None
-        self.time_out_for_delivery = None
-        self.time_delivered = None
+        self._store = store if store is not None else PackageStore()
+        self._row = self._store.append(package_id, address, city, state, zipcode, deadline, mass, notes, status_code)
+
+    @classmethod
+    def view(cls, store: PackageStore, row: int) -> 'Package':
+        """Creates a package for an existing row of a store.
+
+        Args:
+            store: The store containing the package.
+            row: The row of the package in the store.
+
+        Returns: A package that reads and writes the row.
+        """
+
+        package = cls.__new__(cls)
+        package._store = store
+        package._row = row
+        return package
+
+    def __copy__(self) -> 'Package':
+        """Returns a copy of the package with its own store."""
+
+        store = PackageStore()
+        return Package.view(store, store.copy_row(self._store, self._row))
+
+    def __deepcopy__(self, memo: dict) -> 'Package':
+        """Returns a copy of the package with its own store. A package holds no mutable objects other than its row."""
+
+        return self.__copy__()
 
     def __str__(self):
         """Returns a string with various attributes of the package.
@@ -99,9 +472,206 @@ class Package:
 
         """
 
+        return self.describe()
+
+    def describe(self, status: Optional[str] = None) -> str:
+        """Returns a string with various attributes of the package, with an optional status in place of its own.
+
+        Args:
+            status: Optional - the status to show, such as the status of the package at an earlier time.
+
+        Returns: A string containing the package ID, city, state, zipcode, mass, notes, delivery deadline, and status.
+        """
+
         return (f'ID: {self.package_id}, Address: {self.street}, City: {self.city}, State: {self.state}, '
                 f'Zip: {self.zipcode}, Mass(kg): {self.mass}, Notes: {self.notes}, '
-                f'Delivery Deadline: {self.deadline}, Status: {self.status}')
+                f'Delivery Deadline: {self.deadline}, Status: {status or self.status}')
+
+    def events(self) -> list[tuple[Optional['time'], int, Optional[int]]]:
+        """Returns the history of the package from its records in the event log.
+
+        Returns: A list of (time, status code, truck ID) tuples, oldest first. The time or truck ID is None if it was
+        not recorded.
+
+        Time complexity: O(e), where e is the number of events of the package.
+        """
+
+        log = self._store.events
+        return [(_decode_time(log.times[event]), log.event_codes[event],
+                 None if log.truck_ids[event] == MISSING else log.truck_ids[event])
+                for event in log.chain(self._store.last_events[self._row])]
+
+    def _latest_event(self, micros: int) -> int:
+        """Finds the latest record of the package in the event log that is not later than a time.
+
+        Args:
+            micros: The time in microseconds after midnight that the record must not be later than. Records without a
+              time are skipped.
+
+        Returns: The index of the record, or MISSING if there is none. If several records have the latest time, the
+        last one logged is returned.
+
+        Time complexity: O(e), where e is the number of events of the package.
+        """
+
+        log = self._store.events
+        event = self._store.last_events[self._row]
+        best, best_time = MISSING, None
+        while event != MISSING:
+            event_time = log.times[event]
+            if event_time != MISSING and event_time <= micros and (best_time is None or event_time > best_time):
+                best, best_time = event, event_time
+            event = log.previous[event]
+        return best
+
+    @property
+    def truck(self) -> Optional[int]:
+        """The ID of the truck the package was last loaded on, or None if it has not been loaded."""
+
+        truck_id = self._store.trucks[self._row]
+        return None if truck_id == MISSING else truck_id
+
+    @property
+    def time_loaded_on_truck(self) -> Optional['time']:
+        """The time the package was last loaded on a truck, or None if it has not been loaded."""
+
+        return _decode_time(self._store.times_loaded_on_truck[self._row])
+
+    @property
+    def time_out_for_delivery(self) -> Optional['time']:
+        """The time the package was last sent out for delivery, or None if it has not been sent out."""
+
+        return _decode_time(self._store.times_out_for_delivery[self._row])
+
+    @property
+    def time_delivered(self) -> Optional['time']:
+        """The time the package was delivered, or None if it has not been delivered."""
+
+        return _decode_time(self._store.times_delivered[self._row])
+
+    @property
+    def time_last_changed(self) -> Optional['time']:
+        """The time of the package's latest record in the event log, or None if it has none or it was not timed."""
+
+        last_event = self._store.last_events[self._row]
+        return None if last_event == MISSING else _decode_time(self._store.events.times[last_event])
+
+    def state_at_time(self, time_input: 'time') -> int:
+        """Determines which status code the package had at a given time from its records in the event log.
+
+        Args:
+            time_input: The time to find the state of the package at.
+
+        Returns: The status code of the latest record at or before the time, or 0 (not yet arrived) if there is none.
+
+        Time complexity: O(e), where e is the number of events of the package.
+        """
+
+        event = self._latest_event(_encode_time(time_input))
+        return 0 if event == MISSING else self._store.events.event_codes[event]
+
+    def status_at_time(self, time_input: 'time') -> str:
+        """Describes the status of the package at a given time, without changing its current status.
+
+        Args:
+            time_input: The time to describe the status of the package at.
+
+        Returns: A string stating the status of the package at that time.
+
+        Time complexity: O(e), where e is the number of events of the package.
+        """
+
+        return self._describe_event(self._latest_event(_encode_time(time_input)), at_time=True)
+
+    def _describe_event(self, event: int, at_time: bool = False) -> str:
+        """Renders the status of the package after one of its records in the event log.
+
+        Args:
+            event: The index of the record, or MISSING for the status before the package's first record.
+            at_time: Optional - whether the status is described as of a past time, in which case a package that is
+              ready for dispatch is described by when it arrived or became ready. Its current status is the status
+              code description.
+
+        Returns: A string stating the status of the package.
+        """
+
+        if event == MISSING:
+            return self.status_codes[0]
+        log = self._store.events
+        event_code = log.event_codes[event]
+        event_time = _decode_time(log.times[event])
+        truck_id = log.truck_ids[event]
+        if event_code == 1 and at_time and event_time is not None:
+            # A package is also ready for dispatch once its address is corrected, which happens after it arrived.
+            if event_time == self.time_checked_in:
+                return f'Arrived at hub at {event_time}'
+            return f'Ready for dispatch at the hub since {event_time}'
+        if truck_id != MISSING:
+            if event_code == 2:
+                return f'Loaded on truck {truck_id} at {event_time}'
+            if event_code == 3:
+                return f'Out for delivery on truck {truck_id} at {event_time}'
+            if event_code == 4:
+                return f'Delivered by truck {truck_id} at {event_time}'
+        return self.status_codes.get(event_code)
+
+    @property
+    def package_id(self) -> int:
+        """A unique identifier for a package."""
+
+        return self._store.package_ids[self._row]
+
+    @property
+    def deadline(self) -> Union[str, 'time']:
+        """The delivery deadline of the package, either a time or 'EOD'."""
+
+        deadline = self._store.deadlines[self._row]
+        return 'EOD' if deadline == MISSING else _decode_time(deadline)
+
+    @property
+    def mass(self) -> float:
+        """The mass of the package in kilograms."""
+
+        return self._store.masses[self._row]
+
+    @property
+    def status_code(self) -> int:
+        """A number representing the status of the package."""
+
+        return self._store.status_codes[self._row]
+
+    @property
+    def ready_for_delivery(self) -> bool:
+        """Indicates whether the package is ready for delivery."""
+
+        return bool(self._store.ready_for_delivery[self._row])
+
+    @property
+    def delivered_on_time(self) -> Optional[bool]:
+        """Indicates whether the package was delivered on time, or None if it has not been delivered."""
+
+        value = self._store.delivered_on_time[self._row]
+        return None if value == MISSING else bool(value)
+
+    @delivered_on_time.setter
+    def delivered_on_time(self, value: Optional[bool]):
+        self._store.delivered_on_time[self._row] = MISSING if value is None else int(value)
+
+    @property
+    def status(self) -> str:
+        """A string stating the status of the package.
+
+        The status is rendered from the package's latest record in the event log when read, rather than stored, unless
+        it was set to a custom string.
+        """
+
+        custom_status = self._store.custom_statuses.get(self._row)
+        if custom_status is not None:
+            return custom_status
+        last_event = self._store.last_events[self._row]
+        if last_event == MISSING:
+            return self.status_codes.get(self.status_code)
+        return self._describe_event(last_event)
 
     @property
     def address(self):
@@ -110,7 +680,7 @@ class Package:
         Returns: A string containing the street number and name along with the zipcode.
         """
 
-        return f'{self.street} {self.zipcode}'
+        return address_module.format_address(self.street, self.zipcode)
 
     def update_address(self, street: str, city: str, state: str, zipcode: str):
         """Updates the address of the package.
@@ -136,23 +706,30 @@ class Package:
 
         self.truck_restriction = truck_id
 
-    def set_status(self, status_code: int, status: str = None):
-        """Sets the status code and status description of the package.
+    def set_status(self, status_code: int, status: str = None, time_changed: Optional['time'] = None,
+                   truck_id: Optional[int] = None):
+        """Sets the status code and status description of the package by appending a record to the event log.
 
         Args:
             status_code: A number representing the status of the package.
             status: A custom string that can replace the default status code description.
+            time_changed: Optional - the time the status changed, which is needed for the change to be found by
+              queries of the package's status at a time.
+            truck_id: Optional - the ID of the truck involved in the change.
+
+        Time complexity: O(1) amortized.
         """
 
-        self.status_code = status_code
-        if self.status_code == 1:
-            self.ready_for_delivery = True
+        store, row = self._store, self._row
+        store.log_event(row, status_code, _encode_time(time_changed), truck_id)
+        if status_code == 1:
+            store.ready_for_delivery[row] = 1
         if status:
-            self.status = status
+            store.custom_statuses[row] = status
         else:
-            self.status = self.status_codes.get(status_code)
+            store.custom_statuses.pop(row, None)
         if status_code == 5:
-            self.ready_for_delivery = False
+            store.ready_for_delivery[row] = 0
 
     def set_delivery_group(self, delivery_group: int):
         """Sets the delivery group of a package.
@@ -179,9 +756,7 @@ class Package:
             truck: The truck the package was loaded on.
         """
 
-        self.truck = truck.truck_id
-        self.time_loaded_on_truck = truck.current_time
-        self.set_status(2, f'Loaded on truck {truck.truck_id} at {self.time_loaded_on_truck}')
+        self.set_status(2, time_changed=truck.current_time, truck_id=truck.truck_id)
 
     def mark_package_out_for_delivery(self, truck: 'Truck'):
         """Sets the time the package was sent out for delivery and updates the status.
@@ -190,8 +765,7 @@ class Package:
             truck: The truck the package is out for delivery on.
         """
 
-        self.time_out_for_delivery = truck.current_time
-        self.set_status(3, f'Out for delivery on truck {truck.truck_id} at {self.time_out_for_delivery}')
+        self.set_status(3, time_changed=truck.current_time, truck_id=truck.truck_id)
 
     def mark_package_delivered(self, truck: 'Truck'):
         """Sets the time the package was delivered and updates the status.
@@ -200,45 +774,96 @@ class Package:
             truck: The truck that delivered the package.
         """
 
-        self.time_delivered = truck.current_time
+        time_delivered = truck.current_time
         if self.deadline != 'EOD':
-            if self.time_delivered > self.deadline:
+            if time_delivered > self.deadline:
                 self.delivered_on_time = False
             else:
                 self.delivered_on_time = True
         else:
             self.delivered_on_time = True
 
-        self.set_status(4, f'Delivered by truck {truck.truck_id} at {self.time_delivered}')
+        self.set_status(4, time_changed=time_delivered, truck_id=truck.truck_id)
 
 
 class Hashtable:
     """Implements a hashtable for storing package objects.
 
-    The hashtable uses a chaining strategy to handle collisions. It provides lookup time of O(1) if there are no
-    collisions. Collisions can be eliminated by correctly specifying the number of packages in the PackageCollection
-    constructor if package IDs are contiguous. If no number is provided, the hashtable defaults to 40 buckets.
+    The hashtable uses open addressing with linear probing. Package IDs are kept in a compact array of 64-bit integers
+    alongside a byte array recording whether each slot is empty, occupied, or deleted, and the packages are kept in a
+    list of the same length. IDs are spread across the slots with Fibonacci hashing, so contiguous and evenly spaced
+    IDs do not collide. The table doubles in size whenever more than two thirds of its slots are occupied or deleted,
+    so lookups take O(1) time no matter how many packages are inserted.
 
     Attributes:
-        num_buckets: The number of buckets in the hashtable.
-        table: The table that stores the packages.
+        capacity: The number of slots in the hashtable, which is always a power of two.
+        keys: The package ID in each slot.
+        states: Whether each slot is EMPTY, OCCUPIED, or DELETED.
+        values: The package in each slot, or None.
     """
 
+    EMPTY = 0
+    OCCUPIED = 1
+    DELETED = 2
+    # 2^64 divided by the golden ratio, which spreads consecutive IDs evenly across the table.
+    _FIBONACCI_MULTIPLIER = 11400714819323198485
+    _MASK_64 = (1 << 64) - 1
+
     def __init__(self, num_buckets: int = 40):
         """ Initializes the Hashtable.
 
         Args:
-            num_buckets: The number of buckets to create in the hashtable. To optimize performance, package ID's should
-              be contiguous and num_buckets should be set to the number of packages being imported.
+            num_buckets: The number of packages expected to be inserted. The table is created large enough to hold them
+              without resizing, but grows as needed if more are inserted.
         """
 
-        self.num_buckets = num_buckets
-        self.table: list[list[Optional[Package]]] = []
-        for i in range(num_buckets):
-            self.table.append([])
+        capacity = 8
+        while capacity * 2 < num_buckets * 3:
+            capacity *= 2
+        self._allocate(capacity)
 
-    def hash(self, package_id: int):
-        """Calculates the hash value of a package ID.
+    def _allocate(self, capacity: int):
+        """Replaces the slots of the hashtable with a given number of empty slots.
+
+        Args:
+            capacity: The number of slots, which must be a power of two.
+        """
+
+        self.capacity = capacity
+        self._shift = 64 - (capacity.bit_length() - 1)
+        self.keys = array.array('q', bytes(8 * capacity))
+        self.states = bytearray(capacity)
+        self.values: list[Optional[Package]] = [None] * capacity
+        self._size = 0
+        # The number of slots that are occupied or deleted, which must stay below the capacity for probing to end.
+        self._used = 0
+
+    def __len__(self) -> int:
+        """Returns the number of packages in the hashtable."""
+
+        return self._size
+
+    def __contains__(self, package_id: int) -> bool:
+        """Returns whether a package with the given ID is in the hashtable.
+
+        Time complexity: O(1) on average.
+        """
+
+        return self._find(package_id) >= 0
+
+    def __iter__(self) -> Iterator[Package]:
+        """Iterates over the packages in the hashtable in ascending order of package ID.
+
+        Time complexity: O(c + n log n), where c is the capacity of the hashtable and n is the number of packages.
+        """
+
+        states, keys, values = self.states, self.keys, self.values
+        occupied = sorted((keys[slot], slot) for slot in range(self.capacity) if states[slot] == self.OCCUPIED)
+        for _, slot in occupied:
+            yield values[slot]
+
+    def hash(self, package_id: int) -> int:
+        """Calculates the hash value of a package ID, which is the first slot probed for it.
 
         Args:
             package_id: The ID of the package being hashed.
@@ -246,44 +871,83 @@ class Hashtable:
         Returns: The hash value of the package ID.
         """
 
-        return package_id % self.num_buckets
+        return ((package_id * self._FIBONACCI_MULTIPLIER) & self._MASK_64) >> self._shift
+
+    def _find(self, package_id: int) -> int:
+        """Finds the slot holding a package ID.
+
+        Args:
+            package_id: The ID of the package.
+
+        Returns: The slot holding the package ID, or -1 if it is not in the table.
+
+        Time complexity: O(1) on average, since the table is never more than two thirds full.
+        """
+
+        mask = self.capacity - 1
+        states, keys = self.states, self.keys
+        slot = self.hash(package_id)
+        while True:
+            state = states[slot]
+            if state == self.EMPTY:
+                return -1
+            if state == self.OCCUPIED and keys[slot] == package_id:
+                return slot
+            slot = (slot + 1) & mask
 
     def insert(self, package: Package):
         """Inserts a package into the hashtable.
 
+        If a package with the same ID is already in the table, it is replaced.
+
         Args:
             package: The package to be inserted.
 
-        Time complexity: O(n), where n is the number of packages in the hashtable. In the vast majority of instances,
-        the actual time complexity will be O(1). O(n) is the worst case scenario where every package has the same hash
-        value, which would only happen in instances where every package evaluated to the same hash value, which is
-        unlikely to occur.
+        Time complexity: O(1) on average, amortized over the occasional resize, which takes O(n) time where n is the
+        number of packages in the hashtable.
 
-        Space complexity: O(1)
+        Space complexity: O(1) amortized.
         """
 
-        key = self.hash(package.package_id)
-        i = 0
-        while i < len(self.table[key]):
-            # If a package already exists in the table with the same ID, call the update() method.
-            if package.package_id == self.table[key][i].package_id:
-                self.update(key, i, package)
-                return
-            i += 1
-        self.table[key].append(package)
+        package_id = package.package_id
+        if (self._used + 1) * 3 > self.capacity * 2:
+            self._resize()
+        mask = self.capacity - 1
+        states, keys = self.states, self.keys
+        slot = self.hash(package_id)
+        first_deleted = -1
+        while True:
+            state = states[slot]
+            if state == self.EMPTY:
+                break
+            if state == self.OCCUPIED:
+                if keys[slot] == package_id:
+                    # If a package already exists in the table with the same ID, call the update() method.
+                    self.update(slot, package)
+                    return
+            elif first_deleted < 0:
+                first_deleted = slot
+            slot = (slot + 1) & mask
+        if first_deleted >= 0:
+            slot = first_deleted
+        else:
+            self._used += 1
+        keys[slot] = package_id
+        states[slot] = self.OCCUPIED
+        self.values[slot] = package
+        self._size += 1
 
-    def update(self, key: int, index: int, package: Package):
-        """Replaces an existing package in the table if two package IDs are the same.
+    def update(self, slot: int, package: Package):
+        """Replaces the package in a slot with a package with the same ID.
 
         Args:
-            key: The hash value of the package.
-            index: The index of the package in the bucket.
+            slot: The slot holding the existing package.
             package: The package to replace the existing package with.
 
         Time complexity: O(1)
         """
 
-        self.table[key][index] = package
+        self.values[slot] = package
 
     def search(self, package_id: int) -> Optional[Package]:
         """Looks up a package in the hashtable by package ID.
@@ -293,18 +957,399 @@ class Hashtable:
 
         Returns: The package corresponding to the package ID if it is in the table, None otherwise.
 
-        Time complexity: O(n), where n is the number of packages in the hashtable. In the vast majority of instances,
-        the actual time complexity will be O(1). O(n) is the worst case scenario where every package has the same hash
-        value, which would only happen in instances where every package evaluated to the same hash value, which is
-        unlikely to occur.
+        Time complexity: O(1) on average, since the table is never more than two thirds full. O(n) is the worst case
+        scenario where every package ID probes the same run of slots, which is unlikely to occur.
         """
 
-        key = self.hash(package_id)
-        for i in range(len(self.table[key])):
-            package = self.table[key][i]
-            if package.package_id == package_id:
-                return package
-        return None
+        slot = self._find(package_id)
+        return self.values[slot] if slot >= 0 else None
+
+    def delete(self, package_id: int) -> Package:
+        """Removes a package from the hashtable.
+
+        The slot is marked as deleted rather than empty, so that probing for other IDs continues past it. Deleted slots
+        are reused by later insertions and cleared when the table is resized.
+
+        Args:
+            package_id: The ID of the package to be removed.
+
+        Returns: The package that was removed.
+
+        Raises:
+            KeyError: If no package with the ID is in the table.
+
+        Time complexity: O(1) on average.
+        """
+
+        slot = self._find(package_id)
+        if slot < 0:
+            raise KeyError(package_id)
+        package = self.values[slot]
+        self.states[slot] = self.DELETED
+        self.values[slot] = None
+        self._size -= 1
+        return package
+
+    def _resize(self):
+        """Moves the packages into a new table, doubling the capacity unless deleted slots take up most of the room.
+
+        Time complexity: O(c), where c is the capacity of the hashtable.
+
+        Space complexity: O(c)
+        """
+
+        states, keys, values = self.states, self.keys, self.values
+        capacity = self.capacity * 2 if (self._size + 1) * 2 > self.capacity else self.capacity
+        self._allocate(capacity)
+        mask = capacity - 1
+        new_states, new_keys, new_values = self.states, self.keys, self.values
+        for old_slot, state in enumerate(states):
+            if state != self.OCCUPIED:
+                continue
+            package_id = keys[old_slot]
+            slot = self.hash(package_id)
+            while new_states[slot]:
+                slot = (slot + 1) & mask
+            new_keys[slot] = package_id
+            new_states[slot] = self.OCCUPIED
+            new_values[slot] = values[old_slot]
+            self._size += 1
+        self._used = self._size
+
+
+# The time an interval in a TemporalIndex ends if the package has no later record, which is later than any time of day.
+_END_OF_TIME = 2 ** 62
+
+# The heading of each state bucket in a snapshot of the packages at a point in time, in the order they are shown.
+SNAPSHOT_HEADINGS = {
+    0: 'Not Yet Arrived At Hub:',
+    1: 'At Hub:',
+    5: 'At Hub With Incorrect Address:',
+    2: 'Loaded On Truck At Hub:',
+    3: 'Out For Delivery:',
+    4: 'Delivered:',
+}
+
+
+class IntervalTree:
+    """A static centered interval tree that finds the half-open intervals [start, end) containing a point.
+
+    Each node has a center point and holds the intervals that contain it, once sorted by start and once sorted by end
+    in descending order. Intervals entirely before the center go to the left subtree and intervals entirely after it
+    go to the right subtree. The nodes and their intervals are kept in flat arrays.
+
+    Attributes:
+        root: The index of the root node, or -1 if the tree is empty.
+        centers: The center point of each node.
+        lefts: The index of the left child of each node, or -1.
+        rights: The index of the right child of each node, or -1.
+        offsets: The position in the interval arrays where the intervals of each node begin.
+        counts: The number of intervals held by each node.
+        starts, start_ids: The starts and IDs of the intervals of each node, sorted by start.
+        ends, end_ids: The ends and IDs of the intervals of each node, sorted by end in descending order.
+    """
+
+    def __init__(self, intervals: list[tuple[int, int, int]]):
+        """Builds an IntervalTree.
+
+        Args:
+            intervals: The intervals as (start, end, ID) tuples. Empty intervals are left out.
+
+        Time complexity: O(n log n), where n is the number of intervals.
+
+        Space complexity: O(n)
+        """
+
+        self.centers = array.array('q')
+        self.lefts = array.array('i')
+        self.rights = array.array('i')
+        self.offsets = array.array('i')
+        self.counts = array.array('i')
+        self.starts = array.array('q')
+        self.start_ids = array.array('q')
+        self.ends = array.array('q')
+        self.end_ids = array.array('q')
+        self.root = self._build(sorted(interval for interval in intervals if interval[0] < interval[1]))
+
+    def _build(self, intervals: list[tuple[int, int, int]]) -> int:
+        """Builds the subtree for a list of intervals sorted by start and returns the index of its root node, or -1 if
+        it is empty.
+
+        The center is the median start, so the intervals starting there stay in the node and each subtree holds at
+        most half of the intervals, which keeps the depth at O(log n). Splitting the list keeps each part sorted.
+        """
+
+        if not intervals:
+            return -1
+        center = intervals[len(intervals) // 2][0]
+        left = [interval for interval in intervals if interval[1] <= center]
+        right = [interval for interval in intervals if interval[0] > center]
+        middle = [interval for interval in intervals if interval[0] <= center < interval[1]]
+        node = len(self.centers)
+        self.centers.append(center)
+        self.lefts.append(-1)
+        self.rights.append(-1)
+        self.offsets.append(len(self.starts))
+        self.counts.append(len(middle))
+        self.starts.extend(interval[0] for interval in middle)
+        self.start_ids.extend(interval[2] for interval in middle)
+        middle.sort(key=lambda interval: interval[1], reverse=True)
+        self.ends.extend(interval[1] for interval in middle)
+        self.end_ids.extend(interval[2] for interval in middle)
+        self.lefts[node] = self._build(left)
+        self.rights[node] = self._build(right)
+        return node
+
+    def stab(self, point: int) -> list[int]:
+        """Finds the intervals containing a point.
+
+        Args:
+            point: The point to look up.
+
+        Returns: The IDs of the intervals whose start is at or before the point and whose end is after it.
+
+        Time complexity: O(log n + k), where n is the number of intervals and k is the number of intervals found.
+        """
+
+        found = []
+        node = self.root
+        while node >= 0:
+            offset = self.offsets[node]
+            stop = offset + self.counts[node]
+            if point < self.centers[node]:
+                # Every interval of the node ends after the center, so it contains the point if it starts by then.
+                for k in range(offset, stop):
+                    if self.starts[k] > point:
+                        break
+                    found.append(self.start_ids[k])
+                node = self.lefts[node]
+            else:
+                # Every interval of the node starts at or before the center, so it contains the point if it ends
+                # after it.
+                for k in range(offset, stop):
+                    if self.ends[k] <= point:
+                        break
+                    found.append(self.end_ids[k])
+                node = self.rights[node]
+        return found
+
+
+class TemporalIndex:
+    """An index over the event log of packages that finds which packages were in each state at a given time.
+
+    Each record of a package in the event log starts an interval in which the package has the record's status code,
+    which lasts until the package's next record. Before its first record, a package has not yet arrived. The intervals
+    for each status code are kept in an IntervalTree. Every record that changes a package's status code is also kept
+    as a transition in arrays sorted by time, so the changes between two times can be found by bisecting them. Records
+    without a time are left out.
+
+    Attributes:
+        version: The version of the package store the index was built from.
+        interval_trees: The IntervalTree for each status code.
+        transition_times, transition_ids, transition_from, transition_to, transition_trucks: The time, package ID,
+          previous status code, new status code, and truck ID (or MISSING) of each transition, sorted by time.
+    """
+
+    def __init__(self, packages: Iterable['Package'], version: Hashable = None):
+        """Builds a TemporalIndex from the event log records of packages.
+
+        Args:
+            packages: The packages to index.
+            version: Optional - a value identifying the state of the packages the index was built from.
+
+        Time complexity: O(n log n), where n is the number of records of the packages.
+
+        Space complexity: O(n)
+        """
+
+        self.version = version
+        intervals = {state: [] for state in SNAPSHOT_HEADINGS}
+        transitions = []
+        for package in packages:
+            store, row = package._store, package._row
+            log = store.events
+            package_id = store.package_ids[row]
+            records = sorted((log.times[event], position, log.event_codes[event], log.truck_ids[event])
+                             for position, event in enumerate(log.chain(store.last_events[row]))
+                             if log.times[event] != MISSING)
+            start, state = -_END_OF_TIME, 0
+            for event_time, _, event_code, truck_id in records:
+                intervals[state].append((start, event_time, package_id))
+                if event_code != state:
+                    transitions.append((event_time, package_id, state, event_code, truck_id))
+                start, state = event_time, event_code
+            intervals[state].append((start, _END_OF_TIME, package_id))
+        self.interval_trees = {state: IntervalTree(state_intervals) for state, state_intervals in intervals.items()}
+        # Sorting is stable, so the transitions of a package at the same time stay in the order they were logged.
+        transitions.sort(key=lambda transition: transition[0])
+        self.transition_times = array.array('q', (transition[0] for transition in transitions))
+        self.transition_ids = array.array('q', (transition[1] for transition in transitions))
+        self.transition_from = array.array('b', (transition[2] for transition in transitions))
+        self.transition_to = array.array('b', (transition[3] for transition in transitions))
+        self.transition_trucks = array.array('i', (transition[4] for transition in transitions))
+
+    def package_ids(self, state: int, time_input: 'time') -> list[int]:
+        """Finds the IDs of the packages that were in a state at a given time.
+
+        Args:
+            state: The status code.
+            time_input: The time to look up.
+
+        Returns: The IDs of the packages in the state, in no particular order.
+
+        Time complexity: O(log n + k), where n is the number of records and k is the number of IDs returned.
+        """
+
+        return self.interval_trees[state].stab(_encode_time(time_input))
+
+    def buckets(self, time_input: 'time') -> dict[int, list[int]]:
+        """Finds the IDs of the packages in every state at a given time.
+
+        Args:
+            time_input: The time to look up.
+
+        Returns: A dictionary with the status codes as keys, in the order of SNAPSHOT_HEADINGS, and the IDs of the
+        packages in each state as values.
+
+        Time complexity: O(log n + p), where n is the number of records and p is the number of packages, since every
+        package is in one state.
+        """
+
+        return {state: self.package_ids(state, time_input) for state in SNAPSHOT_HEADINGS}
+
+    def transitions(self, start_time: 'time', end_time: 'time') -> list[tuple[int, 'time', int, int, Optional[int]]]:
+        """Finds the status changes after one time and up to and including another.
+
+        Args:
+            start_time: The time after which changes are found.
+            end_time: The last time at which changes are found.
+
+        Returns: A list of (package ID, time, previous status code, new status code, truck ID) tuples in order of time,
+        where the truck ID is None if no truck was recorded.
+
+        Time complexity: O(log n + c), where n is the number of transitions and c is the number of changes found.
+        """
+
+        first = bisect.bisect_right(self.transition_times, _encode_time(start_time))
+        stop = bisect.bisect_right(self.transition_times, _encode_time(end_time))
+        return [(self.transition_ids[k], _decode_time(self.transition_times[k]), self.transition_from[k],
+                 self.transition_to[k], None if self.transition_trucks[k] == MISSING else self.transition_trucks[k])
+                for k in range(first, stop)]
+
+
+# The number of rows of a package file parsed together by import_packages.
+IMPORT_CHUNK_SIZE = 5000
+# The largest number of entries kept in each parsing cache before it is cleared.
+_PARSE_CACHE_LIMIT = 65536
+_deadline_cache: dict[str, Union[str, 'time']] = {}
+_street_cache: dict[str, str] = {}
+
+
+class ImportReport:
+    """A summary of an import of a package file.
+
+    Attributes:
+        rows: The number of rows imported.
+        chunks: The number of chunks the rows were parsed in.
+        workers: The number of processes that parsed the rows.
+        elapsed_seconds: The time spent importing the rows.
+    """
+
+    def __init__(self, rows: int, chunks: int, workers: int, elapsed_seconds: float):
+        """Initializes ImportReport."""
+
+        self.rows = rows
+        self.chunks = chunks
+        self.workers = workers
+        self.elapsed_seconds = elapsed_seconds
+
+    def __str__(self) -> str:
+        """Returns the report as a string.
+
+        Returns: A string containing the number of rows imported, the time taken, and the rate of the import.
+        """
+
+        return (f'Imported {self.rows} package{"" if self.rows == 1 else "s"} in {self.chunks} '
+                f'chunk{"" if self.chunks == 1 else "s"} with {self.workers} worker{"" if self.workers == 1 else "s"} '
+                f'in {self.elapsed_seconds:.3f} seconds ({self.rows_per_second:.0f} rows per second)')
+
+    @property
+    def rows_per_second(self) -> float:
+        """The number of rows imported per second."""
+
+        return self.rows / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+
+def read_package_chunks(file: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> Iterator[list[list[str]]]:
+    """Reads the rows of a package file in chunks, skipping the header row and blank rows.
+
+    Args:
+        file: The path to the CSV file containing the package data.
+        chunk_size: The largest number of rows in each chunk.
+
+    Yields:
+        Lists of up to chunk_size rows, each a list of the fields in the row.
+
+    Space complexity: O(c), where c is the chunk size, since the file is read one row at a time.
+    """
+
+    with open(file, newline='') as packages:
+        package_data = csv.reader(packages)
+        next(package_data, None)
+        chunk = []
+        for row in package_data:
+            if not row:
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def parse_package_rows(rows: list[list[str]]) -> list[tuple]:
+    """Parses and normalizes rows of a package file.
+
+    Deadlines and streets repeat across packages, so each distinct deadline and street is only parsed and normalized
+    once per process, and later rows reuse the cached result. This runs in worker processes during a parallel import.
+
+    Args:
+        rows: The rows to parse, each a list of the fields in the row.
+
+    Returns:
+        A tuple of the package ID, street, city, state, zipcode, deadline, mass, and notes for each row, in the order
+        of the arguments of the Package constructor.
+
+    Raises:
+        ValueError: If a row contains an invalid package ID, deadline, or mass.
+
+    Time complexity: O(n), where n is the number of rows.
+    """
+
+    if len(_deadline_cache) > _PARSE_CACHE_LIMIT:
+        _deadline_cache.clear()
+    if len(_street_cache) > _PARSE_CACHE_LIMIT:
+        _street_cache.clear()
+    parsed = []
+    for package in rows:
+        deadline = _deadline_cache.get(package[5])
+        if deadline is None:
+            deadline = package[5].strip()
+            if deadline != 'EOD':
+                deadline = datetime.datetime.strptime(deadline, '%I:%M %p').time()
+            _deadline_cache[package[5]] = deadline
+        street = _street_cache.get(package[1])
+        if street is None:
+            street = package[1].strip().upper()
+            street = street.replace('NORTH', 'N')
+            street = street.replace('EAST', 'E')
+            street = street.replace('SOUTH', 'S')
+            street = street.replace('WEST', 'W')
+            _street_cache[package[1]] = street
+        parsed.append((int(package[0]), street, package[2].strip().upper(), package[3].strip().upper(),
+                       package[4].strip(), deadline, float(package[6].strip()), package[7].strip()))
+    return parsed
 
 
 class PackageCollection:
@@ -314,6 +1359,7 @@ class PackageCollection:
 
     Attributes:
         package_table: A Hashtable object containing the packages associated with the collection.
+        store: The PackageStore holding the attributes of the packages imported into the collection.
         bound_packages: A set containing packages that are bound and must be loaded on the same truck at the same time.
         priority_1_packages: A set containing priority 1 packages, which are packages with a delivery deadline of 9:00.
         priority_2_packages: A set containing priority 2 packages, which are packages with a delivery deadline of 10:30.
@@ -323,56 +1369,106 @@ class PackageCollection:
         """Initializes a PackageCollection.
 
         Args:
-            num_packages: The number of packages intended to be imported into the collection. Defaults to 40 if no
-              argument is provided.
+            num_packages: The number of packages intended to be imported into the collection, which sizes the hashtable
+              so it does not need to grow during the import. Defaults to 40 if no argument is provided.
         """
 
         if num_packages:
             self.package_table = Hashtable(num_packages)
         else:
             self.package_table = Hashtable()
+        self.store = PackageStore()
+        self._temporal_index: Optional[TemporalIndex] = None
+        # The first package imported at each address, and the delivery group of each address with several packages.
+        self._first_package_by_address: dict[str, Package] = {}
+        self._delivery_groups_by_address: dict[str, int] = {}
+        self._num_delivery_groups = 0
         self.bound_packages = set()
         self.priority_1_packages = set()
         self.priority_2_packages = set()
 
-    def import_packages(self, file: str):
+    def import_packages(self, file: str, addresses: Optional['AddressCollection'] = None, workers: int = 1,
+                        chunk_size: int = IMPORT_CHUNK_SIZE) -> ImportReport:
         """Imports packages from a given CSV file, creates Package objects, and stores them in a hashtable.
 
+        The file is streamed in chunks of rows, so it is never held in memory at once. With more than one worker, the
+        chunks are parsed by a pool of worker processes, with a few chunks in flight per worker, and the packages are
+        added in the order of the file. Delivery groups and priorities are assigned as each package is added.
+
         Args:
             file: The path to the CSV file containing the package data.
+            addresses: Optional - the AddressCollection used to look up the index of each package's address.
+            workers: Optional - the number of worker processes that parse the rows. With one worker, the rows are parsed
+              in the current process.
+            chunk_size: Optional - the number of rows parsed together.
+
+        Returns: An ImportReport with the number of rows imported and the rate they were imported at.
+
+        Time complexity: O(n), where n is the number of packages in the CSV file.
+
+        Space complexity: O(n) for the packages, plus O(w c) for the chunks in flight, where w is the number of workers
+        and c is the chunk size.
+        """
+
+        start_time = perf_counter()
+        num_rows = 0
+        num_chunks = 0
+        chunks = read_package_chunks(file, chunk_size)
+        if workers <= 1:
+            for chunk in chunks:
+                self._add_imported_packages(parse_package_rows(chunk), addresses)
+                num_rows += len(chunk)
+                num_chunks += 1
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(parse_package_rows, chunk))
+                    # Keep a bounded number of chunks in flight so the file is not read faster than it is parsed.
+                    while len(pending) >= 2 * workers or (pending and pending[0].done()):
+                        rows = pending.popleft().result()
+                        self._add_imported_packages(rows, addresses)
+                        num_rows += len(rows)
+                        num_chunks += 1
+                while pending:
+                    rows = pending.popleft().result()
+                    self._add_imported_packages(rows, addresses)
+                    num_rows += len(rows)
+                    num_chunks += 1
+        return ImportReport(num_rows, num_chunks, max(workers, 1), perf_counter() - start_time)
+
+    def _add_imported_packages(self, rows: list[tuple], addresses: Optional['AddressCollection']):
+        """Stores the packages of parsed rows, and assigns their delivery groups and priorities.
+
+        A package at an address that already has a package starts a new delivery group with the first package there,
+        or joins the group of that address if it already has one.
+
+        Args:
+            rows: Rows parsed by parse_package_rows.
+            addresses: Optional - the AddressCollection used to look up the index of each package's address.
 
-        Time complexity: O(n log n), where n is the number of packages in the CSV file, due to the get_all_packages()
-        method being called, which sorts the packages by package ID.
-
-        Space complexity: O(n), where n is the number of packages in the CSV file.
-        """
-
-        with open(file, newline='') as packages:
-            package_data = csv.reader(packages)
-            next(package_data)
-            for package in package_data:
-                # Normalize package data.
-                package_id = int(package[0])
-                address = package[1].strip().upper()
-                city = package[2].strip().upper()
-                state = package[3].strip().upper()
-                zipcode = package[4].strip()
-                deadline = package[5].strip()
-                if deadline != 'EOD':
-                    deadline = datetime.datetime.strptime(deadline, '%I:%M %p').time()
-                mass = float(package[6].strip())
-                notes = package[7].strip()
-                address = address.replace('NORTH', 'N')
-                address = address.replace('EAST', 'E')
-                address = address.replace('SOUTH', 'S')
-                address = address.replace('WEST', 'W')
-                new_package = Package(package_id, address, city, state, zipcode, deadline, mass, notes)
-                self.package_table.insert(new_package)
-
-            # Get all packages that were imported and calculate their delivery groups and priorities.
-            packages = set(self.get_all_packages())
-            routing.calculate_delivery_groups(packages)
-            routing.calculate_delivery_priority(self, packages)
+        Time complexity: O(n) on average, where n is the number of rows.
+        """
+
+        package_addresses = [address_module.format_address(row[1], row[4]) for row in rows]
+        address_indexes = None
+        if addresses:
+            address_indexes = [MISSING if index is None else index
+                               for index in map(addresses.index_of, package_addresses)]
+        new_packages = [Package.view(self.store, row) for row in self.store.extend(rows, address_indexes)]
+
+        for new_package, address in zip(new_packages, package_addresses):
+            self.package_table.insert(new_package)
+            delivery_group = self._delivery_groups_by_address.get(address)
+            if delivery_group is None:
+                first_package = self._first_package_by_address.setdefault(address, new_package)
+                if first_package is new_package:
+                    continue
+                self._num_delivery_groups += 1
+                delivery_group = self._delivery_groups_by_address[address] = self._num_delivery_groups
+                first_package.set_delivery_group(delivery_group)
+            new_package.set_delivery_group(delivery_group)
+        routing.calculate_delivery_priority(self, new_packages)
 
     def search(self, package_id: int):
         """Looks up a package in the table by package ID.
@@ -384,8 +1480,7 @@ class PackageCollection:
 
         Returns: The package corresponding to the package ID if it is in the table, None otherwise.
 
-        Time complexity: O(1) if the table is used as intended with num_buckets set to the number of packages imported
-        and contiguous package ID's. O(n) otherwise, with n representing the number of packages in the table.
+        Time complexity: O(1) on average, since the hashtable resizes itself to stay at most two thirds full.
         """
 
         return self.package_table.search(package_id)
@@ -415,14 +1510,8 @@ class PackageCollection:
         Space complexity: O(n), where n is the number of packages in the collection.
         """
 
-        all_packages = []
-        for bucket in self.package_table.table:
-            for package in bucket:
-                all_packages.append(package)
-
-        # Sort the list in ascending order by package ID.
-        all_packages.sort(key=lambda p: p.package_id)
-        return all_packages
+        # The hashtable iterates over the packages in ascending order by package ID.
+        return list(self.package_table)
 
     def print_all_packages(self):
         """Prints all packages in the collection."""
@@ -430,88 +1519,105 @@ class PackageCollection:
         for package in self.get_all_packages():
             print(package)
 
-    def print_all_packages_at_time(self, time_input: 'time'):
-        """Prints all packages at a specific snapshot in time.
+    def temporal_index(self) -> TemporalIndex:
+        """Returns a TemporalIndex over the packages in the collection, building it again if any timestamp changed.
+
+        Time complexity: O(1) if the index is up to date, O(n log n) otherwise, where n is the number of packages in
+        the collection.
+        """
+
+        version = (self.store.version, len(self.package_table))
+        if self._temporal_index is None or self._temporal_index.version != version:
+            packages = (package for package in self.package_table.values if package is not None)
+            self._temporal_index = TemporalIndex(packages, version)
+        return self._temporal_index
+
+    def package_ids_at_time(self, time_input: 'time') -> dict[int, list[int]]:
+        """Finds the IDs of the packages in each state at a specific time, sorted by package ID.
 
         Args:
-            time_input: The time to use for creating the snapshot.
+            time_input: The time to use for the snapshot.
 
-        Time complexity: O(n log n), where n is the number of packages in the collection, due to the get_all_packages
-        method call, which sorts all packages by package ID.
+        Returns: A dictionary with the status codes as keys, in the order of SNAPSHOT_HEADINGS, and the sorted IDs of
+        the packages with each status at that time as values.
 
-        Space complexity: O(n), where n is the number of packages in the collection.
+        Time complexity: O(log n + k log k) for each state, where n is the number of packages in the collection and k
+        is the number of packages in the state, once the temporal index is built.
         """
 
-        # Make a deep copy of the list the get_all_packages function returns. A deep copy is made to prevent the
-        # original package data from being overwritten.
-        all_packages = copy.deepcopy(self.get_all_packages())
-        not_yet_arrived = []
-        at_hub = []
-        loaded_on_truck = []
-        out_for_delivery = []
-        delivered = []
-
-        # Compare the time_input to the package's time attributes to determine what the package status was at
-        # the time of time_input and update the status accordingly.
-        for package in all_packages:
-            if package.time_checked_in > time_input:
-                package.set_status(0)
-                not_yet_arrived.append(package)
-            elif package.time_loaded_on_truck > time_input:
-                package.set_status(1, f'Arrived at hub at {package.time_checked_in}')
-                at_hub.append(package)
-            elif package.time_out_for_delivery > time_input:
-                package.set_status(2, f'Loaded on truck {package.truck} at {package.time_loaded_on_truck}')
-                loaded_on_truck.append(package)
-            elif package.time_delivered > time_input:
-                package.set_status(2, f'Out for delivery on truck {package.truck} at '
-                                      f'{package.time_out_for_delivery}')
-                out_for_delivery.append(package)
-            else:
-                package.set_status(2, f'Delivered by truck {package.truck} at {package.time_delivered}')
-                delivered.append(package)
+        buckets = self.temporal_index().buckets(time_input)
+        for package_ids in buckets.values():
+            package_ids.sort()
+        return buckets
 
-        print(f'Status Of All Packages As Of {time_input.strftime("%H:%M")}:')
+    def changes_between(self, start_time: 'time',
+                        end_time: 'time') -> dict[int, list[tuple['time', int, int, Optional[int]]]]:
+        """Finds the packages whose status changed between two times, along with their changes.
 
-        print('Not Yet Arrived At Hub:')
-        if not_yet_arrived:
-            for package in not_yet_arrived:
-                print(package)
-            print()
-        else:
-            print('None\n')
+        The changes are read from the time-sorted transitions of the temporal index, so packages that did not change
+        are never looked at.
 
-        print('At Hub:')
-        if at_hub:
-            for package in at_hub:
-                print(package)
-            print()
-        else:
-            print('None\n')
+        Args:
+            start_time: The earlier time. Changes at this time are not included, since they are part of the status of
+              the packages at this time.
+            end_time: The later time. Changes at this time are included.
 
-        print('Loaded On Truck At Hub:')
-        if loaded_on_truck:
-            for package in loaded_on_truck:
-                print(package)
-            print()
-        else:
-            print('None\n')
+        Returns: A dictionary with the IDs of the packages that changed as keys, in ascending order, and lists of
+        (time, previous status code, new status code, truck ID) tuples in order of time as values.
 
-        print('Out For Delivery:')
-        if out_for_delivery:
-            for package in out_for_delivery:
-                print(package)
-            print()
-        else:
-            print('None\n')
+        Raises:
+            ValueError: If end_time is earlier than start_time.
+
+        Time complexity: O(log n + c log c), where n is the number of status changes of all packages and c is the
+        number of changes found, once the temporal index is built.
+        """
+
+        if end_time < start_time:
+            raise ValueError(f'The end time {end_time} is earlier than the start time {start_time}.')
+        changes: dict[int, list[tuple['time', int, int, Optional[int]]]] = {}
+        for package_id, change_time, previous_code, new_code, truck_id in \
+                self.temporal_index().transitions(start_time, end_time):
+            changes.setdefault(package_id, []).append((change_time, previous_code, new_code, truck_id))
+        return {package_id: changes[package_id] for package_id in sorted(changes)}
+
+    def print_all_packages_at_time(self, time_input: 'time', page_size: Optional[int] = None):
+        """Prints all packages at a specific snapshot in time, grouped by their status at that time.
+
+        The packages are not changed. The IDs in each group are found with the temporal index, and the status of each
+        package at that time is rendered from its event log records.
+
+        Args:
+            time_input: The time to use for creating the snapshot.
+            page_size: Optional - the number of packages printed in each group before asking the user whether to show
+              more. If None, every package is printed without pausing.
+
+        Time complexity: O(n log n), where n is the number of packages in the collection, due to sorting the IDs in
+        each state.
+
+        Space complexity: O(n), where n is the number of packages in the collection.
+        """
 
-        print('Delivered:')
-        if delivered:
-            for package in delivered:
-                print(package)
+        buckets = self.package_ids_at_time(time_input)
+        print(f'Status Of All Packages As Of {time_input.strftime("%H:%M")}:')
+        for state, heading in SNAPSHOT_HEADINGS.items():
+            package_ids = buckets[state]
+            print(heading)
+            if not package_ids:
+                print('None\n')
+                continue
+            step = page_size or len(package_ids)
+            for start in range(0, len(package_ids), step):
+                for package_id in package_ids[start:start + step]:
+                    package = self.search(package_id)
+                    print(package.describe(package.status_at_time(time_input)))
+                shown = start + step
+                if shown < len(package_ids):
+                    choice = input(f'\nShowing {shown} of {len(package_ids)}. Press Enter to show more, or type S to '
+                                   f'skip to the next status: ')
+                    print()
+                    if choice.strip().upper() == 'S':
+                        break
             print()
-        else:
-            print('None\n')
 
     def print_single_package_at_time(self, package_id: int, time_input: 'time'):
         """Prints the status of a single package at the specified time_input.
@@ -523,18 +1629,143 @@ class PackageCollection:
         Time complexity: O(1)
         """
 
-        package = copy.copy(self.search(package_id))  # Make a copy so the original object is not modified.
-        if package.time_checked_in > time_input:
-            package.set_status(0)
-        elif package.time_loaded_on_truck > time_input:
-            package.set_status(1, f'Arrived at hub at {package.time_checked_in}')
-        elif package.time_out_for_delivery > time_input:
-            package.set_status(2, f'Loaded on truck {package.truck} at {package.time_loaded_on_truck}')
-        elif package.time_delivered > time_input:
-            package.set_status(2, f'Out for delivery on truck {package.truck} at '
-                                  f'{package.time_out_for_delivery}')
-        else:
-            package.set_status(2, f'Delivered by truck {package.truck} at {package.time_delivered}')
-
+        package = self.search(package_id)
         print(f'Status Of Package {package.package_id} As Of {time_input.strftime("%H:%M")}:')
-        print(package)
+        print(package.describe(package.status_at_time(time_input)))
+
+
+class DispatchIndex:
+    """Indexes of the packages that are ready for dispatch, kept up to date as packages are added and removed.
+
+    The loading methods of a hub read these indexes instead of grouping every ready package again for each truck.
+    Each package is indexed under the address, priority, truck restriction, and binding it had when it was added, so
+    a package must be re-indexed with update if any of these change while it is ready for dispatch.
+
+    Attributes:
+        packages: The packages that are ready for dispatch.
+        bound_packages: The set of bound packages of the package collection, used to tell whether a package is bound.
+        by_address: A dictionary with the address strings of ready packages as keys and sets of the ready packages for
+          each address as values.
+        single_addresses: The addresses that exactly one ready package is destined for.
+        group_addresses: The addresses that more than one ready package is destined for.
+        by_priority: A dictionary with priority numbers as keys and sets of the ready packages with that priority as
+          values.
+        by_restriction: A dictionary with truck IDs as keys and sets of the ready packages restricted to that truck as
+          values.
+        bound: The bound packages that are ready for dispatch.
+    """
+
+    def __init__(self, bound_packages: set[Package]):
+        """Initializes an empty DispatchIndex.
+
+        Args:
+            bound_packages: The set of bound packages of the package collection. The set is shared, not copied.
+        """
+
+        self.packages: set[Package] = set()
+        self.bound_packages = bound_packages
+        self.by_address: dict[str, set[Package]] = {}
+        self.single_addresses: set[str] = set()
+        self.group_addresses: set[str] = set()
+        self.by_priority: dict[int, set[Package]] = {1: set(), 2: set()}
+        self.by_restriction: dict[int, set[Package]] = {}
+        self.bound: set[Package] = set()
+        # The keys each package was indexed under, so that it can be removed after its attributes change.
+        self._keys: dict[Package, tuple[str, Optional[int], Optional[int], bool]] = {}
+
+    def __contains__(self, package: Package) -> bool:
+        """Returns whether a package is ready for dispatch."""
+
+        return package in self._keys
+
+    def __len__(self) -> int:
+        """Returns the number of packages that are ready for dispatch."""
+
+        return len(self._keys)
+
+    def add(self, package: Package):
+        """Adds a package to the indexes. Adding a package that is already indexed does nothing.
+
+        Args:
+            package: The package that is ready for dispatch.
+
+        Time complexity: O(1).
+        """
+
+        if package in self._keys:
+            return
+        address, priority, restriction = package.address, package.priority, package.truck_restriction
+        is_bound = package in self.bound_packages
+        self._keys[package] = (address, priority, restriction, is_bound)
+        self.packages.add(package)
+
+        address_packages = self.by_address.setdefault(address, set())
+        address_packages.add(package)
+        if len(address_packages) == 1:
+            self.single_addresses.add(address)
+        elif len(address_packages) == 2:
+            self.single_addresses.discard(address)
+            self.group_addresses.add(address)
+        if priority:
+            self.by_priority.setdefault(priority, set()).add(package)
+        if restriction:
+            self.by_restriction.setdefault(restriction, set()).add(package)
+        if is_bound:
+            self.bound.add(package)
+
+    def remove(self, package: Package):
+        """Removes a package from the indexes.
+
+        Args:
+            package: The package to remove.
+
+        Raises:
+            KeyError: If the package is not in the indexes.
+
+        Time complexity: O(1).
+        """
+
+        address, priority, restriction, is_bound = self._keys.pop(package)
+        self.packages.remove(package)
+
+        address_packages = self.by_address[address]
+        address_packages.remove(package)
+        if not address_packages:
+            del self.by_address[address]
+            self.single_addresses.discard(address)
+        elif len(address_packages) == 1:
+            self.group_addresses.discard(address)
+            self.single_addresses.add(address)
+        if priority:
+            self.by_priority[priority].discard(package)
+        if restriction:
+            self.by_restriction[restriction].discard(package)
+        if is_bound:
+            self.bound.discard(package)
+
+    def discard(self, package: Package):
+        """Removes a package from the indexes if it is in them.
+
+        Args:
+            package: The package to remove.
+
+        Time complexity: O(1).
+        """
+
+        if package in self._keys:
+            self.remove(package)
+
+    def update(self, package: Package):
+        """Re-indexes a ready package after its address, priority, truck restriction, or binding has changed.
+
+        Packages that are not ready for dispatch are ignored.
+
+        Args:
+            package: The package to re-index.
+
+        Time complexity: O(1).
+        """
+
+        if package in self._keys:
+            self.remove(package)
+            self.add(package)
@@ -0,0 +1,260 @@
+"""A module for calculating truck routes in parallel.
+
+This module sends the route of each truck, along with a number of randomized restarts of it, to a pool of worker
+processes and keeps the shortest route found for each truck. The distance matrix is placed in shared memory once, and
+each worker reads it from there instead of receiving its own copy.
+
+Typical usage example:
+
+    hub.load_trucks()
+    hub.calculate_routes(workers=4, restarts=3, seed=1)
+    hub.dispatch_trucks()
+"""
+
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Optional
+
+import address as address_module
+import routing
+
+if TYPE_CHECKING:
+    from address import AddressCollection
+    from hub import Hub
+    from routing import RouteReport
+    from truck import Truck
+
+
+class RouteSettings:
+    """The routing settings of a hub, along with its distance matrix, as seen by a worker process.
+
+    RouteJob objects use this in place of a Hub, so it provides the attributes of a Hub that the routing functions
+    use.
+
+    Attributes:
+        addresses: The AddressCollection containing the distance matrix.
+        extended_local_search: Whether routes are improved with Or-opt and 3-opt moves after the two-opt algorithm.
+        held_karp_max_stops: The largest number of priority or standard addresses for which the Held-Karp algorithm
+          is used.
+        route_cache: Always None, since the route cache is kept by the hub in the main process.
+        deadline_aware_routing: Always False, since jobs do not carry the packages and their deadlines. The hub
+          reorders the routes returned by the workers for deadlines in the main process.
+    """
+
+    def __init__(self, addresses: 'AddressCollection', extended_local_search: bool, held_karp_max_stops: int):
+        """Initializes RouteSettings."""
+
+        self.addresses = addresses
+        self.extended_local_search = extended_local_search
+        self.held_karp_max_stops = held_karp_max_stops
+        self.route_cache = None
+        self.deadline_aware_routing = False
+
+
+class RouteJob:
+    """The part of a truck needed to calculate its route in another process.
+
+    A RouteJob only holds address indexes, so it is cheap to send to a worker. It provides the attributes of a Truck
+    that the routing functions use, so it can be passed to them in place of one.
+
+    Attributes:
+        truck_id: The ID of the truck the route is for.
+        current_address_index: The index of the address the route starts at.
+        priority_1_addresses: The indexes of the priority 1 addresses, which are pinned after the starting address.
+        priority_package_manifest: A dictionary with the index of each priority address as keys. The values are
+          always empty, since the packages are not needed to calculate a route.
+        standard_package_manifest: A dictionary with the index of each standard address as keys.
+        priority_route: The calculated priority route.
+        standard_route: The calculated standard route.
+        hub: The RouteSettings of the worker. This is set by the worker and is not sent between processes.
+    """
+
+    def __init__(self, truck: 'Truck'):
+        """Initializes RouteJob with the addresses on a loaded truck."""
+
+        self.truck_id = truck.truck_id
+        self.current_address_index = truck.current_address_index
+        self.priority_1_addresses = list(truck.priority_1_addresses)
+        self.priority_package_manifest = dict.fromkeys(truck.priority_package_manifest, ())
+        self.standard_package_manifest = dict.fromkeys(truck.standard_package_manifest, ())
+        self.priority_route = array('i')
+        self.standard_route = array('i')
+        self.hub: Optional[RouteSettings] = None
+
+    def __getstate__(self) -> dict:
+        """Returns the attributes of the job that are sent to a worker, which excludes the worker's settings."""
+
+        state = self.__dict__.copy()
+        state['hub'] = None
+        return state
+
+
+# The settings of the current worker process, which are set by initialize_worker.
+_worker_settings: Optional[RouteSettings] = None
+_worker_memory: Optional[shared_memory.SharedMemory] = None
+
+
+def initialize_worker(memory_name: str, num_addresses: int, hub_index: int, extended_local_search: bool,
+                      held_karp_max_stops: int, neighbor_lists: Optional[list[array]] = None):
+    """Attaches a worker process to the distance matrix in shared memory.
+
+    Args:
+        memory_name: The name of the shared memory block holding the distance matrix.
+        num_addresses: The number of addresses in the distance matrix.
+        hub_index: The index of the hub in the distance matrix.
+        extended_local_search: The extended_local_search setting of the hub.
+        held_karp_max_stops: The held_karp_max_stops setting of the hub.
+        neighbor_lists: Optional - the neighbor lists of the hub's AddressCollection. They are sent to each worker
+          rather than built again from the distance matrix.
+    """
+
+    global _worker_settings, _worker_memory
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    addresses = address_module.AddressCollection()
+    addresses.use_distance_buffer(_worker_memory.buf, num_addresses)
+    addresses.hub_index = hub_index
+    addresses.neighbor_lists = neighbor_lists
+    _worker_settings = RouteSettings(addresses, extended_local_search, held_karp_max_stops)
+
+
+def run_job(job: RouteJob, restart: int, seed: Optional[int], time_budget: Optional[float],
+            max_iterations: Optional[int], target_gap: Optional[float] = None,
+            settings: Optional[RouteSettings] = None) -> tuple[float, int, RouteJob, Optional['RouteReport']]:
+    """Calculates one route for a job in the current worker process, or in the current process if settings are given.
+
+    Restart 0 uses the same algorithms as Hub.calculate_routes. Each other restart shuffles the addresses into a
+    random starting route and improves it with two-opt and, if enabled, local_search. If a budget is provided, every
+    restart uses the anytime optimizer instead, with its own seed.
+
+    Args:
+        job: The job to calculate the route for.
+        restart: The number of the restart, starting at 0.
+        seed: The seed the random number generators are derived from, or None for unrepeatable results.
+        time_budget: Optional - the number of seconds the anytime optimizer may run for.
+        max_iterations: Optional - the number of moves the anytime optimizer may evaluate.
+        target_gap: Optional - the optimality gap at which the optimizers stop improving the route.
+        settings: Optional - the settings to route with instead of those set by initialize_worker. They are passed
+          when jobs run in the current process, so that no module state outlives the call.
+
+    Returns:
+        The distance of the route, the number of the restart, the job with its routes set, and a RouteReport if the
+        anytime optimizer was used.
+
+    Time complexity: That of the routing algorithm used.
+    """
+
+    job.hub = settings if settings is not None else _worker_settings
+    rng_seed = None if seed is None else f'{seed}:{job.truck_id}:{restart}'
+    report = None
+    if time_budget is not None or max_iterations is not None:
+        # Restart 0 uses the same seed as the serial path in Hub.calculate_routes.
+        anytime_seed = None
+        if seed is not None:
+            anytime_seed = seed + job.truck_id if restart == 0 else random.Random(rng_seed).getrandbits(64)
+        report = routing.anytime_route(job, time_budget, max_iterations, anytime_seed, target_gap)
+    elif restart == 0:
+        routing.calculate_route(job, target_gap)
+    else:
+        randomized_route(job, random.Random(rng_seed))
+    distance = routing.calculate_route_distance(job.hub, job.priority_route + job.standard_route)
+    return distance, restart, job, report
+
+
+def randomized_route(job: RouteJob, rng: random.Random):
+    """Calculates a route for a job starting from a random order of its addresses.
+
+    Args:
+        job: The job to calculate the route for.
+        rng: The random number generator used to shuffle the addresses.
+
+    Time complexity: O(n^3), where n is the number of addresses in the route, due to the two-opt algorithm.
+    """
+
+    pinned = [job.current_address_index] + job.priority_1_addresses
+    priority_stops = [address for address in job.priority_package_manifest if address not in pinned]
+    standard_stops = list(job.standard_package_manifest)
+    rng.shuffle(priority_stops)
+    rng.shuffle(standard_stops)
+    job.priority_route = array('i', pinned + priority_stops)
+    job.standard_route = array('i', [job.priority_route[-1]] + standard_stops + [job.hub.addresses.hub_index])
+    routing.two_opt_priority(job)
+    routing.two_opt_standard(job)
+    if job.hub.extended_local_search:
+        routing.local_search_priority(job)
+        routing.local_search_standard(job)
+
+
+def calculate_routes(hub: 'Hub', trucks: list['Truck'], workers: int, restarts: int = 0, seed: Optional[int] = None,
+                     time_budget: Optional[float] = None, max_iterations: Optional[int] = None,
+                     target_gap: Optional[float] = None) -> list['RouteReport']:
+    """Calculates routes for trucks across a pool of worker processes and assigns the shortest route to each truck.
+
+    Each truck gets restarts + 1 jobs. Trucks small enough for the exact Held-Karp algorithm only get one, since
+    restarting cannot improve on it. Ties are broken in favor of the lowest restart number, so the result only depends
+    on the seed and not on the number of workers. With one worker, the jobs run in the current process without shared
+    memory, which gives the same result as the serial path.
+
+    Args:
+        hub: The hub the trucks belong to.
+        trucks: The loaded trucks to calculate routes for.
+        workers: The number of worker processes.
+        restarts: The number of randomized restarts for each truck, in addition to the standard route.
+        seed: Optional - the seed for the randomized restarts, for repeatable results.
+        time_budget: Optional - the number of seconds that may be spent calculating all routes. If provided, every
+          job uses the anytime optimizer, and the budget is shared between the jobs each worker runs.
+        max_iterations: Optional - the number of moves the anytime optimizer may evaluate for each job.
+        target_gap: Optional - the optimality gap at which the optimizers stop improving a route.
+
+    Returns:
+        A RouteReport for the route chosen for each truck, if the anytime optimizer was used.
+
+    Time complexity: That of the routing algorithm used, multiplied by restarts + 1 and divided by the number of
+    workers.
+
+    Space complexity: O(n^2) shared between all workers, where n is the number of addresses, for the distance matrix.
+    """
+
+    jobs = []
+    for truck in trucks:
+        num_stops = max(len(truck.priority_package_manifest), len(truck.standard_package_manifest))
+        exact = num_stops <= hub.held_karp_max_stops and time_budget is None and max_iterations is None
+        num_runs = 1 if exact else restarts + 1
+        jobs.extend((RouteJob(truck), restart) for restart in range(num_runs))
+    job_budget = None if time_budget is None else time_budget * workers / max(len(jobs), 1)
+
+    if workers <= 1:
+        settings = RouteSettings(hub.addresses, hub.extended_local_search, hub.held_karp_max_stops)
+        results = [run_job(job, restart, seed, job_budget, max_iterations, target_gap, settings)
+                   for job, restart in jobs]
+    else:
+        num_addresses = len(hub.addresses.address_strings)
+        distance_bytes = hub.addresses.distance_matrix_bytes()
+        memory = shared_memory.SharedMemory(create=True, size=max(len(distance_bytes), 1))
+        try:
+            memory.buf[:len(distance_bytes)] = distance_bytes
+            with ProcessPoolExecutor(workers, initializer=initialize_worker,
+                                     initargs=(memory.name, num_addresses, hub.addresses.hub_index,
+                                               hub.extended_local_search, hub.held_karp_max_stops,
+                                               hub.addresses.neighbor_lists)) as pool:
+                futures = [pool.submit(run_job, job, restart, seed, job_budget, max_iterations, target_gap)
+                           for job, restart in jobs]
+                results = [future.result() for future in futures]
+        finally:
+            memory.close()
+            memory.unlink()
+
+    best_results = {}
+    for result in results:
+        truck_id = result[2].truck_id
+        if truck_id not in best_results or result[:2] < best_results[truck_id][:2]:
+            best_results[truck_id] = result
+    reports = []
+    for truck in trucks:
+        _, _, job, report = best_results[truck.truck_id]
+        truck.priority_route = array('i', job.priority_route)
+        truck.standard_route = array('i', job.standard_route)
+        if report:
+            reports.append(report)
+    return reports
@@ -1,21 +1,299 @@
 import datetime
-from typing import TYPE_CHECKING
+import json
+import math
+import os
+import random
+import time
+from array import array
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Iterable, Optional, Sequence, Union
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional; the pure-Python implementations are used without it.
+    numpy = None
 
 if TYPE_CHECKING:
+    from address import AddressCollection
     from hub import Hub
     from package import Package, PackageCollection
     from truck import Truck
 
+# Moves must shorten a route by more than this many miles to be accepted. This keeps the local search algorithms from
+# looping on changes that only differ by floating point rounding.
+MIN_IMPROVEMENT = 1e-9
 
-def generate_address_dict(packages: set['Package']) -> dict[str, set['Package']]:
+# Identifies the format of route cache files, so that files written in another format are ignored.
+ROUTE_CACHE_VERSION = 2
+
+
+class RouteReport:
+    """A summary of a run of the anytime route optimizer for a truck.
+
+    Attributes:
+        truck_id: The ID of the truck the route was calculated for.
+        initial_distance: The distance of the route the optimizer started from.
+        final_distance: The distance of the best route found.
+        elapsed_seconds: The time spent calculating the route.
+        iterations: The number of moves the optimizer evaluated.
+        lower_bound: A lower bound on the distance of the shortest possible route, if one was calculated.
+    """
+
+    def __init__(self, truck_id: int, initial_distance: float, final_distance: float, elapsed_seconds: float,
+                 iterations: int, lower_bound: Optional[float] = None):
+        """Initializes RouteReport."""
+
+        self.truck_id = truck_id
+        self.initial_distance = initial_distance
+        self.final_distance = final_distance
+        self.elapsed_seconds = elapsed_seconds
+        self.iterations = iterations
+        self.lower_bound = lower_bound
+
+    def __str__(self) -> str:
+        """Returns the report as a string.
+
+        Returns: A string containing the distances before and after optimizing, the rate of improvement, and the
+        optimality gap if a lower bound was calculated.
+        """
+
+        report = (f'Truck {self.truck_id}: {self.initial_distance:.1f} -> {self.final_distance:.1f} miles '
+                  f'({self.improvement:.1f} miles saved in {self.elapsed_seconds:.3f} seconds, '
+                  f'{self.improvement_per_second:.1f} miles per second, {self.iterations} iterations)')
+        if self.gap is not None:
+            report += f', lower bound {self.lower_bound:.1f} miles, gap {self.gap:.1%}'
+        return report
+
+    @property
+    def improvement(self) -> float:
+        """The number of miles the optimizer saved.
+
+        Returns: The difference between the initial and final distances.
+        """
+
+        return self.initial_distance - self.final_distance
+
+    @property
+    def improvement_per_second(self) -> float:
+        """The rate at which the optimizer shortened the route.
+
+        Returns: The number of miles saved per second of optimizing, or 0 if no time elapsed.
+        """
+
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.improvement / self.elapsed_seconds
+
+    @property
+    def gap(self) -> Optional[float]:
+        """How much longer the route is than the lower bound, as a fraction of the lower bound.
+
+        Returns: The optimality gap of the final route, or None if no lower bound was calculated.
+        """
+
+        if self.lower_bound is None:
+            return None
+        return optimality_gap(self.final_distance, self.lower_bound)
+
+
+class RouteCache:
+    """A least recently used cache of calculated routes, which can be persisted to a JSON file between runs.
+
+    Routes are keyed by the address a truck starts at and the sets of priority 1, priority, and standard addresses on
+    it, so a truck that is loaded with the same addresses as an earlier truck gets the same route without optimizing.
+    The key also holds the routing settings the route was calculated with, so changing a setting never returns a route
+    calculated under the old settings. Addresses are stored as indexes, so a cache file is only valid for the address
+    and distance files it was built from.
+
+    Attributes:
+        routes: The cached priority and standard routes, in order from least to most recently used.
+        max_entries: The number of routes kept before the least recently used route is evicted.
+        file: The path of the file the cache is persisted to, if any.
+        hits: The number of lookups that found a cached route.
+        misses: The number of lookups that did not find a cached route.
+        evictions: The number of routes evicted to stay within max_entries.
+    """
+
+    def __init__(self, max_entries: int = 256, file: Optional[str] = None):
+        """Initializes RouteCache, loading the routes saved in the file if it exists.
+
+        Args:
+            max_entries: The number of routes kept before the least recently used route is evicted.
+            file: Optional - the path of the file the cache is persisted to.
+        """
+
+        self.routes: OrderedDict[tuple, tuple[array, array]] = OrderedDict()
+        self.max_entries = max_entries
+        self.file = file
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Set when the routes change, so that the file is only rewritten when there is something new to save.
+        self._modified = False
+        if file and os.path.exists(file):
+            self.load(file)
+
+    def __len__(self) -> int:
+        """Returns the number of cached routes."""
+
+        return len(self.routes)
+
+    def __str__(self) -> str:
+        """Returns the statistics of the cache as a string.
+
+        Returns: A string containing the number of cached routes, hits, misses, and evictions.
+        """
+
+        return (f'Route cache: {len(self.routes)}/{self.max_entries} routes, {self.hits} hits, {self.misses} misses, '
+                f'{self.evictions} evictions')
+
+    @staticmethod
+    def settings_for(hub: 'Hub', target_gap: Optional[float] = None) -> tuple:
+        """Generates the fingerprint of the settings of a hub that change the routes calculated for its trucks.
+
+        Args:
+            hub: The hub whose settings are used.
+            target_gap: Optional - the optimality gap the route is calculated to.
+
+        Returns:
+            A tuple of the hub's extended_local_search and held_karp_max_stops settings, the number of addresses in each
+            neighbor list of its addresses (None if they have not been built), and the target gap.
+        """
+
+        neighbor_lists = hub.addresses.neighbor_lists
+        num_neighbors = max(map(len, neighbor_lists), default=0) if neighbor_lists is not None else None
+        return bool(hub.extended_local_search), hub.held_karp_max_stops, num_neighbors, target_gap
+
+    @staticmethod
+    def key_for(truck: 'Truck', target_gap: Optional[float] = None) -> tuple:
+        """Generates the cache key for the addresses loaded on a truck.
+
+        Args:
+            truck: The truck to generate the key for.
+            target_gap: Optional - the optimality gap the route is calculated to.
+
+        Returns:
+            A tuple of the index of the truck's current address, frozen sets of the indexes of its priority 1,
+            priority, and standard addresses, and the fingerprint of the routing settings from settings_for.
+        """
+
+        return (truck.current_address_index, frozenset(truck.priority_1_addresses),
+                frozenset(truck.priority_package_manifest), frozenset(truck.standard_package_manifest),
+                RouteCache.settings_for(truck.hub, target_gap))
+
+    def get(self, key: tuple) -> Optional[tuple[array, array]]:
+        """Looks up a cached route and marks it as the most recently used.
+
+        Args:
+            key: The key generated by key_for.
+
+        Returns:
+            The cached priority and standard routes, or None if the route is not cached.
+
+        Time complexity: O(1).
+        """
+
+        routes = self.routes.get(key)
+        if routes is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.routes.move_to_end(key)
+        return routes
+
+    def put(self, key: tuple, priority_route: 'array', standard_route: 'array'):
+        """Adds a route to the cache, evicting the least recently used routes if the cache is full.
+
+        Args:
+            key: The key generated by key_for.
+            priority_route: The calculated priority route.
+            standard_route: The calculated standard route.
+
+        Time complexity: O(n), where n is the number of addresses in the route, to copy the routes.
+        """
+
+        self.routes[key] = (array('i', priority_route), array('i', standard_route))
+        self.routes.move_to_end(key)
+        while len(self.routes) > self.max_entries:
+            self.routes.popitem(last=False)
+            self.evictions += 1
+        self._modified = True
+
+    def load(self, file: str) -> bool:
+        """Loads the routes saved in a cache file, replacing the routes currently in the cache.
+
+        Args:
+            file: The path of the cache file.
+
+        Returns:
+            True if the file was loaded, False if it could not be read or was written in another format. Files written
+            before the routing settings were part of the key have another version and are discarded.
+
+        Time complexity: O(n), where n is the combined length of the cached routes.
+        """
+
+        try:
+            with open(file, encoding='utf-8') as cache:
+                data = json.load(cache)
+            if not isinstance(data, dict) or data.get('version') != ROUTE_CACHE_VERSION:
+                return False
+            routes = OrderedDict()
+            for start, priority_1, priority, standard, settings, priority_route, standard_route in data['routes']:
+                key = (start, frozenset(priority_1), frozenset(priority), frozenset(standard), tuple(settings))
+                routes[key] = (array('i', priority_route), array('i', standard_route))
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+        # Keep the most recently used routes if the file holds more than max_entries.
+        while len(routes) > self.max_entries:
+            routes.popitem(last=False)
+        self.routes = routes
+        self._modified = False
+        return True
+
+    def save(self, file: Optional[str] = None):
+        """Writes the cached routes to a JSON file if they have changed since they were loaded or last saved.
+
+        The file is written to a temporary path first and then moved into place, so an interrupted write never leaves
+        a partial cache file behind.
+
+        Args:
+            file: Optional - the path of the file to write. Defaults to the cache's file.
+
+        Raises:
+            OSError: If the directory or the file cannot be written.
+
+        Time complexity: O(n), where n is the combined length of the cached routes.
+        """
+
+        file = file or self.file
+        if not file or not self._modified:
+            return
+
+        routes = [[key[0], sorted(key[1]), sorted(key[2]), sorted(key[3]), list(key[4]), list(priority_route),
+                   list(standard_route)]
+                  for key, (priority_route, standard_route) in self.routes.items()]
+        directory = os.path.dirname(file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f'{file}.{os.getpid()}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as cache:
+            json.dump({'version': ROUTE_CACHE_VERSION, 'routes': routes}, cache)
+        os.replace(temp_file, file)
+        self._modified = False
+
+
+def generate_address_dict(packages: set['Package'], by_index: bool = False) -> dict[Union[str, int], set['Package']]:
     """Generates a dictionary containing addresses and their associated packages.
 
     Groups packages by delivery address into sets.
 
     Args:
         packages: The packages to generate the dictionary for.
+        by_index: Optional - uses the index of each address in the distance matrix as the key instead of the address
+          string. This is the form used by truck manifests, which are looked up with the address indexes in a route.
 
-    Returns: A dictionary containing strings of addresses as keys and their associated packages as values.
+    Returns: A dictionary containing strings (or indexes) of addresses as keys and their associated packages as values.
 
     Time complexity: O(n), where n is the number of packages being passed in.
 
@@ -24,7 +302,7 @@ def generate_address_dict(packages: set['Package']) -> dict[str, set['Package']]
 
     packages_by_address = {}
     for package in packages:
-        address = package.address
+        address = package.address_index if by_index else package.address
         if address in packages_by_address:
             packages_by_address[address].add(package)
         else:
@@ -32,24 +310,6 @@ def generate_address_dict(packages: set['Package']) -> dict[str, set['Package']]
     return packages_by_address
 
 
-def calculate_delivery_groups(packages: set['Package']):
-    """Assign group numbers to packages that share an address with one or more other packages.
-
-    Args:
-        packages: The packages to evaluate.
-
-    Time complexity: O(n), where n is the number of packages being evaluated.
-    """
-
-    delivery_group = 0
-    packages_by_address = generate_address_dict(packages)
-    for address, packages in packages_by_address.items():
-        if len(packages) > 1:
-            delivery_group += 1
-            for package in packages:
-                package.set_delivery_group(delivery_group)
-
-
 def calculate_delivery_priority(package_collection: 'PackageCollection', packages: set['Package']):
     """Calculates the priority number for packages with a deadline and adds them to a set in the package collection.
 
@@ -71,8 +331,9 @@ def calculate_delivery_priority(package_collection: 'PackageCollection', package
             package_collection.priority_2_packages.add(package)
 
 
-def generate_priority_dict(packages: set['Package']) -> dict[str, set['Package']]:
-    """Generates a dictionary with addresses that have priority packages as strings and lists of packages as keys.
+def generate_priority_dict(packages: set['Package']) -> dict[int, set['Package']]:
+    """Generates a dictionary with the indexes of addresses that have priority packages as keys and sets of packages as
+    values.
 
     Adds all packages with priority numbers to the dictionary and also adds non-priority packages sharing the same
     address.
@@ -81,7 +342,8 @@ def generate_priority_dict(packages: set['Package']) -> dict[str, set['Package']
         packages: The packages to evaluate.
 
     Returns:
-        A dictionary with address strings that have assigned priority packages as keys, and sets of packages as values.
+        A dictionary with the indexes of addresses that have assigned priority packages as keys, and sets of packages as
+        values.
 
     Time complexity: O(n), where n is the number of packages being evaluated.
 
@@ -102,47 +364,7 @@ def generate_priority_dict(packages: set['Package']) -> dict[str, set['Package']
         if priority_packages and package.delivery_group in delivery_groups and package not in priority_packages:
             priority_packages.add(package)
 
-    return generate_address_dict(priority_packages)
-
-
-def generate_delivery_group_dict(packages: set['Package']) -> dict[str, set['Package']]:
-    """Generates a dictionary containing all delivery groups and their associated packages.
-
-    Args:
-        packages: The packages to be evaluated.
-
-    Returns: A dictionary with address strings containing one or more packages as keys and sets of packages
-      associated with those addresses as values.
-
-    Time complexity: O(n), where n is the number of packages being evaluated.
-
-    Space complexity: O(n), where n is the number of packages being evaluated.
-    """
-
-    all_address_dict = generate_address_dict(packages)
-    delivery_group_dict = {address: packages for address, packages in all_address_dict.items() if len(packages) > 1}
-    return delivery_group_dict
-
-
-def generate_single_package_delivery_set(packages: set['Package']) -> set['Package']:
-    """Generates a set of packages for addresses that have only one package assigned to them.
-
-    Args:
-        packages: The packages to be evaluated.
-
-    Returns: A set containing packages that are destined for addresses that only have one package assigned to them.
-
-    Time complexity: O(n), where n is the number of packages being evaluated.
-
-    Space complexity: O(n), where n is the number of packages being evaluated.
-    """
-
-    all_address_dict = generate_address_dict(packages)
-    single_addresses = set()
-    for packages in all_address_dict.values():
-        if len(packages) == 1:
-            single_addresses.add(next(iter(packages)))
-    return single_addresses
+    return generate_address_dict(priority_packages, by_index=True)
 
 
 def floyd_warshall(distance_matrix: list[list[float]]):
@@ -174,6 +396,34 @@ def floyd_warshall(distance_matrix: list[list[float]]):
     return distance_matrix
 
 
+def floyd_warshall_vectorized(distance_matrix) -> 'numpy.ndarray':
+    """Calculates the distance of the shortest possible path between two addresses using NumPy.
+
+    Produces the same distances as floyd_warshall, but performs each iteration of k as a single broadcast update of
+    the whole matrix instead of looping over every pair of addresses in Python. The distance from i to j through k is
+    the sum of column k and row k, which is compared against the current matrix in place.
+
+    Args:
+        distance_matrix: The distance matrix to be optimized. Can be a 2-dimensional list or a NumPy array.
+
+    Returns: The optimized distance matrix as a contiguous NumPy array of floats.
+
+    Time complexity: O(n^3), where n is the number of vertices contained in the distance matrix. Only the loop over k
+      runs in Python; the n^2 comparisons for each k are vectorized.
+
+    Space complexity: O(n^2), where n is the number of vertices contained in the distance matrix, since the
+      returned matrix and the buffer used for the candidate distances are of size n x n.
+    """
+
+    matrix = numpy.array(distance_matrix, dtype=numpy.float64, order='C')
+    through_k = numpy.empty_like(matrix)
+    for k in range(len(matrix)):
+        # Distance from every i to every j when passing through k, followed by an element-wise minimum.
+        numpy.add(matrix[:, k, numpy.newaxis], matrix[k], out=through_k)
+        numpy.minimum(matrix, through_k, out=matrix)
+    return matrix
+
+
 def nearest_neighbor(truck: 'Truck'):
     """Optimizes the distance of a route by continuously finding the next closest address and appending it to a list.
 
@@ -182,168 +432,1747 @@ def nearest_neighbor(truck: 'Truck'):
     ensures that priority packages are delivered first in the route, even though it may not provide as short a route
     as if all the addresses were considered as one group.
 
+    If the distance matrix is a NumPy array and no neighbor lists have been built, the nearest address is found with
+    nearest_neighbor_order_vectorized. Both implementations break ties in favor of the address added to the manifest
+    first, so they build the same route.
+
     Args:
         truck: The truck that the route is being calculated for.
 
-    Time complexity: O(n), where n is the number of addresses in the route.
+    Time complexity: O(n^2), where n is the number of addresses in the route.
 
-    Space complexity: O(n), where n is the number of addresses in the route.
+    Space complexity: O(n), where n is the number of addresses in the route. O(n^2) if the distance matrix is a NumPy
+    array, due to the distances between the addresses being copied into a smaller matrix.
     """
 
-    priority_addresses = list(truck.priority_package_manifest.keys())
-    current_address = truck.current_address
-    priority_route = [current_address]
-    standard_addresses = list(truck.standard_package_manifest.keys())
-    nearest_address = None
-    min_distance = float('inf')  # Initialize min_distance with infinity.
+    addresses = truck.hub.addresses
+    if addresses.neighbor_lists is None and numpy is not None and isinstance(addresses.distance_matrix, numpy.ndarray):
+        order = nearest_neighbor_order_vectorized
+    else:
+        order = nearest_neighbor_order
 
     # If the truck has priority 1 packages, add their addresses to the route first and do not consider these
     # addresses for optimization.
-    if truck.priority_1_addresses:
-        for address in truck.priority_1_addresses:
-            priority_route.append(address)
-            priority_addresses.remove(address)
-
-    # Calculate the address closest to the truck's current address and append it to the route.
-    while priority_addresses:
-        for address in priority_addresses:
-            distance = truck.hub.addresses.distance_between(current_address, address)
-            if distance < min_distance:
-                min_distance = distance
-                nearest_address = address
-        priority_route.append(nearest_address)
-        current_address = nearest_address
-        priority_addresses.remove(current_address)
-        min_distance = float('inf')
+    priority_route = array('i', [truck.current_address_index])
+    priority_route.extend(truck.priority_1_addresses)
+    priority_addresses = [address for address in truck.priority_package_manifest
+                          if address not in truck.priority_1_addresses]
+    priority_route.extend(order(addresses, priority_route[-1], priority_addresses))
 
     # Repeat the step from above with addresses that do not have priority packages.
-    standard_route = [current_address]
-    while standard_addresses:
-        for address in standard_addresses:
-            distance = truck.hub.addresses.distance_between(current_address, address)
-            if distance < min_distance:
-                min_distance = distance
-                nearest_address = address
-        standard_route.append(nearest_address)
-        current_address = nearest_address
-        standard_addresses.remove(current_address)
-        min_distance = float('inf')
+    standard_route = array('i', [priority_route[-1]])
+    standard_route.extend(order(addresses, standard_route[0], list(truck.standard_package_manifest)))
 
     # Add the hub's address to the end of the route and assign the routes to the truck.
-    standard_route.append(truck.hub.addresses.hub_address)
+    standard_route.append(addresses.hub_index)
     truck.priority_route = priority_route
     truck.standard_route = standard_route
 
 
-def two_opt_priority(truck: 'Truck'):
-    """Optimizes the distance of a route by iterating through pairs of addresses in a route and swapping them.
+def nearest_neighbor_order(addresses: 'AddressCollection', start: int, stops: list[int]) -> list[int]:
+    """Orders addresses by repeatedly visiting the closest address that has not been visited yet.
 
-    After swapping a pair of edges, the algorithm calculates the new distance and keeps the new route if it is shorter.
-    It continues this process until it is unable to find a shorter route after an iteration. This implementation of the
-    two opt algorithm considers only the priority addresses in a truck's route, and ensures that addresses that have
-    priority 1 addresses are placed first in the route.
+    If the AddressCollection has neighbor lists, the closest address is looked for in the neighbor list of the current
+    address first, and all the remaining addresses are only searched when none of its neighbors is closer than the
+    last one in the list. The result is the same either way.
 
     Args:
-        truck: The truck that the route is being optimized for.
+        addresses: The AddressCollection containing the distance matrix.
+        start: The index of the address the route starts from, which is not included in the result.
+        stops: The indexes of the addresses to visit. The list is emptied as addresses are visited.
 
-    Time complexity: O(n^3), where n is the number of addresses in the route. This is because even though the
-    nested for loop performs n^2 operations in each iteration, it may iterate x times as long as it finds improvement.
-    With this said, the algorithm will often complete in closer to O(n^2), since it stops as soon as it does not find
-    an improved route after an iteration.
+    Returns:
+        The indexes of the addresses in the order they are visited.
 
-    Space complexity: O(n), where n is the number of addresses in the route.
+    Time complexity: O(n^2), where n is the number of addresses. O(nk) with neighbor lists of length k if most
+    addresses have an unvisited stop in their neighbor list.
+
+    Space complexity: O(n), where n is the number of addresses.
     """
 
-    num_priority_1_addresses = len(truck.priority_1_addresses)
-    route = truck.priority_route[:]
-    lowest_distance = calculate_route_distance(truck.hub, route)
+    distance = addresses.distance_by_index
+    neighbor_lists = addresses.neighbor_lists
+    # The position of each unvisited stop in the list. Dictionaries keep their order when keys are deleted, so
+    # iterating over it visits the stops in the same order as the list.
+    unvisited = {address: position for position, address in enumerate(stops)}
+    route = []
+    current_address = start
+    min_distance = float('inf')  # Initialize min_distance with infinity.
+
+    # Calculate the address closest to the current address and append it to the route.
+    while unvisited:
+        nearest_address = None
+        if neighbor_lists:
+            nearest_address = _nearest_neighbor_candidate(distance, neighbor_lists[current_address], current_address,
+                                                          unvisited)
+        if nearest_address is None:
+            for address in unvisited:
+                address_distance = distance(current_address, address)
+                if address_distance < min_distance:
+                    min_distance = address_distance
+                    nearest_address = address
+        route.append(nearest_address)
+        current_address = nearest_address
+        del unvisited[current_address]
+        min_distance = float('inf')
+    stops.clear()
+    return route
+
+
+def _nearest_neighbor_candidate(distance, neighbors: Sequence[int], address: int,
+                                positions: dict[int, int]) -> Optional[int]:
+    """Returns the closest unvisited stop in a neighbor list if no stop outside the list can be as close.
+
+    Used by nearest_neighbor_order. Of several stops at the same distance, the one earliest in the list of stops is
+    returned.
+
+    Args:
+        distance: The function used to look up the distance between two address indexes.
+        neighbors: The neighbor list of the current address.
+        address: The index of the current address.
+        positions: The position of each unvisited stop in the list of stops.
+
+    Returns:
+        The index of the closest stop, or None if the neighbor list cannot show which stop is closest.
+
+    Time complexity: O(k), where k is the length of the neighbor list.
+    """
+
+    nearest_address = None
+    min_distance = float('inf')
+    for neighbor in neighbors:
+        neighbor_distance = distance(address, neighbor)
+        if neighbor_distance > min_distance:
+            # Neighbors are ordered by distance, so no stop further down the list can be as close.
+            return nearest_address
+        if neighbor in positions and (nearest_address is None or positions[neighbor] < positions[nearest_address]):
+            min_distance = neighbor_distance
+            nearest_address = neighbor
+    # Stops outside the list may be as close as the last neighbor, in which case the list is not conclusive.
+    if nearest_address is not None and min_distance < distance(address, neighbors[-1]):
+        return nearest_address
+    return None
+
+
+def nearest_neighbor_order_vectorized(addresses: 'AddressCollection', start: int, stops: list[int]) -> list[int]:
+    """Orders addresses by repeatedly visiting the closest address that has not been visited yet, using NumPy.
+
+    The distances between the stops are copied into a smaller matrix once. Each step then reads the row of the current
+    address as a vector, adds a mask that is infinite for visited stops, and picks the closest stop with argmin, which
+    returns the first of several equally close stops just as nearest_neighbor_order does.
+
+    Args:
+        addresses: The AddressCollection containing the distance matrix, which must be a NumPy array.
+        start: The index of the address the route starts from, which is not included in the result.
+        stops: The indexes of the addresses to visit.
+
+    Returns:
+        The indexes of the addresses in the order they are visited.
+
+    Time complexity: O(n^2), where n is the number of addresses, with each step of n operations done by NumPy.
+
+    Space complexity: O(n^2), where n is the number of addresses.
+    """
+
+    if not stops:
+        return []
+    matrix = addresses.distance_matrix
+    stop_indexes = numpy.array(stops, dtype=numpy.intp)
+    stop_distances = matrix[numpy.ix_(stop_indexes, stop_indexes)]
+    visited = numpy.zeros(len(stops))
+    row = matrix[start, stop_indexes]
+    order = []
+    for _ in range(len(stops)):
+        position = int(numpy.argmin(row + visited))
+        order.append(position)
+        visited[position] = numpy.inf
+        row = stop_distances[position]
+    return stop_indexes[order].tolist()
+
+
+def clarke_wright_savings(addresses: 'AddressCollection', units: list[list[int]], loads: list[int],
+                          restrictions: list[Optional[int]], capacity: int) -> list[tuple[list[int], list[int]]]:
+    """Groups units of addresses into truck routes with the Clarke-Wright savings algorithm.
+
+    Each unit starts on a route of its own from the hub and back. The saving of joining the routes ending at addresses
+    i and j is d(hub, i) + d(hub, j) - d(i, j), the distance saved by driving from i to j instead of returning to the
+    hub in between. Pairs are considered from the largest saving to the smallest, and two routes are joined at i and j
+    if both are at an end of their route, the combined load fits in a truck, and the routes are not restricted to
+    different trucks. A unit is never split, so the addresses in a unit always end up on the same route.
+
+    Args:
+        addresses: The AddressCollection containing the distance matrix.
+        units: The indexes of the addresses in each unit, in the order they are visited.
+        loads: The number of packages in each unit.
+        restrictions: The ID of the truck each unit must be loaded on, or None if it may be loaded on any truck.
+        capacity: The number of packages that fit in a truck.
+
+    Returns:
+        A list with a tuple for each route, containing the indexes of its addresses in order and the indexes of its
+        units.
+
+    Time complexity: O(n^2 log n), where n is the number of addresses, due to sorting the savings of every pair of
+    addresses.
+
+    Space complexity: O(n^2), where n is the number of addresses.
+    """
+
+    hub_index = addresses.hub_index
+    route_addresses: dict[int, list[int]] = {}
+    route_units: dict[int, list[int]] = {}
+    route_loads: dict[int, int] = {}
+    route_restrictions: dict[int, Optional[int]] = {}
+    route_of: dict[int, int] = {}
+    for unit, unit_addresses in enumerate(units):
+        route_addresses[unit] = list(unit_addresses)
+        route_units[unit] = [unit]
+        route_loads[unit] = loads[unit]
+        route_restrictions[unit] = restrictions[unit]
+        for address in unit_addresses:
+            route_of[address] = unit
+
+    for i, j in savings_order(addresses, hub_index, list(route_of)):
+        first, second = route_of[i], route_of[j]
+        if first == second:
+            continue
+        first_route, second_route = route_addresses[first], route_addresses[second]
+        if i not in (first_route[0], first_route[-1]) or j not in (second_route[0], second_route[-1]):
+            continue
+        if route_loads[first] + route_loads[second] > capacity:
+            continue
+        first_restriction, second_restriction = route_restrictions[first], route_restrictions[second]
+        if first_restriction and second_restriction and first_restriction != second_restriction:
+            continue
+
+        # Orient the routes so that the first route ends at i and the second route starts at j, then join them.
+        if first_route[-1] != i:
+            first_route.reverse()
+        if second_route[0] != j:
+            second_route.reverse()
+        first_route.extend(second_route)
+        route_units[first].extend(route_units.pop(second))
+        route_loads[first] += route_loads.pop(second)
+        route_restrictions[first] = first_restriction or second_restriction
+        del route_restrictions[second]
+        for address in route_addresses.pop(second):
+            route_of[address] = first
+
+    return [(route_addresses[route], route_units[route]) for route in route_addresses]
+
+
+def savings_order(addresses: 'AddressCollection', hub_index: int, stops: list[int]) -> list[tuple[int, int]]:
+    """Orders the pairs of stops with a positive saving from the largest saving to the smallest.
+
+    Pairs with equal savings are ordered by their position in stops, so the order is the same with and without NumPy.
+    If the AddressCollection has neighbor lists, only pairs in which one stop is in the neighbor list of the other are
+    considered, since joining stops that are far apart rarely saves much.
+
+    Args:
+        addresses: The AddressCollection containing the distance matrix.
+        hub_index: The index of the hub's address.
+        stops: The indexes of the addresses to pair.
+
+    Returns:
+        The pairs of address indexes in order of their savings.
+
+    Time complexity: O(n^2 log n), where n is the number of stops. O(nk log nk) with neighbor lists of length k.
+
+    Space complexity: O(n^2), where n is the number of stops. O(nk) with neighbor lists of length k.
+    """
+
+    distance = addresses.distance_by_index
+    if addresses.neighbor_lists is not None:
+        positions = {stop: position for position, stop in enumerate(stops)}
+        pair_positions = set()
+        for position, i in enumerate(stops):
+            for j in addresses.neighbor_lists[i]:
+                if j in positions:
+                    pair_positions.add((min(position, positions[j]), max(position, positions[j])))
+        pairs = []
+        for first, second in pair_positions:
+            i, j = stops[first], stops[second]
+            saving = distance(hub_index, i) + distance(hub_index, j) - distance(i, j)
+            if saving > 0:
+                pairs.append((-saving, first, second, i, j))
+        pairs.sort()
+        return [(i, j) for _, _, _, i, j in pairs]
+
+    if numpy is not None and isinstance(addresses.distance_matrix, numpy.ndarray):
+        stop_indexes = numpy.array(stops, dtype=numpy.intp)
+        hub_distances = addresses.distance_matrix[hub_index, stop_indexes]
+        savings = (hub_distances[:, None] + hub_distances[None, :] -
+                   addresses.distance_matrix[numpy.ix_(stop_indexes, stop_indexes)])
+        rows, columns = numpy.triu_indices(len(stops), k=1)
+        pair_savings = savings[rows, columns]
+        positive = pair_savings > 0
+        rows, columns, pair_savings = rows[positive], columns[positive], pair_savings[positive]
+        order = numpy.argsort(-pair_savings, kind='stable')
+        return list(zip(stop_indexes[rows[order]].tolist(), stop_indexes[columns[order]].tolist()))
+
+    pairs = []
+    for position, i in enumerate(stops):
+        for j in stops[position + 1:]:
+            saving = distance(hub_index, i) + distance(hub_index, j) - distance(i, j)
+            if saving > 0:
+                pairs.append((-saving, len(pairs), i, j))
+    pairs.sort()
+    return [(i, j) for _, _, i, j in pairs]
+
+
+def two_opt(addresses: 'AddressCollection', route: 'array', first_index: int = 1, fixed_end: bool = True,
+            deadline: Optional[float] = None) -> float:
+    """Optimizes the distance of a route by reversing segments of the route while doing so makes it shorter.
+
+    Reversing the segment from swap_first to swap_last replaces the edge entering the segment and the edge leaving it
+    with two new edges. Because the distance matrix is symmetric, the edges inside the segment keep their length, so
+    the change in distance of a move is calculated from the four addresses at the ends of these edges instead of
+    from the whole route. Moves that make the route shorter are applied to the route in place. The algorithm continues
+    until it is unable to find a shorter route after an iteration.
+
+    Args:
+        addresses: The AddressCollection containing the distance matrix.
+        route: The address indexes of the route being optimized. The route is modified in place.
+        first_index: The index of the first address in the route that may be moved. Addresses before it, such as the
+          truck's starting address, keep their position.
+        fixed_end: Whether the last address in the route, such as the return to the hub, keeps its position.
+        deadline: Optional - a time.perf_counter() value after which the algorithm stops, even if the route could
+          still be improved.
+
+    Returns: The number of miles the route was shortened by.
+
+    Time complexity: O(n^3), where n is the number of addresses in the route. Each iteration scores n^2 moves in
+    constant time each and reverses an O(n) segment for each improving move. The algorithm will often complete in
+    closer to O(n^2), since it stops as soon as it does not find an improved route after an iteration. If the
+    AddressCollection has neighbor lists, each iteration only scores O(nk) moves, as described in two_opt_neighbors.
+
+    Space complexity: O(n), where n is the number of addresses in the route, for the reversed segment.
+    """
+
+    distance = addresses.distance_by_index
+    route_length = len(route)
+    # swap_last may not go past this index. If the end of the route is fixed, the last address is excluded.
+    stop_index = route_length - 1 if fixed_end else route_length
+    if addresses.neighbor_lists is not None:
+        return two_opt_neighbors(addresses, route, first_index, stop_index, deadline)
+    total_improvement = 0.0
     improvement = True
     while improvement:
         improvement = False
-        # Only swap addresses that do not contain the hub address, which is the first address in the route, or the
-        # priority 1 addresses, which are the addresses immediately following the hub address.
-        for swap_first in range(1 + num_priority_1_addresses, len(route)):
-            for swap_last in range(swap_first + 1, len(route)):
-                new_route = route[:]
-                # swap_last + 1 is used so that the reversed call is inclusive of the swap_last element.
-                new_route[swap_first:swap_last + 1] = reversed(route[swap_first:swap_last + 1])
-                new_distance = calculate_route_distance(truck.hub, new_route)
-                if new_distance < lowest_distance:
-                    route = new_route
-                    lowest_distance = new_distance
+        for swap_first in range(first_index, stop_index):
+            if deadline is not None and time.perf_counter() >= deadline:
+                return total_improvement
+            before = route[swap_first - 1]
+            for swap_last in range(swap_first + 1, stop_index):
+                first = route[swap_first]
+                last = route[swap_last]
+                # Replace the edges (before, first) and (last, after) with (before, last) and (first, after). If the
+                # segment runs to the end of an open route, there is no edge leaving it.
+                change = distance(before, last) - distance(before, first)
+                if swap_last + 1 < route_length:
+                    after = route[swap_last + 1]
+                    change += distance(first, after) - distance(last, after)
+                if change < -MIN_IMPROVEMENT:
+                    # swap_last + 1 is used so that the reversed slice is inclusive of the swap_last element.
+                    route[swap_first:swap_last + 1] = route[swap_first:swap_last + 1][::-1]
+                    total_improvement -= change
                     improvement = True
-    truck.priority_route = route
+    return total_improvement
 
 
-def two_opt_standard(truck: 'Truck'):
-    """Optimizes the distance of a route by iterating through pairs of addresses in a route and swapping them.
+def two_opt_neighbors(addresses: 'AddressCollection', route: 'array', first_index: int, stop_index: int,
+                      deadline: Optional[float] = None) -> float:
+    """Optimizes the distance of a route with 2-opt moves that connect an address to one of its nearest addresses.
 
-    After swapping a pair of edges, the algorithm calculates the new distance and keeps the new route if it is shorter.
-    It continues this process until it is unable to find a shorter route after an iteration. This implementation of the
-    two opt algorithm considers only the non-priority addresses in a truck's route.
+    A 2-opt move can only make a route shorter if at least one of its two new edges is shorter than the edge it
+    replaces at the same address. For the edge entering each position, the addresses in the neighbor list of the
+    address before it that are closer than the current edge are tried as the other end of the reversed segment. The
+    edge leaving each position is searched the same way from the address after it. Neighbor lists are ordered by
+    distance, so each search stops at the first neighbor that is too far away. Used by two_opt.
 
     Args:
-        truck: The truck that the route is being optimized for.
+        addresses: The AddressCollection containing the distance matrix and the neighbor lists.
+        route: The address indexes of the route being optimized. The route is modified in place.
+        first_index: The index of the first address in the route that may be moved.
+        stop_index: The index after the last address in the route that may be moved.
+        deadline: Optional - a time.perf_counter() value after which the algorithm stops.
 
-    Time complexity: O(n^3), where n is the number of addresses in the route. This is because even though the
-    nested for loop performs n^2 operations in each iteration, it may iterate x times as long as it finds improvement.
-    With this said, the algorithm will often complete in closer to O(n^2), since it stops as soon as it does not find
-    an improved route after an iteration.
+    Returns: The number of miles the route was shortened by.
 
-    Space complexity: O(n), where n is the number of addresses in the route.
+    Time complexity: O(nk) for each iteration, where n is the number of addresses in the route and k is the length of
+    the neighbor lists, plus O(n) to reverse the segment of each improving move.
+
+    Space complexity: O(n), where n is the number of addresses in the route, for the positions of the addresses.
     """
 
-    route = truck.standard_route[:]
-    lowest_distance = calculate_route_distance(truck.hub, route)
+    distance = addresses.distance_by_index
+    neighbor_lists = addresses.neighbor_lists
+    route_length = len(route)
+    positions = {route[i]: i for i in range(first_index, stop_index)}
+
+    def reverse(swap_first: int, swap_last: int):
+        route[swap_first:swap_last + 1] = route[swap_first:swap_last + 1][::-1]
+        for i in range(swap_first, swap_last + 1):
+            positions[route[i]] = i
+
+    total_improvement = 0.0
     improvement = True
     while improvement:
         improvement = False
-        # This range prevents swapping of first and last elements of the route, which are current address and
-        # shipping hub.
-        for swap_first in range(1, len(route) - 1):
-            for swap_last in range(swap_first + 1, len(route) - 1):
-                new_route = route[:]
-                # swap_last + 1 is used so that the reversed call is inclusive of the swap_last element.
-                new_route[swap_first:swap_last + 1] = reversed(route[swap_first:swap_last + 1])
-                new_distance = calculate_route_distance(truck.hub, new_route)
-                if new_distance < lowest_distance:
-                    route = new_route
-                    lowest_distance = new_distance
+        for position in range(first_index, stop_index):
+            if deadline is not None and time.perf_counter() >= deadline:
+                return total_improvement
+
+            # Reverse route[position:swap_last + 1] so that the address before it is followed by one of its neighbors.
+            before, first = route[position - 1], route[position]
+            removed_edge = distance(before, first)
+            for last in neighbor_lists[before]:
+                added_edge = distance(before, last)
+                if added_edge >= removed_edge:
+                    break
+                swap_last = positions.get(last)
+                if swap_last is None or swap_last <= position:
+                    continue
+                change = added_edge - removed_edge
+                if swap_last + 1 < route_length:
+                    after = route[swap_last + 1]
+                    change += distance(first, after) - distance(last, after)
+                if change < -MIN_IMPROVEMENT:
+                    reverse(position, swap_last)
+                    total_improvement -= change
+                    improvement = True
+                    break
+
+            # Reverse route[swap_first:position + 1] so that one of the neighbors of the address after it precedes it.
+            if position + 1 >= route_length:
+                continue
+            last, after = route[position], route[position + 1]
+            removed_edge = distance(last, after)
+            for first in neighbor_lists[after]:
+                added_edge = distance(first, after)
+                if added_edge >= removed_edge:
+                    break
+                swap_first = positions.get(first)
+                if swap_first is None or swap_first >= position:
+                    continue
+                before = route[swap_first - 1]
+                change = added_edge - removed_edge + distance(before, last) - distance(before, first)
+                if change < -MIN_IMPROVEMENT:
+                    reverse(swap_first, position)
+                    total_improvement -= change
                     improvement = True
-    truck.standard_route = route
+                    break
+    return total_improvement
+
+
+def two_opt_priority(truck: 'Truck'):
+    """Optimizes the priority addresses in a truck's route with the two opt algorithm.
+
+    This implementation of the two opt algorithm considers only the priority addresses in a truck's route, and ensures
+    that the hub address and the priority 1 addresses are kept first in the route. Because the standard route starts at
+    the last address of the priority route, the start of the standard route is updated if the last priority address
+    changes.
+
+    Args:
+        truck: The truck that the route is being optimized for.
+
+    Time complexity: O(n^3), where n is the number of addresses in the route, as described in two_opt.
+
+    Space complexity: O(n), where n is the number of addresses in the route.
+    """
+
+    # Only swap addresses that do not contain the hub address, which is the first address in the route, or the
+    # priority 1 addresses, which are the addresses immediately following the hub address.
+    two_opt(truck.hub.addresses, truck.priority_route, 1 + len(truck.priority_1_addresses), fixed_end=False)
+    if truck.standard_route and truck.priority_route:
+        truck.standard_route[0] = truck.priority_route[-1]
+
+
+def two_opt_standard(truck: 'Truck'):
+    """Optimizes the standard addresses in a truck's route with the two opt algorithm.
+
+    This implementation of the two opt algorithm considers only the non-priority addresses in a truck's route. The
+    first and last elements of the route, which are the truck's address at the end of the priority route and the
+    shipping hub, keep their positions.
+
+    Args:
+        truck: The truck that the route is being optimized for.
+
+    Time complexity: O(n^3), where n is the number of addresses in the route, as described in two_opt.
+
+    Space complexity: O(n), where n is the number of addresses in the route.
+    """
+
+    two_opt(truck.hub.addresses, truck.standard_route)
+
+
+def local_search(addresses: 'AddressCollection', route: 'array', first_index: int = 1, fixed_end: bool = True,
+                 max_segment_length: int = 3) -> float:
+    """Optimizes the distance of a route with 2-opt, Or-opt, and restricted 3-opt moves.
+
+    Every address that may be moved starts on a queue. When an address is taken from the queue, the moves that break
+    an edge at that address are scored, and the first move that makes the route shorter is applied. The addresses at
+    the ends of the edges changed by the move are put back on the queue. Addresses whose neighbors have not changed
+    are not looked at again (their "don't look bit" is set), so after the first pass only the parts of the route that
+    actually changed are searched. The algorithm stops once the queue is empty.
+
+    The moves considered for an address are:
+      - 2-opt: reversing a segment of the route that starts or ends at the address.
+      - Or-opt: moving a segment of up to max_segment_length addresses that starts at the address to another position
+        in the route, in either direction.
+      - Restricted 3-opt: exchanging a longer segment that starts at the address with the segment that follows it.
+        Only segments for which the first new edge is shorter than the edge it replaces are considered.
+
+    Args:
+        addresses: The AddressCollection containing the distance matrix.
+        route: The address indexes of the route being optimized. The route is modified in place.
+        first_index: The index of the first address in the route that may be moved.
+        fixed_end: Whether the last address in the route, such as the return to the hub, keeps its position.
+        max_segment_length: The length of the longest segment moved by Or-opt moves.
+
+    If the AddressCollection has neighbor lists, only the moves that create an edge between an address and one of its
+    nearest addresses are scored.
+
+    Returns: The number of miles the route was shortened by.
+
+    Time complexity: O(n^2) for each address taken from the queue, where n is the number of addresses in the route,
+    due to the 3-opt moves. In practice far fewer moves are scored, since most segments fail the 3-opt restriction and
+    addresses are only revisited when their neighbors change. With neighbor lists of length k, O(k^2) moves are scored
+    for each address, plus O(n) to apply each improving move.
+
+    Space complexity: O(n), where n is the number of addresses in the route.
+    """
+
+    distance = addresses.distance_by_index
+    # Addresses at positions first_index up to, but not including, stop_index may be moved.
+    stop_index = len(route) - 1 if fixed_end else len(route)
+    if stop_index - first_index < 2:
+        return 0.0
+
+    queue = deque(route[first_index:stop_index])
+    queued = set(queue)
+    positions = {route[i]: i for i in range(first_index, stop_index)}
+    total_improvement = 0.0
+    while queue:
+        address = queue.popleft()
+        queued.discard(address)
+        move = _improve_at(distance, route, positions[address], first_index, stop_index, max_segment_length,
+                           addresses.neighbor_lists, positions)
+        if move is None:
+            continue
+        improvement, changed_addresses = move
+        total_improvement += improvement
+        positions = {route[i]: i for i in range(first_index, stop_index)}
+        for changed_address in changed_addresses:
+            if changed_address in positions and changed_address not in queued:
+                queue.append(changed_address)
+                queued.add(changed_address)
+    return total_improvement
+
+
+def _improve_at(distance, route: 'array', position: int, first_index: int, stop_index: int,
+                max_segment_length: int, neighbor_lists: Optional[list['array']] = None,
+                positions: Optional[dict[int, int]] = None) -> Optional[tuple[float, tuple]]:
+    """Applies the first move found that breaks an edge at an address and makes the route shorter.
+
+    Used by local_search. See local_search for a description of the moves. If neighbor lists are provided, the
+    candidate moves are generated from them instead: 2-opt and Or-opt moves that place the address or segment next to
+    one of its neighbors, and 3-opt moves whose two new edges at the ends of the first segment both connect neighbors.
+
+    Args:
+        distance: The function used to look up the distance between two address indexes.
+        route: The address indexes of the route. The route is modified in place if a move is applied.
+        position: The position in the route of the address to search from.
+        first_index: The index of the first address in the route that may be moved.
+        stop_index: The index after the last address in the route that may be moved.
+        max_segment_length: The length of the longest segment moved by Or-opt moves.
+        neighbor_lists: Optional - the nearest addresses to each address, from AddressCollection.neighbor_lists.
+        positions: The position of each address that may be moved. Required if neighbor_lists is provided.
+
+    Returns: The number of miles saved and the addresses at the ends of the changed edges if a move was applied, None
+      otherwise.
+
+    Time complexity: O(n^2), where n is the number of addresses in the route. O(k^2 + n) with neighbor lists of length
+    k.
+    """
+
+    route_length = len(route)
+    # The position after which the last edge of the route may be changed. An open route may gain a new last address.
+    last_edge = route_length - 1 if stop_index == route_length else route_length - 2
+
+    def edge(first, second):
+        # The length of an edge, where an open route has no edge after its last address.
+        return 0.0 if second is None else distance(first, second)
+
+    def neighbor_positions(address: int) -> list[int]:
+        # The positions of the neighbors of an address that may be moved, from the closest to the farthest.
+        return [positions[neighbor] for neighbor in neighbor_lists[address] if neighbor in positions]
+
+    # 2-opt: reverse route[swap_first:swap_last + 1], where the segment starts or ends at the address.
+    if neighbor_lists is None:
+        candidates = [(position, swap_last) for swap_last in range(position + 1, stop_index)]
+        candidates += [(swap_first, position) for swap_first in range(first_index, position)]
+    else:
+        # Reverse the segments that make the address and a neighbor at position q adjacent.
+        candidates = []
+        for q in neighbor_positions(route[position]):
+            if q > position:
+                candidates += [(position + 1, q), (position, q - 1)]
+            else:
+                candidates += [(q + 1, position), (q, position - 1)]
+        candidates = [(swap_first, swap_last) for swap_first, swap_last in candidates
+                      if first_index <= swap_first < swap_last < stop_index]
+    for swap_first, swap_last in candidates:
+        before, first, last = route[swap_first - 1], route[swap_first], route[swap_last]
+        after = route[swap_last + 1] if swap_last + 1 < route_length else None
+        change = distance(before, last) + edge(first, after) - distance(before, first) - edge(last, after)
+        if change < -MIN_IMPROVEMENT:
+            route[swap_first:swap_last + 1] = route[swap_first:swap_last + 1][::-1]
+            return -change, (before, first, last, after)
+
+    # Or-opt: move route[position:segment_end + 1] between two other consecutive addresses, optionally reversed.
+    before = route[position - 1]
+    for segment_end in range(position, min(position + max_segment_length, stop_index)):
+        start, end = route[position], route[segment_end]
+        after = route[segment_end + 1] if segment_end + 1 < route_length else None
+        removal_gain = distance(before, start) + edge(end, after) - edge(before, after)
+        if neighbor_lists is None:
+            insert_positions = range(first_index - 1, last_edge + 1)
+        else:
+            # Insert the segment directly before or after a neighbor of either of its ends.
+            insert_positions = sorted({insert_after for q in neighbor_positions(start) + neighbor_positions(end)
+                                       for insert_after in (q - 1, q) if first_index - 1 <= insert_after <= last_edge})
+        for insert_after in insert_positions:
+            if position - 1 <= insert_after <= segment_end:
+                continue
+            left = route[insert_after]
+            right = route[insert_after + 1] if insert_after + 1 < route_length else None
+            for reverse in ((False, True) if segment_end > position else (False,)):
+                head, tail = (end, start) if reverse else (start, end)
+                change = distance(left, head) + edge(tail, right) - edge(left, right) - removal_gain
+                if change < -MIN_IMPROVEMENT:
+                    segment = route[position:segment_end + 1]
+                    if reverse:
+                        segment = segment[::-1]
+                    remaining = route[:position] + route[segment_end + 1:]
+                    insert_index = insert_after + 1 if insert_after < position else insert_after + 1 - len(segment)
+                    route[:] = remaining[:insert_index] + segment + remaining[insert_index:]
+                    return -change, (before, start, end, after, left, right)
+
+    # Restricted 3-opt: exchange route[position:segment_end + 1] with route[segment_end + 1:second_end + 1]. Shorter
+    # first segments are already covered by Or-opt moves.
+    start = route[position]
+    removed_first_edge = distance(before, start)
+    if neighbor_lists is None:
+        segment_ends = range(position + max_segment_length, stop_index - 1)
+    else:
+        # The second segment starts at a neighbor of the address before the first segment.
+        segment_ends = [q - 1 for q in neighbor_positions(before)
+                        if position + max_segment_length <= q - 1 < stop_index - 1]
+        second_ends = neighbor_positions(start)
+    for segment_end in segment_ends:
+        end, second_start = route[segment_end], route[segment_end + 1]
+        first_edge_gain = removed_first_edge - distance(before, second_start)
+        if first_edge_gain <= MIN_IMPROVEMENT:
+            continue
+        gain = first_edge_gain + distance(end, second_start)
+        if neighbor_lists is None:
+            second_end_positions = range(segment_end + 1, stop_index)
+        else:
+            # The second segment ends at a neighbor of the first address of the first segment.
+            second_end_positions = [q for q in second_ends if segment_end < q]
+        for second_end in second_end_positions:
+            second_last = route[second_end]
+            after = route[second_end + 1] if second_end + 1 < route_length else None
+            change = distance(second_last, start) + edge(end, after) - edge(second_last, after) - gain
+            if change < -MIN_IMPROVEMENT:
+                route[:] = (route[:position] + route[segment_end + 1:second_end + 1] +
+                            route[position:segment_end + 1] + route[second_end + 1:])
+                return -change, (before, start, end, second_start, second_last, after)
+
+    return None
+
+
+def local_search_priority(truck: 'Truck'):
+    """Optimizes the priority addresses in a truck's route with the local_search algorithm.
+
+    The hub address and the priority 1 addresses are kept first in the route, and the start of the standard route is
+    updated if the last priority address changes.
+
+    Args:
+        truck: The truck that the route is being optimized for.
 
+    Time complexity: See local_search.
+    """
+
+    local_search(truck.hub.addresses, truck.priority_route, 1 + len(truck.priority_1_addresses), fixed_end=False)
+    if truck.standard_route and truck.priority_route:
+        truck.standard_route[0] = truck.priority_route[-1]
+
+
+def local_search_standard(truck: 'Truck'):
+    """Optimizes the standard addresses in a truck's route with the local_search algorithm.
+
+    The first and last addresses of the route keep their positions.
+
+    Args:
+        truck: The truck that the route is being optimized for.
+
+    Time complexity: See local_search.
+    """
+
+    local_search(truck.hub.addresses, truck.standard_route)
+
+
+def inter_route_search(trucks: list['Truck'], bound_packages: set['Package'],
+                       max_segment_length: int = 2) -> tuple[float, list[tuple[int, int, int]]]:
+    """Shortens the combined routes of several trucks by moving stops between them.
+
+    Each move exchanges a segment of up to max_segment_length stops on one truck's route with a segment of up to
+    max_segment_length stops on another truck's route. Exchanging a segment with an empty one relocates the segment,
+    exchanging two single stops swaps them, and exchanging two longer segments is a cross-exchange. Segments keep their
+    order, so each move only changes the four edges at the ends of the segments and is scored in constant time.
+
+    A move is only made if it is allowed for every stop it moves and fits the capacity of both trucks:
+      - Priority stops stay among the priority stops of the other truck and standard stops among the standard stops,
+        so priority packages are still delivered first. The starting address and priority 1 addresses never move.
+      - Stops with bound packages never move, since all bound packages must stay on the same truck.
+      - Stops with packages restricted to a truck only move to that truck.
+      - Stops are not moved to a truck that already visits the same address.
+
+    Pairs of trucks are searched until neither route can be improved, and the pairs involving a truck whose route
+    changed are searched again. The trucks' routes are updated in place, but their packages are not moved.
+
+    Args:
+        trucks: The trucks whose routes are improved. Their routes must already be calculated.
+        bound_packages: The packages that must stay on the same truck.
+        max_segment_length: The length of the longest segment moved.
+
+    Returns:
+        The number of miles the combined routes were shortened by, and the moves that were made as tuples of the
+        index of an address, the position in trucks of the truck it was moved from, and the position of the truck it
+        was moved to.
+
+    Time complexity: O(k^2 * n^2) for each pair of trucks searched, where n is the number of stops on a route and k is
+    max_segment_length.
+
+    Space complexity: O(n), where n is the total number of stops on all routes.
+    """
+
+    if len(trucks) < 2:
+        return 0.0, []
+    distance = trucks[0].hub.addresses.distance_by_index
+
+    # Each route is handled as one list, starting at the truck's current address and ending at the hub, in which the
+    # priority stops are at positions first up to split and the standard stops are at positions split up to end.
+    routes = [list(truck.priority_route) + list(truck.standard_route[1:]) for truck in trucks]
+    firsts = [1 + len(truck.priority_1_addresses) for truck in trucks]
+    splits = [len(truck.priority_route) for truck in trucks]
+    loads = [len(truck.packages_on_truck) for truck in trucks]
+    capacities = [truck.package_capacity for truck in trucks]
+    truck_ids = [truck.truck_id for truck in trucks]
+
+    # The number of packages for each stop, and the ID of the truck each stop may move to. A stop that may move to any
+    # truck has an allowed truck of None, and a stop that may not move has an allowed truck of -1.
+    stop_loads: list[dict[int, int]] = []
+    allowed_trucks: list[dict[int, int]] = []
+    for truck in trucks:
+        truck_stop_loads, truck_allowed_trucks = {}, {}
+        for manifest in (truck.priority_package_manifest, truck.standard_package_manifest):
+            for address, packages in manifest.items():
+                restrictions = {package.truck_restriction for package in packages if package.truck_restriction}
+                truck_stop_loads[address] = len(packages)
+                if any(package in bound_packages for package in packages) or len(restrictions) > 1:
+                    truck_allowed_trucks[address] = -1
+                else:
+                    truck_allowed_trucks[address] = next(iter(restrictions), None)
+        stop_loads.append(truck_stop_loads)
+        allowed_trucks.append(truck_allowed_trucks)
+
+    def segment_cost(previous: int, segment: list[int], following: int) -> float:
+        """Returns the length of the edges joining a segment to its neighbors."""
+
+        if not segment:
+            return distance(previous, following)
+        return distance(previous, segment[0]) + distance(segment[-1], following)
+
+    def can_move(segment: list[int], source: int, target: int) -> bool:
+        """Returns whether every stop in a segment may be moved from one truck to another."""
+
+        for address in segment:
+            allowed = allowed_trucks[source].get(address, -1)
+            if allowed == -1 or (allowed is not None and allowed != truck_ids[target]) or address in route_sets[target]:
+                return False
+        return True
+
+    def segment_starts(route: int, length: int) -> list[tuple[int, bool]]:
+        """Returns each position a segment may start at, and whether the position is among the priority stops."""
+
+        first, split, end = firsts[route], splits[route], len(routes[route]) - 1
+        starts = []
+        if length == 0:
+            # An empty segment is a gap in front of a position, which may be at the end of either group of stops.
+            starts.extend((position, True) for position in range(first, split + 1))
+            starts.extend((position, False) for position in range(split, end + 1))
+        else:
+            starts.extend((position, True) for position in range(first, split - length + 1))
+            starts.extend((position, False) for position in range(split, end - length + 1))
+        return starts
+
+    def best_move(a: int, b: int) -> Optional[tuple[float, int, int, int, int, bool]]:
+        """Finds the exchange between two routes that shortens them the most."""
+
+        route_a, route_b = routes[a], routes[b]
+        best = None
+        best_gain = MIN_IMPROVEMENT
+        for length_a in range(max_segment_length + 1):
+            starts_a = segment_starts(a, length_a)
+            for length_b in range(max_segment_length + 1):
+                if length_a == 0 and length_b == 0:
+                    continue
+                starts_b = segment_starts(b, length_b)
+                for i, priority_a in starts_a:
+                    segment_a = route_a[i:i + length_a]
+                    load_a = sum(stop_loads[a][address] for address in segment_a)
+                    if not can_move(segment_a, a, b):
+                        continue
+                    previous_a, following_a = route_a[i - 1], route_a[i + length_a]
+                    cost_a = segment_cost(previous_a, segment_a, following_a)
+                    for j, priority_b in starts_b:
+                        if priority_a != priority_b:
+                            continue
+                        segment_b = route_b[j:j + length_b]
+                        load_b = sum(stop_loads[b][address] for address in segment_b)
+                        if loads[a] - load_a + load_b > capacities[a] or loads[b] - load_b + load_a > capacities[b]:
+                            continue
+                        previous_b, following_b = route_b[j - 1], route_b[j + length_b]
+                        gain = (cost_a + segment_cost(previous_b, segment_b, following_b) -
+                                segment_cost(previous_a, segment_b, following_a) -
+                                segment_cost(previous_b, segment_a, following_b))
+                        if gain > best_gain and can_move(segment_b, b, a):
+                            best_gain = gain
+                            best = (gain, i, length_a, j, length_b, priority_a)
+        return best
+
+    route_sets = [set(route) for route in routes]
+    moves = []
+    total_improvement = 0.0
+    pairs = deque((a, b) for a in range(len(trucks)) for b in range(a + 1, len(trucks)))
+    queued = set(pairs)
+    while pairs:
+        a, b = pairs.popleft()
+        queued.discard((a, b))
+        move = best_move(a, b)
+        if move is None:
+            continue
+        gain, i, length_a, j, length_b, priority = move
+        total_improvement += gain
+        segment_a, segment_b = routes[a][i:i + length_a], routes[b][j:j + length_b]
+        routes[a][i:i + length_a] = segment_b
+        routes[b][j:j + length_b] = segment_a
+        if priority:
+            splits[a] += length_b - length_a
+            splits[b] += length_a - length_b
+        for source, target, segment in ((a, b, segment_a), (b, a, segment_b)):
+            for address in segment:
+                route_sets[source].discard(address)
+                route_sets[target].add(address)
+                stop_load = stop_loads[source].pop(address)
+                stop_loads[target][address] = stop_load
+                allowed_trucks[target][address] = allowed_trucks[source].pop(address)
+                loads[source] -= stop_load
+                loads[target] += stop_load
+                moves.append((address, source, target))
+
+        # Search the pair again, along with every other pair that involves one of the changed routes.
+        for other in range(len(trucks)):
+            for pair in ((min(a, other), max(a, other)), (min(b, other), max(b, other))):
+                if pair[0] != pair[1] and pair not in queued:
+                    pairs.append(pair)
+                    queued.add(pair)
+
+    for truck, route, split in zip(trucks, routes, splits):
+        truck.priority_route = array('i', route[:split])
+        truck.standard_route = array('i', route[split - 1:])
+    return total_improvement, moves
+
+
+def delivery_deadlines(truck: 'Truck') -> dict[int, float]:
+    """Calculates how far a truck may drive before reaching each address with a deadline.
+
+    Deadlines are converted to miles using the truck's current time as the start of the route and the truck's speed,
+    so that they can be compared to distances along the route directly.
+
+    Args:
+        truck: The truck to calculate the deadlines for. Its date_time must be set.
+
+    Returns:
+        A dictionary with the index of each address that has a package with a deadline as keys, and the number of
+        miles the truck may drive before reaching the address as values.
+
+    Time complexity: O(n), where n is the number of packages on the truck.
+
+    Space complexity: O(n), where n is the number of addresses in the truck's manifests.
+    """
+
+    latest = {}
+    for manifest in (truck.priority_package_manifest, truck.standard_package_manifest):
+        for address, packages in manifest.items():
+            miles = latest_arrival(truck, packages)
+            if miles != math.inf:
+                latest[address] = miles
+    return latest
+
+
+def latest_arrival(truck: 'Truck', packages: Iterable['Package']) -> float:
+    """Calculates how far a truck may drive before it must deliver a set of packages to meet all of their deadlines.
+
+    Args:
+        truck: The truck delivering the packages. Its date_time must be set.
+        packages: The packages, which are delivered together.
+
+    Returns:
+        The number of miles the truck may drive, or infinity if none of the packages has a deadline.
+
+    Time complexity: O(n), where n is the number of packages.
+    """
+
+    start_time = truck.date_time
+    latest = math.inf
+    for package in packages:
+        if package.deadline == 'EOD':
+            continue
+        deadline = datetime.datetime.combine(start_time.date(), package.deadline)
+        latest = min(latest, (deadline - start_time).total_seconds() / 3600 * truck.speed)
+    return latest
+
+
+def route_lateness(addresses: 'AddressCollection', route: Sequence[int], latest: dict[int, float]) -> float:
+    """Calculates how late a route reaches the address it is latest for.
+
+    Args:
+        addresses: The AddressCollection containing the distance matrix.
+        route: The address indexes of the route, starting at the truck's current address.
+        latest: The number of miles that may be driven before reaching each address with a deadline.
+
+    Returns:
+        The largest number of miles by which the route overshoots the deadline of an address, or 0 if the route meets
+        every deadline.
+
+    Time complexity: O(n), where n is the number of addresses in the route.
+    """
+
+    distance = addresses.distance_by_index
+    lateness = 0.0
+    miles = 0.0
+    for k in range(1, len(route)):
+        miles += distance(route[k - 1], route[k])
+        lateness = max(lateness, miles - latest.get(route[k], math.inf))
+    return lateness
+
+
+def time_window_search(addresses: 'AddressCollection', route: 'array', latest: dict[int, float],
+                       first_index: int = 1, max_segment_length: int = 3) -> Optional[float]:
+    """Optimizes the distance of a route with 2-opt and Or-opt moves that keep every address within its deadline.
+
+    The last address of the route, the return to the hub, keeps its position. Any other order of the addresses is
+    accepted as long as each address is reached within its deadline, which is given as the number of miles that may be
+    driven before reaching it.
+
+    The feasibility of each move is checked in O(1) time using two arrays calculated from the current route:
+      - The forward array holds the distance driven before reaching each position.
+      - The backward slack array holds, for each position, the largest delay that every position from it to the end of
+        the route can absorb without missing a deadline.
+    A move shifts the arrival times of at most three blocks of addresses. The block after the move is checked against
+    the backward slack, and the blocks inside the move are checked against a running minimum of the slack that is
+    extended by one position each time the move is widened. Both arrays are recalculated in O(n) time after each
+    improving move is made.
+
+    Args:
+        addresses: The AddressCollection containing the distance matrix.
+        route: The address indexes of the route being optimized. The route is modified in place.
+        latest: The number of miles that may be driven before reaching each address with a deadline.
+        first_index: The index of the first address in the route that may be moved.
+        max_segment_length: The length of the longest segment moved by Or-opt moves.
+
+    Returns:
+        The number of miles the route was shortened by, or None if the route misses a deadline to begin with, in
+        which case it is not changed.
+
+    Time complexity: O(n^2) for each improving move, where n is the number of addresses in the route.
+
+    Space complexity: O(n), where n is the number of addresses in the route.
+    """
+
+    distance = addresses.distance_by_index
+    stop_index = len(route) - 1
+    # Allow for rounding when comparing distances to deadlines.
+    tolerance = 1e-9
+    total_improvement = 0.0
+
+    while True:
+        forward = [0.0] * len(route)
+        for k in range(1, len(route)):
+            forward[k] = forward[k - 1] + distance(route[k - 1], route[k])
+        slack = [latest.get(address, math.inf) - forward[k] for k, address in enumerate(route)]
+        # Moves never make a route miss a deadline, so this can only happen before the first move.
+        if min(slack) < -tolerance:
+            return None
+        backward_slack = slack + [math.inf]
+        for k in range(len(route) - 1, -1, -1):
+            backward_slack[k] = min(slack[k], backward_slack[k + 1])
+
+        move = None
+        for i in range(first_index, stop_index):
+            if move:
+                break
+            previous = route[i - 1]
+
+            # 2-opt: reverse route[i..j]. With a symmetric distance matrix, position k of the reversed segment is
+            # reached after base + forward[j] - forward[k] miles, so every address in it is on time if base + forward[j]
+            # does not exceed the smallest latest[k] + forward[k] in the segment.
+            reversed_limit = math.inf
+            for j in range(i, stop_index):
+                reversed_limit = min(reversed_limit, slack[j] + 2 * forward[j])
+                if j == i:
+                    continue
+                following = route[j + 1]
+                gain = (distance(previous, route[i]) + distance(route[j], following) -
+                        distance(previous, route[j]) - distance(route[i], following))
+                if gain <= MIN_IMPROVEMENT:
+                    continue
+                base = forward[i - 1] + distance(previous, route[j])
+                after_delay = base + forward[j] - forward[i] + distance(route[i], following) - forward[j + 1]
+                if base + forward[j] <= reversed_limit + tolerance and after_delay <= backward_slack[j + 1] + tolerance:
+                    move = ('reverse', i, j, None, gain)
+                    break
+            if move:
+                break
+
+            # Or-opt: move route[i..j] to another position without reversing it.
+            for j in range(i, min(i + max_segment_length, stop_index)):
+                segment_slack = min(slack[i:j + 1])
+                segment_length = forward[j] - forward[i]
+                following = route[j + 1]
+                removal_gain = (distance(previous, route[i]) + distance(route[j], following) -
+                                distance(previous, following))
+                if removal_gain <= MIN_IMPROVEMENT:
+                    continue
+
+                # Forward: the addresses route[j + 1..p] are reached earlier, and the segment follows route[p].
+                closing_shift = forward[i - 1] + distance(previous, following) - forward[j + 1]
+                block_slack = math.inf
+                for p in range(j + 1, stop_index):
+                    block_slack = min(block_slack, slack[p])
+                    after = route[p + 1]
+                    gain = removal_gain - (distance(route[p], route[i]) + distance(route[j], after) -
+                                           distance(route[p], after))
+                    if gain <= MIN_IMPROVEMENT or closing_shift > block_slack + tolerance:
+                        continue
+                    segment_start = forward[p] + closing_shift + distance(route[p], route[i])
+                    after_delay = segment_start + segment_length + distance(route[j], after) - forward[p + 1]
+                    if (segment_start - forward[i] <= segment_slack + tolerance and
+                            after_delay <= backward_slack[p + 1] + tolerance):
+                        move = ('forward', i, j, p, gain)
+                        break
+                if move:
+                    break
+
+                # Backward: the segment follows route[p - 1], and the addresses route[p..i - 1] are reached later.
+                block_slack = math.inf
+                for p in range(i - 1, first_index - 1, -1):
+                    block_slack = min(block_slack, slack[p])
+                    before = route[p - 1]
+                    gain = removal_gain - (distance(before, route[i]) + distance(route[j], route[p]) -
+                                           distance(before, route[p]))
+                    if gain <= MIN_IMPROVEMENT:
+                        continue
+                    segment_start = forward[p - 1] + distance(before, route[i])
+                    block_shift = segment_start + segment_length + distance(route[j], route[p]) - forward[p]
+                    after_delay = forward[i - 1] + block_shift + distance(previous, following) - forward[j + 1]
+                    if (segment_start - forward[i] <= segment_slack + tolerance and
+                            block_shift <= block_slack + tolerance and
+                            after_delay <= backward_slack[j + 1] + tolerance):
+                        move = ('backward', i, j, p, gain)
+                        break
+                if move:
+                    break
+
+        if move is None:
+            return total_improvement
+        kind, i, j, p, gain = move
+        segment = route[i:j + 1]
+        if kind == 'reverse':
+            segment.reverse()
+            route[i:j + 1] = segment
+        elif kind == 'forward':
+            route[i:p + 1] = route[j + 1:p + 1] + segment
+        else:
+            route[p:j + 1] = segment + route[p:i]
+        total_improvement += gain
+
+
+def deadline_route(truck: 'Truck') -> bool:
+    """Reorders a truck's calculated route so that it is as short as possible while still meeting every deadline.
+
+    The route calculated by the other algorithms delivers every priority address before any standard address, which
+    meets the deadlines but may not be the shortest route that does. This optimizes the priority and standard routes
+    as one route with time_window_search, which may mix priority and standard addresses and no longer keeps priority
+    1 addresses at the front. The route is then split after the last priority address.
+
+    Args:
+        truck: The truck whose route is reordered. Its routes must already be calculated and its date_time set to the
+          time it leaves the hub.
+
+    Returns:
+        True if the route was reordered, False if the truck's time is not set or the route already misses a deadline.
+
+    Time complexity: See time_window_search.
+    """
+
+    if truck.date_time is None:
+        return False
+    route = truck.priority_route + truck.standard_route[1:]
+    if time_window_search(truck.hub.addresses, route, delivery_deadlines(truck)) is None:
+        return False
+
+    split = 1
+    for position in range(1, len(route) - 1):
+        if route[position] in truck.priority_package_manifest:
+            split = position + 1
+    truck.priority_route = route[:split]
+    truck.standard_route = route[split - 1:]
+    return True
+
+
+def cheapest_pickup_insertion(addresses: 'AddressCollection', route: Sequence[int], first_gap: int, pickup: int,
+                              delivery: int, arrivals: Sequence[float], loads: Sequence[int], slack: Sequence[float],
+                              speed: float, size: int, capacity: int,
+                              deadline: Optional[float] = None) -> Optional[tuple[float, int, int]]:
+    """Finds the cheapest positions to insert a pickup stop and a later delivery stop into a route that is under way.
+
+    Gap g of the route is between route[g - 1] and route[g]. The pickup is inserted at one gap and the delivery at
+    the same or a later gap, so the packages are on the truck from the pickup until the delivery. The added distance
+    of each stop is calculated from the two addresses around its gap, and the capacity and deadline checks read the
+    loads and slack of the stops between the two gaps as running maximums and minimums, so every pair of gaps is
+    scored in constant time. Since these only get worse as the delivery gap moves later, the search for a pickup gap
+    stops at the first delivery gap that breaks them.
+
+    Args:
+        addresses: The AddressCollection containing the distance matrix.
+        route: The address indexes of the route. The last address, such as the return to the hub, keeps its position.
+        first_gap: The first gap at which stops may be inserted. Must be at least 1.
+        pickup: The index of the address the packages are picked up at.
+        delivery: The index of the address the packages are delivered to.
+        arrivals: The planned arrival time in hours of each stop in the route, from position first_gap - 1 on.
+        loads: The number of packages on the truck after each stop, from position first_gap - 1 on.
+        slack: The number of hours each stop may be delayed by without missing a deadline, from position first_gap - 1
+          on. Stops without a deadline have infinite slack.
+        speed: The average speed of the truck in miles per hour.
+        size: The number of packages picked up.
+        capacity: The number of packages the truck can hold.
+        deadline: Optional - the latest arrival time in hours at the delivery address.
+
+    Returns:
+        The number of miles added to the route and the pickup and delivery gaps, or None if the packages cannot be
+        inserted without breaking the truck's capacity or a deadline.
+
+    Time complexity: O(n^2), where n is the number of stops after first_gap.
+
+    Space complexity: O(n), where n is the number of stops in the route, for the suffix minimums of the slack.
+    """
+
+    distance = addresses.distance_by_index
+    num_stops = len(route)
+    # min_slack_after[q] is the smallest slack of the stops from position q to the end of the route.
+    min_slack_after = [math.inf] * (num_stops + 1)
+    for q in range(num_stops - 1, first_gap - 1, -1):
+        min_slack_after[q] = min(slack[q], min_slack_after[q + 1])
+
+    best = None
+    for pickup_gap in range(first_gap, num_stops):
+        before, after = route[pickup_gap - 1], route[pickup_gap]
+        if loads[pickup_gap - 1] + size > capacity:
+            continue
+        to_pickup = distance(before, pickup)
+        removed_edge = distance(before, after)
+
+        # Deliver the packages directly after picking them up.
+        added = to_pickup + distance(pickup, delivery) + distance(delivery, after) - removed_edge
+        arrival = arrivals[pickup_gap - 1] + (to_pickup + distance(pickup, delivery)) / speed
+        if (added / speed <= min_slack_after[pickup_gap] and (deadline is None or arrival <= deadline) and
+                (best is None or added < best[0])):
+            best = (added, pickup_gap, pickup_gap)
+
+        # Deliver the packages at a later gap. The stops in between are delayed by the pickup and are made with the
+        # packages on the truck.
+        pickup_added = to_pickup + distance(pickup, after) - removed_edge
+        pickup_delay = pickup_added / speed
+        max_load = loads[pickup_gap - 1]
+        min_slack = math.inf
+        for delivery_gap in range(pickup_gap + 1, num_stops):
+            previous = delivery_gap - 1
+            max_load = max(max_load, loads[previous])
+            min_slack = min(min_slack, slack[previous])
+            if max_load + size > capacity or pickup_delay > min_slack:
+                break
+            before_delivery, after_delivery = route[previous], route[delivery_gap]
+            added = pickup_added + (distance(before_delivery, delivery) + distance(delivery, after_delivery) -
+                                    distance(before_delivery, after_delivery))
+            if added / speed > min_slack_after[delivery_gap] or (best is not None and added >= best[0]):
+                continue
+            arrival = arrivals[previous] + pickup_delay + distance(before_delivery, delivery) / speed
+            if deadline is None or arrival <= deadline:
+                best = (added, pickup_gap, delivery_gap)
+    return best
+
+
+def held_karp(addresses: 'AddressCollection', start: int, stops: Sequence[int]) -> tuple[list[float], list]:
+    """Calculates the shortest path from a starting address through every address in a set of stops.
+
+    This is the Held-Karp dynamic programming algorithm. Each subset of the stops is represented by a bitmask, and for
+    every subset and every address in it, the table stores the length of the shortest path that starts at start,
+    visits every address in the subset, and ends at that address. Subsets are evaluated in increasing order of their
+    bitmask, so every path is extended from subsets that are already complete.
+
+    Args:
+        addresses: The AddressCollection containing the distance matrix.
+        start: The index of the address the path starts at.
+        stops: The indexes of the addresses the path must visit.
+
+    Returns: A list containing, for each stop, the length of the shortest path through all stops that ends at that
+      stop, and the table of parents used by held_karp_path to rebuild the path.
+
+    Time complexity: O(2^n * n^2), where n is the number of stops.
+
+    Space complexity: O(2^n * n), where n is the number of stops.
+    """
+
+    distance = addresses.distance_by_index
+    num_stops = len(stops)
+    if not num_stops:
+        return [], []
+    infinity = float('inf')
+    stop_distances = [[distance(stop, other) for other in stops] for stop in stops]
+    costs: list[Optional[list[float]]] = [None] * (1 << num_stops)
+    parents: list[Optional[list[int]]] = [None] * (1 << num_stops)
+    for i in range(num_stops):
+        costs[1 << i] = [infinity] * num_stops
+        costs[1 << i][i] = distance(start, stops[i])
+        parents[1 << i] = [-1] * num_stops
+
+    for mask in range(1, 1 << num_stops):
+        mask_costs = costs[mask]
+        for last in range(num_stops):
+            cost = mask_costs[last]
+            if cost == infinity:
+                continue
+            last_distances = stop_distances[last]
+            for next_stop in range(num_stops):
+                bit = 1 << next_stop
+                if mask & bit:
+                    continue
+                next_mask = mask | bit
+                next_costs = costs[next_mask]
+                if next_costs is None:
+                    next_costs = costs[next_mask] = [infinity] * num_stops
+                    parents[next_mask] = [-1] * num_stops
+                next_cost = cost + last_distances[next_stop]
+                if next_cost < next_costs[next_stop]:
+                    next_costs[next_stop] = next_cost
+                    parents[next_mask][next_stop] = last
+
+    return costs[-1], parents
+
+
+def held_karp_path(stops: Sequence[int], parents: list, end: int) -> list[int]:
+    """Rebuilds the shortest path calculated by held_karp that ends at a given stop.
 
-def calculate_route_distance(hub: 'Hub', route: list[str]) -> float:
+    Args:
+        stops: The indexes of the addresses that were passed to held_karp.
+        parents: The table of parents returned by held_karp.
+        end: The position in stops of the address the path ends at.
+
+    Returns: The address indexes of the path in order, not including the starting address.
+
+    Time complexity: O(n), where n is the number of stops.
+    """
+
+    path = []
+    mask = (1 << len(stops)) - 1
+    while end != -1:
+        path.append(stops[end])
+        previous = parents[mask][end]
+        mask ^= 1 << end
+        end = previous
+    path.reverse()
+    return path
+
+
+def held_karp_route(truck: 'Truck'):
+    """Calculates the shortest possible route for a truck that visits its priority addresses before its standard ones.
+
+    The priority route starts at the truck's current address followed by any priority 1 addresses, as with
+    nearest_neighbor, and the standard route ends at the hub. held_karp is run once from the last pinned address over
+    the priority addresses and once from the hub over the standard addresses. Because the distance matrix is
+    symmetric, the second table gives the shortest path from each standard address back to the hub. Both tables are
+    reused to choose the pair of addresses where the priority route ends and the standard route begins, which makes the
+    combined route optimal rather than each segment on its own.
+
+    Args:
+        truck: The truck the route is being calculated for.
+
+    Time complexity: O(2^p * p^2 + 2^s * s^2 + p * s), where p and s are the number of priority and standard
+    addresses.
+
+    Space complexity: O(2^p * p + 2^s * s).
+    """
+
+    addresses = truck.hub.addresses
+    distance = addresses.distance_by_index
+    hub_index = addresses.hub_index
+    priority_route = array('i', [truck.current_address_index])
+    priority_route.extend(truck.priority_1_addresses)
+    priority_stops = [address for address in truck.priority_package_manifest if address not in priority_route]
+    standard_stops = list(truck.standard_package_manifest)
+
+    priority_costs, priority_parents = held_karp(addresses, priority_route[-1], priority_stops)
+    standard_costs, standard_parents = held_karp(addresses, hub_index, standard_stops)
+    # Candidate ends of the priority route, as (position in priority_stops, path length). If there are no priority
+    # addresses to optimize, the priority route ends at the last pinned address.
+    priority_ends = list(enumerate(priority_costs)) or [(-1, 0.0)]
+
+    best = (float('inf'), -1, -1)
+    for priority_end, priority_cost in priority_ends:
+        end_address = priority_stops[priority_end] if priority_end != -1 else priority_route[-1]
+        if not standard_stops:
+            best = min(best, (priority_cost + distance(end_address, hub_index), priority_end, -1))
+            continue
+        for standard_start, standard_cost in enumerate(standard_costs):
+            total = priority_cost + distance(end_address, standard_stops[standard_start]) + standard_cost
+            best = min(best, (total, priority_end, standard_start))
+
+    _, priority_end, standard_start = best
+    if priority_end != -1:
+        priority_route.extend(held_karp_path(priority_stops, priority_parents, priority_end))
+    standard_route = array('i', [priority_route[-1]])
+    if standard_start != -1:
+        # The path runs from the hub to the first standard address, so it is reversed to end at the hub.
+        standard_route.extend(reversed(held_karp_path(standard_stops, standard_parents, standard_start)))
+    standard_route.append(hub_index)
+    truck.priority_route = priority_route
+    truck.standard_route = standard_route
+
+
+def route_lower_bound(addresses: 'AddressCollection', start: int, stops: Sequence[int], end: int,
+                      upper_bound: Optional[float] = None, iterations: int = 100) -> float:
+    """Calculates a lower bound on the distance of any route from start through every stop to end.
+
+    This uses the Held-Karp relaxation. A route is a spanning tree of its addresses in which every stop has two
+    neighbors and the start and end have one (or, if the route returns to where it started, a 1-tree in which every
+    address has two neighbors). The cheapest such tree is therefore no longer than the shortest route. Penalties are
+    added to the distances of addresses that have too many or too few neighbors in the tree, which makes the tree more
+    like a route, and the penalties are adjusted by subgradient optimization to raise the bound. Every tree found,
+    minus the penalties, is a valid lower bound, so the best one is returned. If the best tree has the neighbors of a
+    route, it is one, and the bound is exact.
+
+    Args:
+        addresses: The AddressCollection containing the distance matrix.
+        start: The index of the address the route starts at.
+        stops: The indexes of the addresses the route visits.
+        end: The index of the address the route ends at.
+        upper_bound: Optional - the distance of a known route, which is used to size the subgradient steps. If not
+          provided, twice the first tree is used, which is never shorter than the shortest route.
+        iterations: The number of subgradient steps.
+
+    Returns:
+        The lower bound, in miles.
+
+    Time complexity: O(i * n^2), where i is the number of iterations and n is the number of stops, due to finding the
+    cheapest tree with Prim's algorithm on each iteration.
+
+    Space complexity: O(n^2), where n is the number of stops.
+    """
+
+    closed = start == end
+    nodes = [start] + [address for address in dict.fromkeys(stops) if address not in (start, end)]
+    if not closed:
+        nodes.append(end)
+    num_nodes = len(nodes)
+    distance = addresses.distance_by_index
+    if num_nodes == 1:
+        return 0.0
+    if num_nodes == 2:
+        return distance(nodes[0], nodes[1]) * (2 if closed else 1)
+
+    costs = [[distance(i, j) for j in nodes] for i in nodes]
+    targets = [2] * num_nodes
+    if not closed:
+        targets[0] = targets[-1] = 1
+    # In a 1-tree, the start is left out of the spanning tree and joined to it by its two shortest edges.
+    tree_nodes = range(1, num_nodes) if closed else range(num_nodes)
+
+    def cheapest_tree(penalties: list[float]) -> tuple[float, list[int]]:
+        """Finds the cheapest tree with the penalized distances, returning its cost and the degree of each address."""
+
+        degrees = [0] * num_nodes
+        first = tree_nodes[0]
+        best_costs = {node: costs[first][node] + penalties[first] + penalties[node] for node in tree_nodes[1:]}
+        best_parents = dict.fromkeys(best_costs, first)
+        total = 0.0
+        while best_costs:
+            node = min(best_costs, key=best_costs.__getitem__)
+            total += best_costs.pop(node)
+            degrees[node] += 1
+            degrees[best_parents.pop(node)] += 1
+            row, node_penalty = costs[node], penalties[node]
+            for other in best_costs:
+                cost = row[other] + node_penalty + penalties[other]
+                if cost < best_costs[other]:
+                    best_costs[other] = cost
+                    best_parents[other] = node
+        if closed:
+            start_costs = sorted((costs[0][node] + penalties[0] + penalties[node], node) for node in tree_nodes)
+            for cost, node in start_costs[:2]:
+                total += cost
+                degrees[node] += 1
+            degrees[0] = 2
+        return total, degrees
+
+    penalties = [0.0] * num_nodes
+    best_bound = 0.0
+    step_size = 2.0
+    steps_without_improvement = 0
+    for _ in range(iterations):
+        tree_cost, degrees = cheapest_tree(penalties)
+        bound = tree_cost - sum(target * penalty for target, penalty in zip(targets, penalties))
+        if upper_bound is None:
+            upper_bound = 2 * tree_cost
+        if bound > best_bound + MIN_IMPROVEMENT:
+            best_bound = bound
+            steps_without_improvement = 0
+        else:
+            # Halve the step size when the bound stops rising, so that the penalties settle.
+            steps_without_improvement += 1
+            if steps_without_improvement >= 5:
+                step_size /= 2
+                steps_without_improvement = 0
+
+        subgradient = [degree - target for degree, target in zip(degrees, targets)]
+        norm = sum(value * value for value in subgradient)
+        if norm == 0 or best_bound >= upper_bound - MIN_IMPROVEMENT:
+            break
+        step = step_size * (upper_bound - bound) / norm
+        penalties = [penalty + step * value for penalty, value in zip(penalties, subgradient)]
+    return best_bound
+
+
+def truck_lower_bound(truck: 'Truck', upper_bound: Optional[float] = None) -> float:
+    """Calculates a lower bound on the distance of a route through every address on a truck.
+
+    The bound ignores the order of priority addresses, so it also bounds routes that deliver priority packages first.
+
+    Args:
+        truck: The truck to calculate the bound for.
+        upper_bound: Optional - the distance of a known route for the truck.
+
+    Returns:
+        The lower bound, in miles.
+
+    Time complexity: See route_lower_bound.
+    """
+
+    stops = list(truck.priority_package_manifest) + list(truck.standard_package_manifest)
+    return route_lower_bound(truck.hub.addresses, truck.current_address_index, stops, truck.hub.addresses.hub_index,
+                             upper_bound)
+
+
+def optimality_gap(distance: float, lower_bound: float) -> float:
+    """Calculates how much longer a route is than a lower bound on its distance.
+
+    Args:
+        distance: The distance of the route.
+        lower_bound: A lower bound on the distance of the shortest route.
+
+    Returns:
+        The difference as a fraction of the lower bound, which is 0 if the route is known to be optimal.
+    """
+
+    if lower_bound <= 0:
+        return 0.0 if distance <= 0 else math.inf
+    return max(distance - lower_bound, 0.0) / lower_bound
+
+
+def simulated_annealing(addresses: 'AddressCollection', route: 'array', first_index: int = 1,
+                        fixed_end: bool = True, time_budget: Optional[float] = None,
+                        max_iterations: Optional[int] = None, rng: Optional[random.Random] = None,
+                        target_distance: Optional[float] = None) -> int:
+    """Optimizes the distance of a route with simulated annealing until a time or iteration budget is used up.
+
+    Each iteration picks a random 2-opt move or a random move of a single address to another position, scored in
+    constant time from the edges it changes. Moves that make the route shorter are always applied. Moves that make it
+    longer are applied with a probability that shrinks as the temperature falls, which lets the search leave local
+    optima early on. The temperature falls geometrically with the share of the budget that has been used. The best
+    route found is kept, so the algorithm can be stopped at any time and the route is never made longer.
+
+    Args:
+        addresses: The AddressCollection containing the distance matrix.
+        route: The address indexes of the route being optimized. The route is replaced in place with the best route
+          found.
+        first_index: The index of the first address in the route that may be moved.
+        fixed_end: Whether the last address in the route, such as the return to the hub, keeps its position.
+        time_budget: Optional - the number of seconds the algorithm may run for.
+        max_iterations: Optional - the number of moves the algorithm may evaluate.
+        rng: Optional - the random number generator to use, for repeatable results.
+        target_distance: Optional - stops the algorithm early once the best route found is no longer than this.
+
+    Returns: The number of moves that were evaluated.
+
+    Raises:
+        ValueError: If neither time_budget nor max_iterations is provided.
+
+    Time complexity: O(i * n), where i is the number of iterations and n is the number of addresses in the route.
+    Scoring a move is O(1); applying one, or saving a new best route, is O(n).
+
+    Space complexity: O(n), where n is the number of addresses in the route.
+    """
+
+    if time_budget is None and max_iterations is None:
+        raise ValueError('simulated_annealing requires a time_budget or max_iterations.')
+    distance = addresses.distance_by_index
+    rng = rng or random.Random()
+    randrange = rng.randrange
+    start_time = time.perf_counter()
+    stop_index = len(route) - 1 if fixed_end else len(route)
+    route_length = len(route)
+    if stop_index - first_index < 2:
+        return 0
+
+    def edge(first, second_position):
+        # The length of the edge from an address to the address at a position, which an open route may not have.
+        return distance(first, route[second_position]) if second_position < route_length else 0.0
+
+    def score(move, i, j):
+        # The change in distance of reversing route[i:j + 1] (move 0) or moving route[i] to after route[j] (move 1).
+        if move == 0:
+            return (distance(route[i - 1], route[j]) + edge(route[i], j + 1) -
+                    distance(route[i - 1], route[i]) - edge(route[j], j + 1))
+        address = route[i]
+        removal = distance(route[i - 1], address) + edge(address, i + 1) - distance(route[i - 1], route[i + 1])
+        insertion = distance(route[j], address) + edge(address, j + 1) - edge(route[j], j + 1)
+        return insertion - removal
+
+    # Start at a tenth of the average length of an edge in the route, which accepts small detours often and long ones
+    # rarely, and cool to a thousandth of it.
+    route_distance = sum(distance(route[i], route[i + 1]) for i in range(route_length - 1))
+    start_temperature = 0.1 * route_distance / (route_length - 1)
+    end_temperature = start_temperature / 1000
+    temperature = start_temperature
+
+    current_distance = 0.0
+    best_distance = 0.0
+    best_route = route[:]
+    iteration = 0
+    # Distances are tracked relative to the starting route, so the target is as well.
+    if target_distance is not None:
+        target_distance -= sum(distance(route[i], route[i + 1]) for i in range(route_length - 1))
+    while True:
+        if max_iterations is not None and iteration >= max_iterations:
+            break
+        # Check the clock every 128 iterations, since doing so is more expensive than scoring a move.
+        if iteration % 128 == 0:
+            if target_distance is not None and best_distance <= target_distance:
+                break
+            progress = 0.0 if max_iterations is None else iteration / max_iterations
+            if time_budget is not None:
+                time_progress = (time.perf_counter() - start_time) / time_budget if time_budget > 0 else 1.0
+                if time_progress >= 1:
+                    break
+                progress = max(progress, time_progress)
+            if start_temperature > 0:
+                temperature = start_temperature * (end_temperature / start_temperature) ** progress
+        iteration += 1
+
+        # Half of the moves are between addresses that are close together in the route, since those are the moves
+        # most likely to make it shorter.
+        i = randrange(first_index, stop_index - 1)
+        if randrange(2):
+            j = min(i + 1 + randrange(8), stop_index - 1)
+        else:
+            j = randrange(first_index, stop_index - 1)
+            if j >= i:
+                j += 1
+            else:
+                i, j = j, i
+        move = randrange(2)
+        change = score(move, i, j)
+        if change >= 0 and (temperature <= 0 or rng.random() >= math.exp(-change / temperature)):
+            continue
+        if move == 0:
+            route[i:j + 1] = route[i:j + 1][::-1]
+        else:
+            route.insert(j, route.pop(i))
+        current_distance += change
+        if current_distance < best_distance - MIN_IMPROVEMENT:
+            best_distance = current_distance
+            best_route[:] = route
+
+    route[:] = best_route
+    return iteration
+
+
+def anytime_route(truck: 'Truck', time_budget: Optional[float] = None, max_iterations: Optional[int] = None,
+                  seed: Optional[int] = None, target_gap: Optional[float] = None) -> RouteReport:
+    """Calculates a route for a truck within a time or iteration budget.
+
+    The route is seeded with nearest_neighbor, brought to a local optimum with two_opt, and then improved further with
+    simulated_annealing for the rest of the budget. two_opt stops early if the time budget runs out. The budget is
+    shared between the priority and standard routes in proportion to the number of addresses in each. While the
+    priority route is optimized, the first standard address is kept after it, so that changing the last priority
+    address can never make the combined route longer.
+
+    A lower bound on the route's distance is calculated with truck_lower_bound and included in the report. If a
+    target_gap is provided, simulated_annealing stops as soon as the route is within that gap of the lower bound.
+
+    Args:
+        truck: The truck the route is being calculated for.
+        time_budget: Optional - the number of seconds that may be spent calculating the route.
+        max_iterations: Optional - the number of moves simulated_annealing may evaluate.
+        seed: Optional - the seed for the random number generator, for repeatable results.
+        target_gap: Optional - the optimality gap, as a fraction of the lower bound, at which to stop optimizing.
+
+    Returns: A RouteReport describing how much the route improved, how quickly, and how far it may be from optimal.
+
+    Time complexity: O(n^3 + i * n), where n is the number of addresses in the route and i is the number of
+    iterations, due to two_opt and simulated_annealing. With a time budget, the time taken is bounded by the budget.
+
+    Space complexity: O(n), where n is the number of addresses in the route.
+    """
+
+    start_time = time.perf_counter()
+    deadline = None if time_budget is None else start_time + time_budget
+    rng = random.Random(seed)
+    addresses = truck.hub.addresses
+    nearest_neighbor(truck)
+    initial_distance = calculate_route_distance(truck.hub, truck.priority_route + truck.standard_route)
+    lower_bound = truck_lower_bound(truck, initial_distance)
+    target_distance = None if target_gap is None else lower_bound * (1 + target_gap)
+
+    first_index = 1 + len(truck.priority_1_addresses)
+    num_priority = max(len(truck.priority_route) - first_index, 0)
+    num_standard = max(len(truck.standard_route) - 2, 0)
+    priority_share = num_priority / (num_priority + num_standard) if num_priority + num_standard else 0.0
+
+    # Optimize the priority route followed by the first standard address, or the hub if there are no standard
+    # addresses, which keeps its position.
+    priority_route = truck.priority_route + truck.standard_route[1:2]
+    two_opt(addresses, priority_route, first_index, deadline=deadline)
+    # Each part of the route is given the target distance less the current distance of the other part.
+    rest_distance = calculate_route_distance(truck.hub, truck.standard_route[1:])
+    iterations = simulated_annealing(
+        addresses, priority_route, first_index,
+        time_budget=None if deadline is None else max(deadline - time.perf_counter(), 0.0) * priority_share,
+        max_iterations=None if max_iterations is None else int(max_iterations * priority_share), rng=rng,
+        target_distance=None if target_distance is None else target_distance - rest_distance)
+    truck.priority_route = priority_route[:-1]
+    truck.standard_route[0] = truck.priority_route[-1]
+
+    two_opt(addresses, truck.standard_route, deadline=deadline)
+    rest_distance = calculate_route_distance(truck.hub, truck.priority_route)
+    iterations += simulated_annealing(
+        addresses, truck.standard_route,
+        time_budget=None if deadline is None else max(deadline - time.perf_counter(), 0.0),
+        max_iterations=None if max_iterations is None else max_iterations - iterations, rng=rng,
+        target_distance=None if target_distance is None else target_distance - rest_distance)
+
+    final_distance = calculate_route_distance(truck.hub, truck.priority_route + truck.standard_route)
+    return RouteReport(truck.truck_id, initial_distance, final_distance, time.perf_counter() - start_time, iterations,
+                       lower_bound)
+
+
+def within_gap(truck: 'Truck', target_gap: Optional[float]) -> bool:
+    """Determines whether a truck's calculated route is within an optimality gap of its lower bound.
+
+    Args:
+        truck: The truck whose route is checked.
+        target_gap: The optimality gap, as a fraction of the lower bound. If None, the route is never within it.
+
+    Returns:
+        True if the route is no more than target_gap longer than the lower bound, False otherwise.
+
+    Time complexity: See route_lower_bound.
+    """
+
+    if target_gap is None:
+        return False
+    distance = calculate_route_distance(truck.hub, truck.priority_route + truck.standard_route)
+    return optimality_gap(distance, truck_lower_bound(truck, distance)) <= target_gap
+
+
+def calculate_route_distance(hub: 'Hub', route: Sequence[int]) -> float:
     """Calculates the total route distance by looking up and summing the distance between each address.
 
     Args:
         hub: The hub that the addresses are assigned to.
-        route: The route being calculated.
+        route: The route being calculated, as a sequence of address indexes.
 
     Returns: The distance of the entire route.
 
     Time complexity: O(n), where n is the number of addresses in the route.
     """
 
-    distance = sum(hub.addresses.distance_between(route[i], route[i + 1]) for i in range(len(route) - 1))
-    return distance
+    distance = hub.addresses.distance_by_index
+    return sum(distance(route[i], route[i + 1]) for i in range(len(route) - 1))
 
 
-def calculate_route(truck: 'Truck'):
+def calculate_route(truck: 'Truck', target_gap: Optional[float] = None):
     """Uses the nearest_neighbor and two-opt algorithms to optimize the distance of the route.
 
+    If neither the priority addresses nor the standard addresses on the truck number more than the hub's
+    held_karp_max_stops, the exact held_karp_route algorithm is used instead. Otherwise, if the truck's hub has
+    extended_local_search enabled, the routes are improved further with the Or-opt and restricted 3-opt moves of the
+    local_search algorithm.
+
+    If the truck's hub has a route_cache, a route cached for the same starting address, stops, and routing settings is
+    reused instead of being calculated, and newly calculated routes are added to the cache. Routes are cached before
+    any reordering by deadline_route, which Hub.calculate_routes applies afterwards, since that depends on the time the
+    truck leaves.
+
+    If a target_gap is provided, the local_search algorithm is skipped when the route is already within that gap of
+    the route's lower bound after the two-opt algorithm.
+
     Args:
         truck: The truck the route is being calculated for.
+        target_gap: Optional - the optimality gap, as a fraction of the lower bound, at which to stop optimizing.
 
     Time complexity: O(n^3), where n is the number of addresses in the route. This is due to the two-opt algorithm
     having a worst-case time complexity of O(n^3). This said, the average time complexity is much closer to O(n^2),
     since the two-opt algorithm stops looping once an improvement is not found after an iteration. Since nearest
     neighbor is used to optimize the route before passing it in to two opt, the starting route that two opt receives
     is closer to optimal than a random route, meaning it is more likely to reach its loop termination condition sooner.
+    Routes small enough for held_karp_route take O(2^n * n^2) time instead, and cached routes take O(n) time.
 
-    Space complexity: O(n), where n is the number of addresses in the route.
+    Space complexity: O(n), where n is the number of addresses in the route, or O(2^n * n) for held_karp_route.
     """
 
-    nearest_neighbor(truck)
-    two_opt_priority(truck)
-    two_opt_standard(truck)
+    route_cache = truck.hub.route_cache
+    if route_cache is not None:
+        key = RouteCache.key_for(truck, target_gap)
+        cached_routes = route_cache.get(key)
+        if cached_routes is not None:
+            truck.priority_route = array('i', cached_routes[0])
+            truck.standard_route = array('i', cached_routes[1])
+            return
+
+    max_stops = truck.hub.held_karp_max_stops
+    if max(len(truck.priority_package_manifest), len(truck.standard_package_manifest)) <= max_stops:
+        held_karp_route(truck)
+    else:
+        nearest_neighbor(truck)
+        two_opt_priority(truck)
+        two_opt_standard(truck)
+        if truck.hub.extended_local_search and not within_gap(truck, target_gap):
+            local_search_priority(truck)
+            local_search_standard(truck)
+
+    if route_cache is not None:
+        route_cache.put(key, truck.priority_route, truck.standard_route)
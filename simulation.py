@@ -0,0 +1,504 @@
+"""A module for simulating a delivery day with a discrete-event simulation.
+
+This module contains the Simulation class, which keeps a queue of events ordered by time and advances every truck of a
+hub on one shared clock. Departures, arrivals at each stop (where packages are delivered), returns to the hub, package
+check-ins, address corrections, and dispatch requests are all events, so trucks can be out on their routes at the same
+time while packages arrive at the hub.
+
+Typical usage example:
+
+    simulation = Simulation(hub)
+    simulation.schedule_check_ins(scan_file)
+    simulation.schedule_dispatch(datetime.time(8, 0), truck)
+    simulation.run()
+"""
+
+import datetime
+import heapq
+import math
+from itertools import count
+from typing import TYPE_CHECKING, Callable, Iterable, Optional, Union
+
+import hub as hub_module
+import routing
+
+if TYPE_CHECKING:
+    from hub import Hub
+    from package import Package
+    from truck import Truck
+
+# The kinds of events. Events at the same time are handled in this order, so that trucks that arrive back at the hub
+# and packages that are checked in or corrected at a given time are available to a dispatch at that time, and packages
+# are only inserted into the routes of trucks that are out if no truck dispatched at that time took them.
+ARRIVAL = 0
+RETURN = 1
+CHECK_IN = 2
+ADDRESS_CORRECTION = 3
+DISPATCH = 4
+DEPARTURE = 5
+REROUTE = 6
+
+EVENT_NAMES = {
+    ARRIVAL: 'arrival',
+    RETURN: 'return',
+    CHECK_IN: 'check-in',
+    ADDRESS_CORRECTION: 'address correction',
+    DISPATCH: 'dispatch',
+    DEPARTURE: 'departure',
+    REROUTE: 'reroute',
+}
+
+
+class ActiveRoute:
+    """The plan of a truck that is out on a route.
+
+    Attributes:
+        route: The address indexes of the stops on the route, ending with the return to the hub.
+        distance: The distance of the route in miles.
+        pickups: The packages picked up at each stop. Only stops inserted by Simulation.insert_packages have any.
+        deliveries: The packages planned to be delivered at each stop, which are used to check deadlines and
+          capacity when stops are inserted.
+        next_position: The position in the route of the stop the truck is driving to.
+        next_arrival: The time the truck arrives at the stop it is driving to.
+    """
+
+    __slots__ = ('route', 'distance', 'pickups', 'deliveries', 'next_position', 'next_arrival')
+
+    def __init__(self, route: list[int], distance: float, deliveries: list[list['Package']]):
+        """Initializes ActiveRoute for a truck that has just left the hub."""
+
+        self.route = route
+        self.distance = distance
+        self.pickups: list[list['Package']] = [[] for _ in route]
+        self.deliveries = deliveries
+        self.next_position = 0
+        self.next_arrival: Optional[datetime.datetime] = None
+
+
+class Simulation:
+    """A discrete-event simulation of the trucks of a hub over one day.
+
+    Events are kept in a binary heap ordered by their time, then by their kind, and then by the order they were
+    scheduled in. The clock jumps from one event to the next, and each truck's time is set from the clock when it
+    handles an event, so trucks never need their times adjusted by hand.
+
+    Attributes:
+        hub: The hub whose trucks and packages are simulated.
+        date: The date the events take place on.
+        clock: The time of the event being handled, or of the last event handled.
+        events_processed: The number of events handled so far.
+        event_counts: A dictionary with the name of each kind of event as keys and the number of events of that kind
+          handled so far as values.
+        time_budget: Optional - the number of seconds that may be spent calculating routes for each dispatch.
+        reroute: Whether packages that become ready for dispatch through a check-in or an address correction are
+          inserted into the routes of trucks that are out, with insert_packages.
+    """
+
+    def __init__(self, hub: 'Hub', time_budget: Optional[float] = None, date: Optional[datetime.date] = None,
+                 reroute: bool = False):
+        """Initializes Simulation with an empty event queue.
+
+        Args:
+            hub: The hub whose trucks and packages are simulated.
+            time_budget: Optional - the number of seconds that may be spent calculating routes for each dispatch.
+            date: Optional - the date the events take place on. Defaults to today.
+            reroute: Optional - whether newly ready packages are inserted into the routes of trucks that are out.
+        """
+
+        self.hub = hub
+        self.date = date or datetime.date.today()
+        self.clock: Optional[datetime.datetime] = None
+        self.events_processed = 0
+        self.event_counts = dict.fromkeys(EVENT_NAMES.values(), 0)
+        self.time_budget = time_budget
+        self.reroute = reroute
+        self._queue: list[tuple[datetime.datetime, int, int, Callable, tuple]] = []
+        self._sequence = count()
+        # The earliest time each truck that was out on a route when it was dispatched may leave again.
+        self._pending_dispatches: dict['Truck', datetime.datetime] = {}
+        # The plan of each truck that is out on a route.
+        self._routes: dict['Truck', ActiveRoute] = {}
+
+    def __len__(self) -> int:
+        """Returns the number of events waiting in the queue."""
+
+        return len(self._queue)
+
+    def at(self, event_time: Union[datetime.time, datetime.datetime]) -> datetime.datetime:
+        """Converts a time of day to a date and time on the simulated date.
+
+        Args:
+            event_time: The time of day, or a date and time, which is returned unchanged.
+
+        Returns:
+            The date and time of the event.
+        """
+
+        if isinstance(event_time, datetime.datetime):
+            return event_time
+        return datetime.datetime.combine(self.date, event_time)
+
+    def schedule(self, event_time: Union[datetime.time, datetime.datetime], kind: int, handler: Callable,
+                 *args):
+        """Adds an event to the queue.
+
+        Args:
+            event_time: The time the event takes place.
+            kind: The kind of event, which orders events that take place at the same time.
+            handler: The function that is called with args when the event takes place.
+            args: The arguments passed to the handler.
+
+        Time complexity: O(log n), where n is the number of events in the queue.
+        """
+
+        heapq.heappush(self._queue, (self.at(event_time), kind, next(self._sequence), handler, args))
+
+    def schedule_check_ins(self, scans: Union[str, Iterable[tuple[datetime.time, int, Optional[int]]]]):
+        """Schedules package scans to be checked in at the times they were scanned.
+
+        Scans with the same time are checked in together by one event with Hub.check_in_packages.
+
+        Args:
+            scans: The scans as (time scanned, package ID, status override) tuples, or the path to a scan file in the
+              format read by hub.read_scan_file.
+
+        Time complexity: O(n + t log t), where n is the number of scans and t is the number of distinct scan times.
+        """
+
+        if isinstance(scans, str):
+            scans = hub_module.read_scan_file(scans)
+        scans_by_time: dict[datetime.time, list[tuple[datetime.time, int, Optional[int]]]] = {}
+        for scan in scans:
+            scans_by_time.setdefault(scan[0], []).append(scan)
+        for time_scanned, time_scans in scans_by_time.items():
+            self.schedule(time_scanned, CHECK_IN, self._check_in, time_scans)
+
+    def schedule_address_correction(self, event_time: datetime.time, package_id: int, street: str, city: str,
+                                    state: str, zipcode: str):
+        """Schedules the address of a package to be corrected.
+
+        Args:
+            event_time: The time the corrected address becomes known.
+            package_id: The ID of the package.
+            street: The street number and name.
+            city: The city name.
+            state: The state abbreviation.
+            zipcode: The zipcode.
+        """
+
+        self.schedule(event_time, ADDRESS_CORRECTION, self._correct_address, package_id, street, city, state,
+                      zipcode)
+
+    def schedule_dispatch(self, event_time: datetime.time, truck: 'Truck'):
+        """Schedules a truck to be loaded, routed, and sent out.
+
+        If the truck is out on a route at that time, it is dispatched as soon as it returns to the hub.
+
+        Args:
+            event_time: The earliest time the truck may be dispatched.
+            truck: The truck to dispatch.
+        """
+
+        self.schedule(event_time, DISPATCH, self._dispatch, truck)
+
+    def run(self, until: Optional[datetime.time] = None) -> int:
+        """Handles events in order of time until the queue is empty.
+
+        Args:
+            until: Optional - the time after which events are left in the queue.
+
+        Returns:
+            The number of events handled.
+
+        Time complexity: O(n log n), where n is the number of events, plus the time taken to load trucks and
+        calculate routes for each dispatch.
+        """
+
+        end = None if until is None else self.at(until)
+        processed = self.events_processed
+        while self._queue and (end is None or self._queue[0][0] <= end):
+            event_time, kind, _, handler, args = heapq.heappop(self._queue)
+            self.clock = event_time
+            self.events_processed += 1
+            self.event_counts[EVENT_NAMES[kind]] += 1
+            if kind == DISPATCH:
+                # Dispatch every truck requested at this time together, so that they are loaded as one group.
+                trucks = list(args)
+                while self._queue and self._queue[0][0] == event_time and self._queue[0][1] == DISPATCH:
+                    trucks.extend(heapq.heappop(self._queue)[4])
+                    self.events_processed += 1
+                    self.event_counts[EVENT_NAMES[DISPATCH]] += 1
+                handler(*trucks)
+            else:
+                handler(*args)
+        return self.events_processed - processed
+
+    def insert_packages(self, packages: Iterable['Package']) -> list['Package']:
+        """Inserts packages that are ready for dispatch into the routes of trucks that are out, if it is cheap enough.
+
+        The packages for each address are inserted together, with the most urgent deadline first. For each group, a
+        stop at the hub to pick the packages up and a stop at their address are inserted into the route of the truck
+        where they add the fewest miles, using routing.cheapest_pickup_insertion. A group is only inserted after the
+        stop a truck is driving to, and only where the truck has room for it and no stop misses its deadline. Bound
+        packages, packages restricted to a truck that is not out, and groups that fit nowhere are left for the next
+        dispatch.
+
+        Args:
+            packages: The packages to insert. Packages that are not ready for dispatch are ignored.
+
+        Returns:
+            The packages that were inserted into a route.
+
+        Time complexity: O(g t n^2), where g is the number of addresses of the packages, t is the number of trucks
+        that are out, and n is the number of stops on their routes.
+        """
+
+        index = self.hub.dispatch_index
+        groups: dict[int, list['Package']] = {}
+        for package in packages:
+            if package in index and package.address_index is not None and \
+                    package not in self.hub.packages.bound_packages:
+                groups.setdefault(package.address_index, []).append(package)
+        if not groups or not self._routes:
+            return []
+
+        def group_deadline(group: list['Package']) -> float:
+            deadlines = [package.deadline for package in group if package.deadline != 'EOD']
+            return min(map(self._hours, deadlines)) if deadlines else math.inf
+
+        inserted = []
+        for address, group in sorted(groups.items(), key=lambda item: (group_deadline(item[1]), item[0])):
+            restrictions = {package.truck_restriction for package in group if package.truck_restriction}
+            if len(restrictions) > 1:
+                continue
+            deadline = group_deadline(group)
+            best = None
+            for truck in sorted(self._routes, key=lambda truck: truck.truck_id):
+                if restrictions and truck.truck_id not in restrictions:
+                    continue
+                insertion = self._cheapest_insertion(truck, address, len(group),
+                                                     None if deadline == math.inf else deadline)
+                if insertion is not None and (best is None or insertion[0] < best[1][0]):
+                    best = (truck, insertion)
+            if best is None:
+                continue
+            truck, (added, pickup_gap, delivery_gap) = best
+            active_route = self._routes[truck]
+            hub_index = self.hub.addresses.hub_index
+            # Insert the later stop first so that the position of the earlier one does not change.
+            stops = [(delivery_gap, address, [], group)]
+            # Pick the packages up at a stop at the hub inserted for an earlier group, if the new stop would be next
+            # to it.
+            if active_route.route[pickup_gap - 1] == hub_index and active_route.pickups[pickup_gap - 1]:
+                active_route.pickups[pickup_gap - 1].extend(group)
+            elif delivery_gap > pickup_gap and active_route.route[pickup_gap] == hub_index and \
+                    active_route.pickups[pickup_gap]:
+                active_route.pickups[pickup_gap].extend(group)
+            else:
+                stops.append((pickup_gap, hub_index, group, []))
+            for gap, stop, pickups, deliveries in stops:
+                active_route.route.insert(gap, stop)
+                active_route.pickups.insert(gap, pickups)
+                active_route.deliveries.insert(gap, deliveries)
+            active_route.distance += added
+            self.hub.remove_from_dispatch_list(set(group))
+            for package in group:
+                self.hub.packages.priority_1_packages.discard(package)
+                self.hub.packages.priority_2_packages.discard(package)
+            inserted.extend(group)
+        return inserted
+
+    def _cheapest_insertion(self, truck: 'Truck', address: int, size: int,
+                            deadline: Optional[float]) -> Optional[tuple[float, int, int]]:
+        """Scores the cheapest insertion of a pickup at the hub and a delivery to an address into a truck's route.
+
+        Args:
+            truck: A truck that is out on a route.
+            address: The index of the address the packages are delivered to.
+            size: The number of packages.
+            deadline: The latest arrival time at the address in hours, or None if there is no deadline.
+
+        Returns:
+            The result of routing.cheapest_pickup_insertion.
+
+        Time complexity: O(n^2), where n is the number of stops left on the truck's route.
+        """
+
+        active_route = self._routes[truck]
+        route, first = active_route.route, active_route.next_position
+        distance = self.hub.addresses.distance_by_index
+        num_stops = len(route)
+        arrivals = [0.0] * num_stops
+        loads = [0] * num_stops
+        slack = [math.inf] * num_stops
+        arrival = self._hours(active_route.next_arrival)
+        load = len(truck.packages_on_truck)
+        for q in range(first, num_stops):
+            if q > first:
+                arrival += distance(route[q - 1], route[q]) / truck.speed
+            load += len(active_route.pickups[q]) - len(active_route.deliveries[q])
+            arrivals[q], loads[q] = arrival, load
+            for package in active_route.deliveries[q]:
+                if package.deadline != 'EOD':
+                    slack[q] = min(slack[q], self._hours(package.deadline) - arrival)
+        return routing.cheapest_pickup_insertion(self.hub.addresses, route, first + 1, self.hub.addresses.hub_index,
+                                                 address, arrivals, loads, slack, truck.speed, size,
+                                                 truck.package_capacity, deadline)
+
+    def _hours(self, value: Union[datetime.time, datetime.datetime]) -> float:
+        """Converts a time of day, or a date and time on the simulated date, to hours after midnight."""
+
+        return (self.at(value) - datetime.datetime.combine(self.date, datetime.time())) / datetime.timedelta(hours=1)
+
+    def _check_in(self, scans: list[tuple[datetime.time, int, Optional[int]]]):
+        """Checks in scanned packages and, if rerouting is enabled, schedules them to be inserted into the routes of
+        trucks that are out.
+
+        Args:
+            scans: The scans to check in.
+        """
+
+        self.hub.check_in_packages(scans)
+        if self.reroute:
+            packages = [self.hub.packages.search(package_id) for _, package_id, _ in scans]
+            self.schedule(self.clock, REROUTE, self.insert_packages, packages)
+
+    def _correct_address(self, package_id: int, street: str, city: str, state: str, zipcode: str):
+        """Corrects the address of a package and, if rerouting is enabled, schedules it to be inserted into the route
+        of a truck that is out.
+
+        Args:
+            package_id: The ID of the package.
+            street: The street number and name.
+            city: The city name.
+            state: The state abbreviation.
+            zipcode: The zipcode.
+        """
+
+        self.hub.correct_package_address(package_id, street, city, state, zipcode, self.clock.time())
+        if self.reroute:
+            self.schedule(self.clock, REROUTE, self.insert_packages, [self.hub.packages.search(package_id)])
+
+    def _dispatch(self, *trucks: 'Truck'):
+        """Loads the trucks that are at the hub, calculates their routes, and schedules their departures.
+
+        Trucks that are out on a route are dispatched when they return.
+
+        Args:
+            trucks: The trucks to dispatch.
+        """
+
+        at_hub = []
+        for truck in trucks:
+            if truck.is_at_hub and truck not in self._routes:
+                at_hub.append(truck)
+            else:
+                self._pending_dispatches[truck] = max(self.clock, self._pending_dispatches.get(truck, self.clock))
+        if not at_hub:
+            return
+        for truck in at_hub:
+            truck.date_time = max(self.clock, truck.date_time or self.clock)
+            if truck.route_start_time is None:
+                truck.route_start_time = truck.date_time
+            truck.is_ready_for_dispatch = True
+        self.hub.load_trucks()
+        self.hub.calculate_routes(self.time_budget)
+        for truck in at_hub:
+            self.schedule(truck.date_time, DEPARTURE, self._depart, truck)
+
+    def _depart(self, truck: 'Truck'):
+        """Sends a truck out on its route and schedules its arrival at the first stop.
+
+        Args:
+            truck: The truck that departs.
+        """
+
+        if not truck.is_ready_for_dispatch:
+            return
+        truck.date_time = self.clock
+        route = list(truck.priority_route + truck.standard_route)
+        # Packages are delivered at the first stop at their address.
+        deliveries = []
+        manifests = {**truck.standard_package_manifest, **truck.priority_package_manifest}
+        for address in route:
+            deliveries.append(list(manifests.pop(address, ())))
+        route_distance = truck.depart()
+        if route_distance == 0:
+            return
+        self._routes[truck] = ActiveRoute(route, route_distance, deliveries)
+        self._schedule_next_stop(truck, 0)
+
+    def _schedule_next_stop(self, truck: 'Truck', position: int):
+        """Schedules the arrival of a truck at the next stop on its route after the given position.
+
+        Stops at the truck's current address take no time and are handled immediately.
+
+        Args:
+            truck: The truck on a route.
+            position: The position in the route of the next stop.
+        """
+
+        active_route = self._routes[truck]
+        route = active_route.route
+        distance = self.hub.addresses.distance_by_index
+        while position < len(route) - 1 and distance(truck.current_address_index, route[position]) == 0:
+            self._visit(truck, position)
+            position += 1
+        miles = distance(truck.current_address_index, route[position])
+        arrival_time = truck.date_time + datetime.timedelta(hours=miles / truck.speed)
+        active_route.next_position = position
+        active_route.next_arrival = arrival_time
+        if position == len(route) - 1:
+            self.schedule(arrival_time, RETURN, self._return, truck)
+        else:
+            self.schedule(arrival_time, ARRIVAL, self._arrive, truck, position)
+
+    def _visit(self, truck: 'Truck', position: int):
+        """Moves a truck to a stop on its route, delivers the packages for it, and picks up any packages planned for it.
+
+        Args:
+            truck: The truck on a route.
+            position: The position of the stop in the truck's route.
+        """
+
+        active_route = self._routes[truck]
+        address = active_route.route[position]
+        truck.drive_to(address)
+        pickups = active_route.pickups[position]
+        if not pickups:
+            return
+        for package in pickups:
+            truck.load_package(package)
+            package.mark_package_out_for_delivery(truck)
+            manifest = truck.priority_package_manifest
+            if package.address_index not in manifest:
+                manifest = truck.standard_package_manifest
+            manifest.setdefault(package.address_index, set()).add(package)
+        package_ids = ', '.join(str(package.package_id) for package in sorted(pickups, key=lambda p: p.package_id))
+        truck.travel_log.append(f'Picked up packages {package_ids} at the hub at {truck.current_time}')
+
+    def _arrive(self, truck: 'Truck', position: int):
+        """Handles the arrival of a truck at a stop on its route and schedules the next stop.
+
+        Args:
+            truck: The truck that arrives.
+            position: The position of the stop in the truck's route.
+        """
+
+        self._visit(truck, position)
+        self._schedule_next_stop(truck, position + 1)
+
+    def _return(self, truck: 'Truck'):
+        """Moves a truck back to the hub and dispatches it again if a dispatch is waiting for it.
+
+        Args:
+            truck: The truck that returns.
+        """
+
+        active_route = self._routes.pop(truck)
+        truck.drive_to(active_route.route[-1])
+        truck.return_to_hub()
+        truck.travel_log.append(f'Traveled a total distance of {active_route.distance:.1f} miles on this route.\n')
+        dispatch_time = self._pending_dispatches.pop(truck, None)
+        if dispatch_time is not None:
+            self.schedule(max(dispatch_time, self.clock), DISPATCH, self._dispatch, truck)
@@ -5,6 +5,7 @@ a group of trucks with their delivery hub.
 """
 
 import datetime
+from array import array
 from typing import TYPE_CHECKING, Union
 
 import routing
@@ -20,25 +21,25 @@ class Truck:
 
     Attributes:
         truck_id: A unique identifier for a truck.
-        priority_package_manifest: A dictionary containing addresses that have priority packages assigned to them
-          as well as all packages associated with these addresses.
-        standard_package_manifest: A dictionary containing addresses that have only standard packages assigned to them
-          as well as all packages associated with these addresses.
+        priority_package_manifest: A dictionary containing the indexes of addresses that have priority packages
+          assigned to them as well as all packages associated with these addresses.
+        standard_package_manifest: A dictionary containing the indexes of addresses that have only standard packages
+          assigned to them as well as all packages associated with these addresses.
         packages_on_truck: All packages currently loaded on the truck.
-        priority_route: A list of priority addresses in order of the route.
-        standard_route: A list of standard addresses in order of the route.
+        priority_route: An array of the indexes of priority addresses in order of the route.
+        standard_route: An array of the indexes of standard addresses in order of the route.
         package_capacity: The maximum number of packages a truck is capable of holding.
         num_packages_loaded: The number of packages currently loaded on a truck.
         is_at_hub: Indicates whether a truck is currently at the hub or not.
         is_ready_for_dispatch: Indicates whether a truck is currently reading for dispatch or not.
-        current_address: The address a truck is currently at.
+        current_address_index: The index of the address a truck is currently at.
         total_miles_traveled: The total number of miles a truck has traveled throughout the day.
         hub: The delivery hub a truck is associated with.
         speed: The average speed of a truck, including loading time and delivery time.
         route_start_time: The time a truck is dispatched on its first route of the day.
         date_time: The current time of a truck.
-        priority_1_addresses: The addresses of any priority 1 packages loaded on a truck.
-        all_priority_addresses: The addresses of all priority packages loaded on a truck.
+        priority_1_addresses: The indexes of the addresses of any priority 1 packages loaded on a truck.
+        all_priority_addresses: The indexes of the addresses of all priority packages loaded on a truck.
         travel_log: A log of the truck's activities throughout the day.
     """
 
@@ -53,23 +54,23 @@ class Truck:
         """
 
         self.truck_id = truck_id
-        self.priority_package_manifest: dict[str, set['Package']] = {}
-        self.standard_package_manifest: dict[str, set['Package']] = {}
+        self.priority_package_manifest: dict[int, set['Package']] = {}
+        self.standard_package_manifest: dict[int, set['Package']] = {}
         self.packages_on_truck: set[Package] = set()
-        self.priority_route: list[str] = []
-        self.standard_route: list[str] = []
+        self.priority_route = array('i')
+        self.standard_route = array('i')
         self.package_capacity = package_capacity
         self.num_packages_loaded = 0
         self.is_at_hub = True
         self.is_ready_for_dispatch = False
-        self.current_address = hub.addresses.hub_address
+        self.current_address_index = hub.addresses.hub_index
         self.total_miles_traveled = 0.0
         self.hub = hub
         self.speed = speed
         self.route_start_time: Union[datetime, None] = None
         self.date_time: Union[datetime, None] = None
-        self.priority_1_addresses: set[str] = set()
-        self.all_priority_addresses: set[str] = set()
+        self.priority_1_addresses: set[int] = set()
+        self.all_priority_addresses: set[int] = set()
         self.travel_log: list[str] = []
 
     @property
@@ -105,11 +106,11 @@ class Truck:
         else:
             print('WARNING: truck reached capacity while loading package groups and routes may not be optimal.')
 
-    def deliver_packages(self, address: str):
+    def deliver_packages(self, address: int):
         """Delivers all packages for the truck's current address.
 
         Args:
-            address: The address to deliver packages to.
+            address: The index of the address to deliver packages to.
 
         Time complexity: O(n), where n is the number of packages assigned to the address.
         """
@@ -135,12 +136,33 @@ class Truck:
         Time complexity: O(n), where n is the number of packages on the truck.
         """
 
+        route_distance = self.depart()
+        if route_distance == 0:
+            return
+
+        # Visit each address on the priority route and then the standard route, and deliver all packages to each
+        # address.
+        for route in (self.priority_route, self.standard_route):
+            self.drive_route(route)
+
+        self.return_to_hub()
+        self.travel_log.append(f'Traveled a total distance of {route_distance:.1f} miles on this route.\n')
+
+    def depart(self) -> float:
+        """Sends the truck out from the hub on its route and marks its packages out for delivery.
+
+        Returns:
+            The distance of the truck's route, or 0 if the truck has no packages and stays at the hub.
+
+        Time complexity: O(n), where n is the number of packages on the truck.
+        """
+
         route_distance = routing.calculate_route_distance(self.hub, (self.priority_route + self.standard_route))
         # Because the route starts with the hub's address, a truck with no packages will still have a route. If this
         # is the case, reset the ready_for_dispatch flag and do nothing.
         if route_distance == 0:
             self.is_ready_for_dispatch = False
-            return
+            return 0.0
 
         self.is_at_hub = False
         self.is_ready_for_dispatch = False
@@ -150,45 +172,56 @@ class Truck:
         # Mark packages out for delivery
         for package in self.packages_on_truck:
             package.mark_package_out_for_delivery(self)
+        return route_distance
 
-        # Visit each address on the priority route and deliver all packages to each address.
-        for address in self.priority_route:
-            starting_address = self.current_address
-            miles_traveled = self.hub.addresses.distance_between(self.current_address, address)
-            self.total_miles_traveled += miles_traveled
-            time_traveling = (miles_traveled / self.speed)
-            self.add_time(time_traveling)
-            self.current_address = address
-            self.deliver_packages(address)
-            # As mentioned above, because the starting address is the hub, the first "stop" in the route will
-            # have a travel distance of 0 and should be excluded from the log.
-            if miles_traveled > 0:
-                self.travel_log.append(f'Navigated from {starting_address} to {address} ({miles_traveled:.1f} miles).')
-
-        # Visit each address on the standard route and deliver all packages to each address.
-        for address in self.standard_route:
-            starting_address = self.current_address
-            miles_traveled = self.hub.addresses.distance_between(self.current_address, address)
-            self.total_miles_traveled += miles_traveled
-            time_traveling = (miles_traveled / self.speed)
-            self.add_time(time_traveling)
-            self.current_address = address
-            self.deliver_packages(address)
-            if miles_traveled > 0:
-                self.travel_log.append(f'Navigated from {starting_address} to {address} ({miles_traveled:.1f} miles).')
+    def drive_route(self, route: 'array'):
+        """Drives the truck to each address in a route in order and delivers the packages for each address.
 
-        self.return_to_hub()
-        self.travel_log.append(f'Traveled a total distance of {route_distance:.1f} miles on this route.\n')
+        Args:
+            route: The indexes of the addresses to visit.
+
+        Time complexity: O(n), where n is the number of packages delivered on the route.
+        """
+
+        for address in route:
+            self.drive_to(address)
+
+    def drive_to(self, address: int) -> float:
+        """Drives the truck from its current address to another address and delivers the packages for that address.
+
+        Args:
+            address: The index of the address to drive to.
+
+        Returns:
+            The number of miles driven.
+
+        Time complexity: O(n), where n is the number of packages delivered at the address.
+        """
+
+        addresses = self.hub.addresses
+        starting_address = self.current_address_index
+        miles_traveled = addresses.distance_by_index(starting_address, address)
+        self.total_miles_traveled += miles_traveled
+        time_traveling = (miles_traveled / self.speed)
+        self.add_time(time_traveling)
+        self.current_address_index = address
+        self.deliver_packages(address)
+        # Because the starting address is the hub, the first "stop" in the route will have a travel distance of 0
+        # and should be excluded from the log. Addresses are only converted to strings for the log.
+        if miles_traveled > 0:
+            self.travel_log.append(f'Navigated from {addresses.address_at(starting_address)} to '
+                                   f'{addresses.address_at(address)} ({miles_traveled:.1f} miles).')
+        return miles_traveled
 
     def return_to_hub(self):
         """Calls the truck back to the hub, clears the routes, and logs the time."""
 
-        hub_address = self.hub.addresses.hub_address
-        if self.current_address != hub_address:
-            self.total_miles_traveled += self.hub.addresses.distance_between(self.current_address, hub_address)
-            self.current_address = hub_address
-        self.priority_route.clear()
-        self.standard_route.clear()
+        hub_index = self.hub.addresses.hub_index
+        if self.current_address_index != hub_index:
+            self.total_miles_traveled += self.hub.addresses.distance_by_index(self.current_address_index, hub_index)
+            self.current_address_index = hub_index
+        self.priority_route = array('i')
+        self.standard_route = array('i')
         self.priority_1_addresses.clear()
         self.is_at_hub = True
         self.is_ready_for_dispatch = False
@@ -215,7 +248,7 @@ class Truck:
             current_time: The current time of the truck.
         """
 
-        date = datetime.today()
+        date = datetime.date.today()
         self.date_time = datetime.datetime.combine(date, current_time)
 
     def add_time(self, hours: float):
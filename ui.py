@@ -3,9 +3,14 @@
 import datetime
 from typing import TYPE_CHECKING
 
+import package as package_module
+
 if TYPE_CHECKING:
     from hub import Hub
 
+# The number of packages shown at a time when paging through the status of all packages.
+PAGE_SIZE = 25
+
 
 def main_menu(hub: 'Hub'):
     """Launches the user interface.
@@ -19,14 +24,15 @@ def main_menu(hub: 'Hub'):
         print('Welcome to WGUPS Route Management System. Please choose from one of the options below:')
         print('1. Get the status of a single package at a specific time')
         print('2. Get the status of all packages at a snapshot in time')
-        print('3. Get end of day report with truck history and package status')
-        print('4. Exit program\n')
+        print('3. Get the packages whose status changed between two times')
+        print('4. Get end of day report with truck history and package status')
+        print('5. Exit program\n')
 
         # Get user input and validate it
         while True:
             choice = input('Type selection here: ')
-            if choice not in ('1', '2', '3', '4'):
-                print('Invalid selection. Please enter a number between 1 and 4.\n')
+            if choice not in ('1', '2', '3', '4', '5'):
+                print('Invalid selection. Please enter a number between 1 and 5.\n')
                 continue
 
             # Get a package ID and time from the user and validate it. Use these values to look up a package at the
@@ -43,15 +49,7 @@ def main_menu(hub: 'Hub'):
                             break
                     except ValueError:
                         print('\nInvalid input. Please enter the package ID, which is an integer.\n')
-                while True:
-                    try:
-                        time_input = input('Please enter a time in HH:mm format: ')
-                        time_input = datetime.datetime.strptime(time_input, '%H:%M').time()
-                        break
-                    except ValueError:
-                        print('\nInvalid input. The time entered must be in 24-hour time '
-                              'in the following format: HH:mm.')
-                        print('For example, 1:00 PM should be entered as 13:00.\n')
+                time_input = get_time_input('Please enter a time in HH:mm format: ')
                 print()
                 hub.packages.print_single_package_at_time(package_id, time_input)
                 input('\nPress Enter key to return to the main menu.\n')
@@ -61,28 +59,84 @@ def main_menu(hub: 'Hub'):
             # specified time.
             elif choice == '2':
                 print()
+                time_input = get_time_input('Please enter a time in HH:mm format: ')
+                print()
+                hub.packages.print_all_packages_at_time(time_input, PAGE_SIZE)
+                input('\nPress Enter key to return to the main menu.\n')
+                break
+
+            # Get two times from the user and display the packages whose status changed between them.
+            elif choice == '3':
+                print()
+                start_time = get_time_input('Please enter the earlier time in HH:mm format: ')
                 while True:
-                    try:
-                        time_input = input('Please enter a time in HH:mm format: ')
-                        time_input = datetime.datetime.strptime(time_input, '%H:%M').time()
+                    end_time = get_time_input('Please enter the later time in HH:mm format: ')
+                    if end_time >= start_time:
                         break
-                    except ValueError:
-                        print(
-                            '\nInvalid input. The time entered must be in 24-hour time in the following format: HH:mm.')
-                        print('For example, 1:00 PM should be entered as 13:00.\n')
+                    print(f'\nInvalid input. The later time must not be earlier than {start_time.strftime("%H:%M")}.\n')
                 print()
-                hub.packages.print_all_packages_at_time(time_input)
+                print_changes_between(hub, start_time, end_time)
                 input('\nPress Enter key to return to the main menu.\n')
                 break
 
             # Print the end of day report showing the history of all trucks and the status of all packages.
-            elif choice == '3':
+            elif choice == '4':
                 print()
                 hub.print_end_of_day_report()
                 input('\nPress Enter key to return to the main menu.\n')
                 break
 
             # Exit the program.
-            elif choice == '4':
+            elif choice == '5':
                 print('\nProgram Exited\n')
                 exit()
+
+
+def get_time_input(prompt: str) -> datetime.time:
+    """Asks the user for a time in 24-hour HH:mm format until a valid one is entered.
+
+    Args:
+        prompt: The prompt shown to the user.
+
+    Returns:
+        The time entered.
+    """
+
+    while True:
+        try:
+            return datetime.datetime.strptime(input(prompt), '%H:%M').time()
+        except ValueError:
+            print('\nInvalid input. The time entered must be in 24-hour time in the following format: HH:mm.')
+            print('For example, 1:00 PM should be entered as 13:00.\n')
+
+
+def print_changes_between(hub: 'Hub', start_time: datetime.time, end_time: datetime.time,
+                          page_size: int = PAGE_SIZE):
+    """Pages through the packages whose status changed between two times, along with each of their changes.
+
+    Only the packages that changed are looked up, using the transitions in the temporal index of the hub's packages.
+
+    Args:
+        hub: The hub whose packages are shown.
+        start_time: The earlier time. Changes at this time are not shown.
+        end_time: The later time. Changes at this time are shown.
+        page_size: The number of packages shown before waiting for the user.
+    """
+
+    changes = hub.packages.changes_between(start_time, end_time)
+    status_codes = package_module.Package.status_codes
+    print(f'Packages Whose Status Changed After {start_time.strftime("%H:%M")} And By {end_time.strftime("%H:%M")}:')
+    if not changes:
+        print('None')
+        return
+    for shown, (package_id, package_changes) in enumerate(changes.items(), 1):
+        package = hub.packages.search(package_id)
+        print(package.describe(package.status_at_time(end_time)))
+        for change_time, previous_code, new_code, truck_id in package_changes:
+            truck = f' (truck {truck_id})' if truck_id is not None else ''
+            print(f'    {change_time}: {status_codes[previous_code]} -> {status_codes[new_code]}{truck}')
+        if shown % page_size == 0 and shown < len(changes):
+            choice = input(f'\nShowing {shown} of {len(changes)}. Press Enter to show more, or type Q to stop: ')
+            print()
+            if choice.strip().upper() == 'Q':
+                break